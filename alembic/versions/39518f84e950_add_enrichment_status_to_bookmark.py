@@ -0,0 +1,32 @@
+"""add enrichment_status to bookmark
+
+Revision ID: 39518f84e950
+Revises: bead4ddd8c11
+Create Date: 2026-10-18 22:31:40.226817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '39518f84e950'
+down_revision: Union[str, Sequence[str], None] = 'bead4ddd8c11'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "bookmark",
+        sa.Column("enrichment_status", sa.String(), nullable=False, server_default="done")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # plain ALTER TABLE - a batch rebuild of bookmark would drop its triggers
+    op.drop_column("bookmark", "enrichment_status")
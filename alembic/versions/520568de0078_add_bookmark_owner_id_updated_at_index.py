@@ -0,0 +1,28 @@
+"""add bookmark owner_id updated_at index
+
+Revision ID: 520568de0078
+Revises: 8a258e29dea5
+Create Date: 2026-10-18 23:48:31.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '520568de0078'
+down_revision: Union[str, Sequence[str], None] = '8a258e29dea5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_bookmark_owner_id_updated_at", "bookmark", ["owner_id", "updated_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_bookmark_owner_id_updated_at", table_name="bookmark")
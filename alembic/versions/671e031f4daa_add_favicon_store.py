@@ -0,0 +1,38 @@
+"""add bookmark favicon_hash and favicon table
+
+Revision ID: 671e031f4daa
+Revises: b1d58b124cd5
+Create Date: 2026-10-19 14:03:27.190442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '671e031f4daa'
+down_revision: Union[str, Sequence[str], None] = 'b1d58b124cd5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing bookmarks keep their remote favicon_url until enriched again
+    op.add_column("bookmark", sa.Column("favicon_hash", sa.String(), nullable=True))
+    op.create_table(
+        "favicon",
+        sa.Column("domain", sa.String(), nullable=False),
+        sa.Column("hash", sa.String(), nullable=True),
+        sa.Column("fetched_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("domain"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("favicon")
+    # plain ALTER TABLE - a batch rebuild of bookmark would drop its triggers
+    op.drop_column("bookmark", "favicon_hash")
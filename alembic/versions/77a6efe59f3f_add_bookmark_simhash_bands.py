@@ -0,0 +1,85 @@
+"""add bookmark simhash and simhash_band table
+
+Revision ID: 77a6efe59f3f
+Revises: d032a32df0a0
+Create Date: 2026-10-19 02:07:45.316208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.simhash import simhash
+
+
+# revision identifiers, used by Alembic.
+revision: str = '77a6efe59f3f'
+down_revision: Union[str, Sequence[str], None] = 'd032a32df0a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+
+INSERT_BANDS = """
+        INSERT OR IGNORE INTO simhash_band(owner_id, band_key, bookmark_id, simhash)
+        SELECT new.owner_id, (value << 16) | ((new.simhash >> (16 * value)) & 65535), new.id, new.simhash FROM json_each('[0,1,2,3]')
+        WHERE new.simhash IS NOT NULL;"""
+DELETE_BANDS = """
+        DELETE FROM simhash_band WHERE owner_id = old.owner_id AND bookmark_id = old.id
+        AND band_key IN (SELECT (value << 16) | ((old.simhash >> (16 * value)) & 65535) FROM json_each('[0,1,2,3]'));"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("bookmark", sa.Column("simhash", sa.Integer(), nullable=True))
+    op.create_table(
+        "simhash_band",
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("band_key", sa.Integer(), nullable=False),
+        sa.Column("bookmark_id", sa.Integer(), nullable=False),
+        sa.Column("simhash", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["user.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["bookmark_id"], ["bookmark.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("owner_id", "band_key", "bookmark_id"),
+        sqlite_with_rowid=False,
+    )
+    op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS bookmark_simhash_ai AFTER INSERT ON bookmark BEGIN{INSERT_BANDS}
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS bookmark_simhash_au AFTER UPDATE OF simhash, owner_id ON bookmark BEGIN{DELETE_BANDS}{INSERT_BANDS}
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS bookmark_simhash_ad AFTER DELETE ON bookmark BEGIN{DELETE_BANDS}
+        END
+    """)
+
+    # the scraped page isn't kept, so existing bookmarks are signed from the
+    # title and description they were saved with; the update trigger fills
+    # simhash_band
+    connection = op.get_bind()
+    last = 0
+    while True:
+        rows = connection.execute(sa.text(
+            "SELECT id, title, description FROM bookmark WHERE id > :id ORDER BY id LIMIT :limit"),
+            {"id": last, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        updates = [{"id": bookmark_id, "simhash": signature} for bookmark_id, title, description in rows
+                   if (signature := simhash(title, description)) is not None]
+        if updates:
+            connection.execute(sa.text("UPDATE bookmark SET simhash = :simhash WHERE id = :id"), updates)
+        last = rows[-1][0]
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS bookmark_simhash_ad")
+    op.execute("DROP TRIGGER IF EXISTS bookmark_simhash_au")
+    op.execute("DROP TRIGGER IF EXISTS bookmark_simhash_ai")
+    op.drop_table("simhash_band")
+    # plain ALTER TABLE - a batch rebuild of bookmark would drop its triggers
+    op.drop_column("bookmark", "simhash")
@@ -0,0 +1,34 @@
+"""normalize bookmark created_at to microsecond text
+
+Revision ID: 7bd5110efdd6
+Revises: 671e031f4daa
+Create Date: 2026-10-20 10:12:48.530117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7bd5110efdd6'
+down_revision: Union[str, Sequence[str], None] = '671e031f4daa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # rows saved through the server default hold CURRENT_TIMESTAMP's
+    # "YYYY-MM-DD HH:MM:SS"; keyset cursors compare created_at as text against
+    # SQLAlchemy's "YYYY-MM-DD HH:MM:SS.ffffff". The column default is set by
+    # the app from now on - changing server_default would rebuild bookmark
+    # and drop its triggers.
+    op.execute("UPDATE bookmark SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # both formats read back as the same datetime - nothing to undo
+    pass
@@ -0,0 +1,32 @@
+"""add keyset pagination indexes
+
+Revision ID: 80a6ea22f04b
+Revises: d806539081a2
+Create Date: 2026-10-18 21:03:52.174603
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '80a6ea22f04b'
+down_revision: Union[str, Sequence[str], None] = 'd806539081a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_bookmark_owner_id_created_at_id", "bookmark", ["owner_id", "created_at", "id"])
+    op.create_index("ix_bookmark_owner_id_title_id", "bookmark", ["owner_id", "title", "id"])
+    op.create_index("ix_bookmark_owner_id_favorite_id", "bookmark", ["owner_id", "favorite", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_bookmark_owner_id_favorite_id", table_name="bookmark")
+    op.drop_index("ix_bookmark_owner_id_title_id", table_name="bookmark")
+    op.drop_index("ix_bookmark_owner_id_created_at_id", table_name="bookmark")
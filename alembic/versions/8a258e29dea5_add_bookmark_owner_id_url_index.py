@@ -0,0 +1,28 @@
+"""add bookmark owner_id url index
+
+Revision ID: 8a258e29dea5
+Revises: 39518f84e950
+Create Date: 2026-10-18 23:12:05.518342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a258e29dea5'
+down_revision: Union[str, Sequence[str], None] = '39518f84e950'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_bookmark_owner_id_url", "bookmark", ["owner_id", "url"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_bookmark_owner_id_url", table_name="bookmark")
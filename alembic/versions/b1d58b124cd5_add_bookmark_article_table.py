@@ -0,0 +1,53 @@
+"""add bookmark_article table
+
+Revision ID: b1d58b124cd5
+Revises: 77a6efe59f3f
+Create Date: 2026-10-19 09:41:12.582630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1d58b124cd5'
+down_revision: Union[str, Sequence[str], None] = '77a6efe59f3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "bookmark_article",
+        sa.Column("bookmark_id", sa.Integer(), nullable=False),
+        sa.Column("word_count", sa.Integer(), nullable=False),
+        sa.Column("reading_time", sa.Integer(), nullable=False),
+        sa.Column("language", sa.String(), nullable=True),
+        sa.Column("content", sa.LargeBinary(), nullable=True),
+        sa.Column("extracted_at", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["bookmark_id"], ["bookmark.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("bookmark_id"),
+    )
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS bookmark_article_au AFTER UPDATE OF url ON bookmark
+        WHEN new.url IS NOT old.url BEGIN
+            DELETE FROM bookmark_article WHERE bookmark_id = old.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS bookmark_article_ad AFTER DELETE ON bookmark BEGIN
+            DELETE FROM bookmark_article WHERE bookmark_id = old.id;
+        END
+    """)
+    # existing bookmarks are not extracted here - the extractor queues the
+    # ones without an article when the app starts
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS bookmark_article_ad")
+    op.execute("DROP TRIGGER IF EXISTS bookmark_article_au")
+    op.drop_table("bookmark_article")
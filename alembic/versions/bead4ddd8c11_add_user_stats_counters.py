@@ -0,0 +1,45 @@
+"""add user_stats counters
+
+Revision ID: bead4ddd8c11
+Revises: 80a6ea22f04b
+Create Date: 2026-10-18 21:47:05.331982
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bead4ddd8c11'
+down_revision: Union[str, Sequence[str], None] = '80a6ea22f04b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "user_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("bookmark_count", sa.Integer(), nullable=False),
+        sa.Column("favorite_count", sa.Integer(), nullable=False),
+        sa.Column("tagged_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.execute("""
+        INSERT INTO user_stats(user_id, bookmark_count, favorite_count, tagged_count)
+        SELECT owner_id,
+               count(*),
+               coalesce(sum(CASE WHEN favorite THEN 1 ELSE 0 END), 0),
+               coalesce(sum(CASE WHEN json_array_length(tags) > 0 THEN 1 ELSE 0 END), 0)
+        FROM bookmark
+        GROUP BY owner_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("user_stats")
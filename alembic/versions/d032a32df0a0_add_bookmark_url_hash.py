@@ -0,0 +1,64 @@
+"""add bookmark url_hash
+
+Revision ID: d032a32df0a0
+Revises: 520568de0078
+Create Date: 2026-10-19 00:41:12.880913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.urls import url_hash
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd032a32df0a0'
+down_revision: Union[str, Sequence[str], None] = '520568de0078'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("bookmark", sa.Column("url_hash", sa.LargeBinary(16), nullable=True))
+
+    # backfill in (owner_id, id) order; the oldest bookmark of a canonical URL
+    # gets the hash, later duplicates stay NULL for GET /bookmarks/duplicates
+    connection = op.get_bind()
+    last = (0, 0)
+    seen_owner, seen = None, set()
+    while True:
+        rows = connection.execute(sa.text(
+            "SELECT owner_id, id, url FROM bookmark "
+            "WHERE (owner_id, id) > (:owner_id, :id) "
+            "ORDER BY owner_id, id LIMIT :limit"),
+            {"owner_id": last[0], "id": last[1], "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        updates = []
+        for owner_id, bookmark_id, url in rows:
+            if owner_id != seen_owner:
+                seen_owner, seen = owner_id, set()
+            digest = url_hash(url)
+            if digest not in seen:
+                seen.add(digest)
+                updates.append({"id": bookmark_id, "url_hash": digest})
+        if updates:
+            connection.execute(sa.text("UPDATE bookmark SET url_hash = :url_hash WHERE id = :id"), updates)
+        last = tuple(rows[-1][:2])
+
+    op.create_index("ix_bookmark_owner_id_url_hash", "bookmark", ["owner_id", "url_hash"], unique=True)
+    # the import's duplicate check runs on url_hash now
+    op.drop_index("ix_bookmark_owner_id_url", table_name="bookmark")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_bookmark_owner_id_url", "bookmark", ["owner_id", "url"])
+    op.drop_index("ix_bookmark_owner_id_url_hash", table_name="bookmark")
+    # plain ALTER TABLE - a batch rebuild of bookmark would drop its triggers
+    op.drop_column("bookmark", "url_hash")
@@ -0,0 +1,60 @@
+"""add bookmark fts index
+
+Revision ID: d1091b717406
+Revises: 0bb33377cf88
+Create Date: 2026-10-18 19:02:11.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1091b717406'
+down_revision: Union[str, Sequence[str], None] = '0bb33377cf88'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS bookmark_fts USING fts5(
+            title, description, tags, url, owner_id,
+            content='bookmark',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2')
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS bookmark_fts_ai AFTER INSERT ON bookmark BEGIN
+            INSERT INTO bookmark_fts(rowid, title, description, tags, url, owner_id)
+            VALUES (new.id, new.title, new.description, new.tags, new.url, new.owner_id);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS bookmark_fts_ad AFTER DELETE ON bookmark BEGIN
+            INSERT INTO bookmark_fts(bookmark_fts, rowid, title, description, tags, url, owner_id)
+            VALUES ('delete', old.id, old.title, old.description, old.tags, old.url, old.owner_id);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS bookmark_fts_au
+            AFTER UPDATE OF title, description, tags, url, owner_id ON bookmark BEGIN
+            INSERT INTO bookmark_fts(bookmark_fts, rowid, title, description, tags, url, owner_id)
+            VALUES ('delete', old.id, old.title, old.description, old.tags, old.url, old.owner_id);
+            INSERT INTO bookmark_fts(rowid, title, description, tags, url, owner_id)
+            VALUES (new.id, new.title, new.description, new.tags, new.url, new.owner_id);
+        END
+    """)
+    # index the rows that already exist
+    op.execute("INSERT INTO bookmark_fts(bookmark_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS bookmark_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS bookmark_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS bookmark_fts_ai")
+    op.execute("DROP TABLE IF EXISTS bookmark_fts")
@@ -0,0 +1,91 @@
+"""add tag and bookmark_tag tables
+
+Revision ID: d806539081a2
+Revises: d1091b717406
+Create Date: 2026-10-18 20:14:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd806539081a2'
+down_revision: Union[str, Sequence[str], None] = 'd1091b717406'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INSERT_LINKS = """
+        INSERT OR IGNORE INTO tag(owner_id, name)
+        SELECT new.owner_id, value FROM json_each(new.tags) WHERE type = 'text';
+        INSERT OR IGNORE INTO bookmark_tag(bookmark_id, tag_id)
+        SELECT new.id, tag.id FROM json_each(new.tags)
+        JOIN tag ON tag.owner_id = new.owner_id AND tag.name = json_each.value
+        WHERE json_each.type = 'text';"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "tag",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_tag_owner_id_name", "tag", ["owner_id", "name"], unique=True)
+
+    op.create_table(
+        "bookmark_tag",
+        sa.Column("bookmark_id", sa.Integer(), nullable=False),
+        sa.Column("tag_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["bookmark_id"], ["bookmark.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["tag_id"], ["tag.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("bookmark_id", "tag_id"),
+    )
+    op.create_index("ix_bookmark_tag_tag_id_bookmark_id", "bookmark_tag", ["tag_id", "bookmark_id"])
+
+    # move the existing JSON tags into the new tables
+    op.execute("""
+        INSERT OR IGNORE INTO tag(owner_id, name)
+        SELECT DISTINCT bookmark.owner_id, json_each.value
+        FROM bookmark, json_each(bookmark.tags)
+        WHERE json_valid(bookmark.tags) AND json_each.type = 'text'
+    """)
+    op.execute("""
+        INSERT OR IGNORE INTO bookmark_tag(bookmark_id, tag_id)
+        SELECT bookmark.id, tag.id
+        FROM bookmark, json_each(bookmark.tags)
+        JOIN tag ON tag.owner_id = bookmark.owner_id AND tag.name = json_each.value
+        WHERE json_valid(bookmark.tags) AND json_each.type = 'text'
+    """)
+
+    op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS bookmark_tag_ai AFTER INSERT ON bookmark BEGIN{INSERT_LINKS}
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS bookmark_tag_au AFTER UPDATE OF tags, owner_id ON bookmark BEGIN
+            DELETE FROM bookmark_tag WHERE bookmark_id = old.id;{INSERT_LINKS}
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS bookmark_tag_ad AFTER DELETE ON bookmark BEGIN
+            DELETE FROM bookmark_tag WHERE bookmark_id = old.id;
+        END
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS bookmark_tag_ad")
+    op.execute("DROP TRIGGER IF EXISTS bookmark_tag_au")
+    op.execute("DROP TRIGGER IF EXISTS bookmark_tag_ai")
+    op.drop_index("ix_bookmark_tag_tag_id_bookmark_id", table_name="bookmark_tag")
+    op.drop_table("bookmark_tag")
+    op.drop_index("ix_tag_owner_id_name", table_name="tag")
+    op.drop_table("tag")
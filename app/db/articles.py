@@ -0,0 +1,57 @@
+"""bookmark_article - the extracted text of a bookmark's page.
+
+The text is kilobytes per bookmark even compressed, so it lives in a side
+table of its own: bookmark rows stay small and the list endpoints, which read
+only bookmark, never page it in. GET /bookmarks/{id}/article is its one
+reader. Triggers drop the article together with its bookmark, and when the
+bookmark's url changes.
+"""
+from sqlalchemy import DDL, event, func, literal, select
+from sqlalchemy.dialects.sqlite import insert
+
+from .models import Bookmark, BookmarkArticle
+
+
+ARTICLE_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS bookmark_article_au AFTER UPDATE OF url ON bookmark
+    WHEN new.url IS NOT old.url BEGIN
+        DELETE FROM bookmark_article WHERE bookmark_id = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bookmark_article_ad AFTER DELETE ON bookmark BEGIN
+        DELETE FROM bookmark_article WHERE bookmark_id = old.id;
+    END""",
+]
+
+for statement in ARTICLE_DDL:
+    event.listen(BookmarkArticle.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+
+def save_article_statement(bookmark_id: int, url: str, article):
+    """Upsert of the extraction result (an ExtractedArticle or None). Written
+    only while the bookmark still exists with the url that was fetched - it
+    may have been deleted or edited in the meantime."""
+    values = {"word_count": article.word_count if article else 0,
+              "reading_time": article.reading_time if article else 0,
+              "language": article.language if article else None,
+              "content": article.content if article else None}
+    statement = insert(BookmarkArticle).from_select(
+        ["bookmark_id", *values],
+        select(Bookmark.id, *(literal(value, BookmarkArticle.__table__.c[name].type).label(name)
+                              for name, value in values.items()))
+        .where(Bookmark.id == bookmark_id, Bookmark.url == url))
+    return statement.on_conflict_do_update(index_elements=["bookmark_id"],
+                                           set_={**{name: statement.excluded[name] for name in values},
+                                                 "extracted_at": func.now()})
+
+
+def article_statement(owner_id: int, bookmark_id: int):
+    """The owner's bookmark with its article columns, NULL when there is no
+    article (yet)."""
+    return (select(Bookmark.id.label("bookmark_id"),
+                   BookmarkArticle.word_count,
+                   BookmarkArticle.reading_time,
+                   BookmarkArticle.language,
+                   BookmarkArticle.content,
+                   BookmarkArticle.extracted_at)
+            .outerjoin(BookmarkArticle, BookmarkArticle.bookmark_id == Bookmark.id)
+            .where(Bookmark.id == bookmark_id, Bookmark.owner_id == owner_id))
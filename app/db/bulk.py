@@ -0,0 +1,106 @@
+"""Set-based bulk operations on a user's bookmarks.
+
+Every operation is one owner-scoped UPDATE or DELETE over the target rows
+(a list of ids or a filter), with counter deltas taken from RETURNING, instead
+of a SELECT + ORM mutation per bookmark. The caller commits.
+"""
+import json
+from typing import List
+from sqlalchemy import and_, bindparam, delete, false, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .counters import adjust_counters
+from .models import Bookmark
+from .tags import tagged_with_all, tagged_with_any
+
+
+def bulk_target(owner_id: int,
+                ids: List[int] | None = None,
+                tag: str | None = None,
+                tags_all: List[str] | None = None,
+                favorite: bool | None = None):
+    """WHERE clause for the owner's bookmarks picked by ids or by a filter."""
+    conditions = [Bookmark.owner_id == owner_id]
+    if ids is not None:
+        conditions.append(Bookmark.id.in_(ids))
+    if tag is not None:
+        conditions.append(Bookmark.id.in_(tagged_with_any(owner_id, [tag])))
+    if tags_all:
+        conditions.append(Bookmark.id.in_(tagged_with_all(owner_id, tags_all)))
+    if favorite is not None:
+        conditions.append(_is_favorite() if favorite else ~_is_favorite())
+    return and_(*conditions)
+
+
+def _is_favorite():
+    # legacy rows may hold NULL, which counts as not favorite
+    return func.coalesce(Bookmark.favorite, false())
+
+
+def _is_tagged():
+    return func.coalesce(func.json_array_length(Bookmark.tags), 0) > 0
+
+
+async def bulk_delete(db: AsyncSession, owner_id: int, target) -> int:
+    result = await db.execute(delete(Bookmark)
+                              .where(target)
+                              .returning(_is_favorite(), _is_tagged()))
+    rows = result.all()
+    await adjust_counters(db, owner_id,
+                          bookmarks=-len(rows),
+                          favorites=-sum(favorite for favorite, _ in rows),
+                          tagged=-sum(tagged for _, tagged in rows))
+    return len(rows)
+
+
+async def bulk_set_favorite(db: AsyncSession, owner_id: int, target, favorite: bool) -> int:
+    changed = ~_is_favorite() if favorite else _is_favorite()
+    result = await db.execute(update(Bookmark)
+                              .where(target, changed)
+                              .values(favorite=favorite))
+    await adjust_counters(db, owner_id, favorites=result.rowcount if favorite else -result.rowcount)
+    return result.rowcount
+
+
+# NULL and JSON null (what the ORM writes for tags=None) both mean no tags
+_OLD_TAGS = "iif(json_type(bookmark.tags) = 'array', bookmark.tags, '[]')"
+
+# new tags = (old tags - removed) + added ones that aren't there yet, in order
+_RETAGGED = f"""(
+    SELECT nullif(json_group_array(value), '[]') FROM (
+        SELECT 0 AS part, key, value FROM json_each({_OLD_TAGS})
+        WHERE value NOT IN (SELECT value FROM json_each(:removed))
+        UNION ALL
+        SELECT 1 AS part, key, value FROM json_each(:added)
+        WHERE value NOT IN (SELECT value FROM json_each({_OLD_TAGS}))
+        ORDER BY part, key))"""
+
+_RETAG_CHANGES = f"""(
+    EXISTS (SELECT 1 FROM json_each({_OLD_TAGS})
+            WHERE value IN (SELECT value FROM json_each(:removed)))
+    OR EXISTS (SELECT 1 FROM json_each(:added)
+               WHERE value NOT IN (SELECT value FROM json_each({_OLD_TAGS}))))"""
+
+
+async def bulk_retag(db: AsyncSession,
+                     owner_id: int,
+                     target,
+                     add: List[str] = (),
+                     remove: List[str] = ()) -> int:
+    """Add and/or remove tags on every target row (a "move" does both)."""
+    added = list(dict.fromkeys(add))
+    removed = [tag for tag in dict.fromkeys(remove) if tag not in added]
+    params = (bindparam("added", json.dumps(added)), bindparam("removed", json.dumps(removed)))
+    changes = text(_RETAG_CHANGES).bindparams(*params)
+
+    # tagged state before and after, only of the rows that actually change
+    tagged_before = (await db.execute(select(func.count())
+                                      .select_from(Bookmark)
+                                      .where(target, changes, _is_tagged()))).scalar_one()
+    result = await db.execute(update(Bookmark)
+                              .where(target, changes)
+                              .values(tags=text(_RETAGGED).bindparams(*params))
+                              .returning(_is_tagged()))
+    tagged_after = result.scalars().all()
+    await adjust_counters(db, owner_id, tagged=sum(tagged_after) - tagged_before)
+    return len(tagged_after)
@@ -0,0 +1,140 @@
+"""Per-user bookmark counters.
+
+One user_stats row per user replaces a COUNT(*) over all of the user's
+bookmarks on every listing. Writers adjust it in the same transaction as the
+bookmark change; a missing row is rebuilt from the bookmark table on first use,
+and `python -m app.db.counters` repairs any drift.
+"""
+import argparse
+import asyncio
+from typing import Iterable
+from sqlalchemy import case, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Bookmark, UserStats
+
+
+def is_tagged(tags) -> bool:
+    return bool(tags)
+
+
+def _counts_statement():
+    tagged = case((func.json_array_length(Bookmark.tags) > 0, 1), else_=0)
+    return select(Bookmark.owner_id,
+                  func.count().label("bookmark_count"),
+                  func.coalesce(func.sum(case((Bookmark.favorite, 1), else_=0)), 0).label("favorite_count"),
+                  func.coalesce(func.sum(tagged), 0).label("tagged_count"))
+
+
+def _upsert(rows: Iterable[dict]):
+    stmt = insert(UserStats).values(list(rows))
+    return stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={"bookmark_count": stmt.excluded.bookmark_count,
+              "favorite_count": stmt.excluded.favorite_count,
+              "tagged_count": stmt.excluded.tagged_count})
+
+
+async def recount(db: AsyncSession, user_id: int) -> UserStats:
+    """Rebuild one user's counters from the bookmark table (no commit)."""
+    result = await db.execute(_counts_statement().where(Bookmark.owner_id == user_id))
+    _, bookmark_count, favorite_count, tagged_count = result.one()
+    row = {"user_id": user_id,
+           "bookmark_count": bookmark_count,
+           "favorite_count": favorite_count,
+           "tagged_count": tagged_count}
+    await db.execute(_upsert([row]))
+    return UserStats(**row)
+
+
+_STATS_COLUMNS = (UserStats.user_id, UserStats.bookmark_count, UserStats.favorite_count, UserStats.tagged_count)
+
+
+async def get_counters(db: AsyncSession, user_id: int, save: bool = True):
+    """save=False on read-only sessions: a missing row is counted but not
+    stored, the user's next write creates it."""
+    # plain columns, not entities - the row is updated by core statements and
+    # must never be served stale from the session's identity map
+    result = await db.execute(select(*_STATS_COLUMNS).where(UserStats.user_id == user_id))
+    stats = result.one_or_none()
+    if stats is None and not save:
+        result = await db.execute(_counts_statement().where(Bookmark.owner_id == user_id))
+        _, bookmark_count, favorite_count, tagged_count = result.one()
+        return UserStats(user_id=user_id,
+                         bookmark_count=bookmark_count,
+                         favorite_count=favorite_count,
+                         tagged_count=tagged_count)
+    if stats is None:
+        stats = await recount(db, user_id)
+        await db.commit()
+    return stats
+
+
+async def adjust_counters(db: AsyncSession,
+                          user_id: int,
+                          bookmarks: int = 0,
+                          favorites: int = 0,
+                          tagged: int = 0):
+    """Apply deltas inside the caller's transaction.
+
+    Call after the bookmark change has been flushed: when the user has no row
+    yet it is built from the table, which already includes the change.
+    """
+    if not (bookmarks or favorites or tagged):
+        return
+    result = await db.execute(
+        update(UserStats)
+        .where(UserStats.user_id == user_id)
+        .values(bookmark_count=UserStats.bookmark_count + bookmarks,
+                favorite_count=UserStats.favorite_count + favorites,
+                tagged_count=UserStats.tagged_count + tagged))
+    if result.rowcount == 0:
+        await recount(db, user_id)
+
+
+async def reconcile_counters(db: AsyncSession, user_id: int | None = None) -> int:
+    """Recompute counters from the bookmark table and fix any drift.
+
+    Returns the number of users whose stored counters were wrong.
+    """
+    stmt = _counts_statement().group_by(Bookmark.owner_id)
+    if user_id is not None:
+        stmt = stmt.where(Bookmark.owner_id == user_id)
+    actual = {row.owner_id: (row.bookmark_count, row.favorite_count, row.tagged_count)
+              for row in (await db.execute(stmt)).all()}
+
+    stored_stmt = select(*_STATS_COLUMNS)
+    if user_id is not None:
+        stored_stmt = stored_stmt.where(UserStats.user_id == user_id)
+    stored = {stats.user_id: (stats.bookmark_count, stats.favorite_count, stats.tagged_count)
+              for stats in (await db.execute(stored_stmt)).all()}
+
+    # users whose last bookmark is gone still need their row zeroed
+    for stored_user_id in stored.keys() - actual.keys():
+        actual[stored_user_id] = (0, 0, 0)
+
+    drifted = [{"user_id": owner_id,
+                "bookmark_count": counts[0],
+                "favorite_count": counts[1],
+                "tagged_count": counts[2]}
+               for owner_id, counts in actual.items() if stored.get(owner_id) != counts]
+    for start in range(0, len(drifted), 500):
+        await db.execute(_upsert(drifted[start:start + 500]))
+    await db.commit()
+    return len(drifted)
+
+
+async def _main(user_id: int | None):
+    from .database import SessionLocal
+
+    async with SessionLocal() as session:
+        fixed = await reconcile_counters(session, user_id)
+    print(f"Reconciled bookmark counters, {fixed} user(s) repaired.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Repair drifted per-user bookmark counters.")
+    parser.add_argument("--user-id", type=int, default=None, help="only reconcile this user")
+    args = parser.parse_args()
+    asyncio.run(_main(args.user_id))
@@ -1,17 +1,93 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import DeclarativeBase
 from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 import os
 
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL")
+SQLALCHEMY_ECHO = os.getenv("SQLALCHEMY_ECHO", "false").lower() in ("1", "true", "yes")
 
-engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL,
-    echo=True)
+# === SQLITE PROFILE ===
+# PRAGMAs run on every new connection. Any of them can be overridden with
+# SQLITE_<NAME>, e.g. SQLITE_MMAP_SIZE=0.
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+SQLITE_PROFILES = {
+    # sqlite3 out of the box - rollback journal, a reader waits for a writer
+    "default": {},
+    # readers never block the writer nor each other; a commit only fsyncs at
+    # checkpoints, which can lose the last transactions on power loss but
+    # never corrupts the file
+    "production": {"journal_mode": "WAL",
+                   "synchronous": "NORMAL",
+                   "mmap_size": 256 * 1024 * 1024,
+                   "cache_size": -64 * 1024,  # KiB, i.e. 64 MiB per connection
+                   "busy_timeout": 5000},
+}
+SQLITE_PRAGMAS = ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout")
+
+# one writer connection - writes queue on the pool instead of fighting over
+# the database lock; readers get a pool of their own
+DATABASE_WRITE_POOL_SIZE = int(os.getenv("DATABASE_WRITE_POOL_SIZE", "1"))
+DATABASE_READ_POOL_SIZE = int(os.getenv("DATABASE_READ_POOL_SIZE", "8"))
+
+
+def sqlite_pragmas(profile: str = SQLITE_PROFILE) -> dict:
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in SQLITE_PRAGMAS:
+        value = os.getenv(f"SQLITE_{name.upper()}")
+        if value is not None:
+            pragmas[name] = value
+    return pragmas
+
+
+def apply_pragmas(engine: AsyncEngine, pragmas: dict, query_only: bool = False):
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = {**pragmas, "query_only": "ON"} if query_only else pragmas
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def is_memory_database(url: str) -> bool:
+    database = make_url(url).database
+    return not database or ":memory:" in database or "mode=memory" in database
+
+
+def create_engines(url: str,
+                   profile: str = SQLITE_PROFILE,
+                   echo: bool = SQLALCHEMY_ECHO,
+                   write_pool_size: int = DATABASE_WRITE_POOL_SIZE,
+                   read_pool_size: int = DATABASE_READ_POOL_SIZE) -> tuple[AsyncEngine, AsyncEngine]:
+    """(write engine, read engine).
+
+    An in-memory database lives and dies with its connection, so there both
+    are one and the same engine.
+    """
+    pragmas = sqlite_pragmas(profile)
+    if is_memory_database(url):
+        write_engine = create_async_engine(url, echo=echo)
+        apply_pragmas(write_engine, pragmas)
+        return write_engine, write_engine
+
+    write_engine = create_async_engine(url, echo=echo, pool_size=write_pool_size, max_overflow=0)
+    apply_pragmas(write_engine, pragmas)
+    read_engine = create_async_engine(url, echo=echo, pool_size=read_pool_size, max_overflow=0)
+    apply_pragmas(read_engine, pragmas, query_only=True)
+    return write_engine, read_engine
+
+
+engine, read_engine = create_engines(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = async_sessionmaker(autoflush=False, bind=engine, class_=AsyncSession)
+ReadSessionLocal = async_sessionmaker(autoflush=False, bind=read_engine, class_=AsyncSession)
 
 class Base(DeclarativeBase):
     pass
@@ -19,3 +95,12 @@ class Base(DeclarativeBase):
 async def get_db():
     async with SessionLocal() as session:
         yield session
+
+async def get_read_db():
+    # GET routes - a query_only connection from the reader pool
+    async with ReadSessionLocal() as session:
+        yield session
+
+def get_read_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    # for streaming responses - they outlive the get_read_db() session
+    return ReadSessionLocal
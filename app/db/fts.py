@@ -0,0 +1,88 @@
+import re
+from sqlalchemy import DDL, Integer, event, func, literal_column, select
+from sqlalchemy.sql import column, table
+
+from .models import Bookmark
+
+
+# External-content FTS5 index over the bookmark table. The rows live only in
+# "bookmark", the index keeps just the tokens and is synced by triggers, so
+# every write path (ORM, bulk statements, raw SQL) stays consistent.
+# owner_id is indexed as a token so a user's matches are found by intersecting
+# doclists instead of filtering every match across all users.
+FTS_TABLE = "bookmark_fts"
+FTS_COLUMNS = ("title", "description", "tags", "url", "owner_id")
+SEARCH_COLUMNS = ("title", "description", "tags", "url")
+
+# bm25 weights in FTS_COLUMNS order - owner_id never contributes to ranking
+RANK_WEIGHTS = (10.0, 5.0, 3.0, 1.0, 0.0)
+
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, tags, url, owner_id,
+        content='bookmark',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS bookmark_fts_ai AFTER INSERT ON bookmark BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, tags, url, owner_id)
+        VALUES (new.id, new.title, new.description, new.tags, new.url, new.owner_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS bookmark_fts_ad AFTER DELETE ON bookmark BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags, url, owner_id)
+        VALUES ('delete', old.id, old.title, old.description, old.tags, old.url, old.owner_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS bookmark_fts_au
+        AFTER UPDATE OF title, description, tags, url, owner_id ON bookmark BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags, url, owner_id)
+        VALUES ('delete', old.id, old.title, old.description, old.tags, old.url, old.owner_id);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, tags, url, owner_id)
+        VALUES (new.id, new.title, new.description, new.tags, new.url, new.owner_id);
+    END""",
+]
+
+for statement in FTS_DDL:
+    event.listen(Bookmark.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Bookmark.__table__, "before_drop",
+             DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"))
+
+
+bookmark_fts = table(FTS_TABLE, column("rowid", Integer))
+_fts = literal_column(FTS_TABLE)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_expression(query: str, owner_id: int, prefix: bool = False) -> str | None:
+    """Turn free text into a safe FTS5 MATCH expression scoped to one owner.
+
+    Every word becomes a quoted term, so FTS5 operators typed by the user are
+    treated as plain text. With prefix=True the last word is a prefix query
+    (search as you type); prefix terms can't seek through the doclists, so they
+    are noticeably slower on large tables and stay opt-in.
+    Returns None when there is nothing to search.
+    """
+    terms = [f'"{token}"' for token in _TOKEN_RE.findall(query)]
+    if not terms:
+        return None
+    if prefix:
+        terms[-1] += "*"
+    columns = " ".join(SEARCH_COLUMNS)
+    return f'owner_id : "{int(owner_id)}" AND {{{columns}}} : ({" ".join(terms)})'
+
+
+def search_statement(query: str, owner_id: int, skip: int = 0, limit: int = 10, prefix: bool = False):
+    match = build_match_expression(query, owner_id, prefix=prefix)
+    if match is None:
+        return None
+
+    rank = func.bm25(_fts, *RANK_WEIGHTS).label("rank")
+    title_highlight = func.highlight(_fts, 0, "<mark>", "</mark>").label("title_highlight")
+    snippet = func.snippet(_fts, 1, "<mark>", "</mark>", "…", 16).label("snippet")
+
+    return (select(Bookmark, rank, title_highlight, snippet)
+            .join(bookmark_fts, bookmark_fts.c.rowid == Bookmark.id)
+            .where(_fts.op("MATCH")(match),
+                   Bookmark.owner_id == owner_id)
+            .order_by(rank, Bookmark.id)
+            .offset(skip)
+            .limit(limit))
@@ -1,8 +1,10 @@
 from typing import List
 from .database import Base
-from sqlalchemy import String, Boolean, DateTime, ForeignKey, Integer, JSON, func
+from sqlalchemy import String, Boolean, DateTime, ForeignKey, Integer, JSON, Index, LargeBinary, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from datetime import datetime
+from datetime import datetime, timezone
+
+from ..utils.urls import url_hash
 
 
 class User(Base):
@@ -21,25 +23,124 @@ class User(Base):
         cascade="all, delete-orphan") 
     
 
+def _default_url_hash(context):
+    return url_hash(context.get_current_parameters()["url"])
+
+
+def _default_created_at():
+    # naive UTC, bound by SQLAlchemy as "YYYY-MM-DD HH:MM:SS.ffffff" like every
+    # other datetime - CURRENT_TIMESTAMP's "YYYY-MM-DD HH:MM:SS" would compare
+    # as text against keyset cursors on the wrong side within the same second
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class Bookmark(Base):
     __tablename__ = "bookmark"
+    __table_args__ = (
+        # keyset pagination - one index per sort order, id as the tie-breaker
+        Index("ix_bookmark_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_bookmark_owner_id_title_id", "owner_id", "title", "id"),
+        Index("ix_bookmark_owner_id_favorite_id", "owner_id", "favorite", "id"),
+        # one bookmark per canonical URL; legacy duplicates keep a NULL hash
+        Index("ix_bookmark_owner_id_url_hash", "owner_id", "url_hash", unique=True),
+        # max(updated_at) of the list ETag
+        Index("ix_bookmark_owner_id_updated_at", "owner_id", "updated_at"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String, nullable=False)
     url: Mapped[str] = mapped_column(String, nullable=False)
+    # set on insert; writers that change url must set it too
+    url_hash: Mapped[bytes | None] = mapped_column(LargeBinary(16), nullable=True, default=_default_url_hash)
     favorite: Mapped[bool] = mapped_column(Boolean, default=False)
     description: Mapped[str | None] = mapped_column(String, nullable=True)
     tags: Mapped[List[str] | None] = mapped_column(JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, 
+                                                 default=_default_created_at,
                                                  server_default=func.now(),
                                                  nullable=True)
+    # milliseconds, not CURRENT_TIMESTAMP's seconds - two edits within one
+    # second must not end up with the same ETag
     updated_at: Mapped[datetime] = mapped_column(DateTime,
                                                 server_default=func.now(),
-                                                onupdate=func.now(),
+                                                onupdate=func.strftime("%Y-%m-%d %H:%M:%f", "now"),
                                                 nullable=True)
     favicon_url: Mapped[str | None] = mapped_column(String, nullable=True)
+    # the icon in the local store, served at /favicons/<hash> - see utils/favicons.py
+    favicon_hash: Mapped[str | None] = mapped_column(String, nullable=True)
+    # SimHash of the scraped page, set by enrichment - see db/simhash.py
+    simhash: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    enrichment_status: Mapped[str] = mapped_column(String, 
+                                                   nullable=False,
+                                                   default="done",
+                                                   server_default="done")
     
     
     # --- RELATIONS ---
     owner_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id", ondelete="CASCADE"))
     owner:  Mapped["User"] = relationship(back_populates="bookmarks")
+    
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+    
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    bookmark_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    favorite_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tagged_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    
+
+class Tag(Base):
+    __tablename__ = "tag"
+    __table_args__ = (
+        Index("ix_tag_owner_id_name", "owner_id", "name", unique=True),
+    )
+    
+    id: Mapped[int] = mapped_column(primary_key=True)
+    owner_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    
+
+class BookmarkTag(Base):
+    __tablename__ = "bookmark_tag"
+    __table_args__ = (
+        Index("ix_bookmark_tag_tag_id_bookmark_id", "tag_id", "bookmark_id"),
+    )
+    
+    bookmark_id: Mapped[int] = mapped_column(Integer, ForeignKey("bookmark.id", ondelete="CASCADE"), primary_key=True)
+    tag_id: Mapped[int] = mapped_column(Integer, ForeignKey("tag.id", ondelete="CASCADE"), primary_key=True)
+
+
+class SimhashBand(Base):
+    """LSH banding index of Bookmark.simhash, filled by triggers. WITHOUT
+    ROWID with a copy of the signature - lookups never touch bookmark."""
+    __tablename__ = "simhash_band"
+    __table_args__ = {"sqlite_with_rowid": False}
+    
+    owner_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    band_key: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bookmark_id: Mapped[int] = mapped_column(Integer, ForeignKey("bookmark.id", ondelete="CASCADE"), primary_key=True)
+    simhash: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class BookmarkArticle(Base):
+    """Extracted article text of a bookmarked page - see db/articles.py."""
+    __tablename__ = "bookmark_article"
+    
+    bookmark_id: Mapped[int] = mapped_column(Integer, ForeignKey("bookmark.id", ondelete="CASCADE"), primary_key=True)
+    word_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    reading_time: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # minutes
+    language: Mapped[str | None] = mapped_column(String, nullable=True)
+    # zlib compressed UTF-8; NULL - the page couldn't be fetched or had no article
+    content: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    extracted_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=True)
+
+
+class Favicon(Base):
+    """Icon of each domain in the favicon store, so it is downloaded once."""
+    __tablename__ = "favicon"
+    
+    domain: Mapped[str] = mapped_column(String, primary_key=True)
+    # NULL - the domain has no usable icon
+    hash: Mapped[str | None] = mapped_column(String, nullable=True)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
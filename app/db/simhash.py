@@ -0,0 +1,128 @@
+"""Near-duplicate lookup over Bookmark.simhash with LSH banding.
+
+The 64-bit signature is cut into SIMHASH_BANDS bands of 16 bits. Each band
+becomes one simhash_band row keyed (owner_id, band_key, bookmark_id), where
+band_key = band number << 16 | band bits. Two signatures at most
+SIMHASH_BANDS - 1 bits apart have at least one band in common (pigeonhole).
+So every pair within SIMHASH_DISTANCE shares a band_key, and the candidates
+are a few primary-key seeks instead of a scan of all of the user's
+signatures. The rows carry the signature too, so neither lookup reads the
+bookmark table. Triggers keep them in sync, the same way as bookmark_tag.
+"""
+from itertools import groupby
+from operator import itemgetter
+from sqlalchemy import DDL, event, func, select
+
+from .models import SimhashBand
+from ..utils.simhash import hamming_distance
+
+
+SIMHASH_BANDS = 4
+BAND_BITS = 16
+SIMHASH_DISTANCE = SIMHASH_BANDS - 1
+# a bucket with more distinct signatures than this is a common boilerplate
+# page (login walls, error pages) - its members are not compared pairwise
+BUCKET_LIMIT = 200
+
+_BAND_NUMBERS = "json_each('[" + ",".join(str(band) for band in range(SIMHASH_BANDS)) + "]')"
+
+
+def _band_key_sql(row: str) -> str:
+    return f"(value << {BAND_BITS}) | (({row}.simhash >> ({BAND_BITS} * value)) & {(1 << BAND_BITS) - 1})"
+
+
+_INSERT_BANDS = f"""
+        INSERT OR IGNORE INTO simhash_band(owner_id, band_key, bookmark_id, simhash)
+        SELECT new.owner_id, {_band_key_sql("new")}, new.id, new.simhash FROM {_BAND_NUMBERS}
+        WHERE new.simhash IS NOT NULL;"""
+# every column of the primary key is known from the old row - no index on
+# bookmark_id needed
+_DELETE_BANDS = f"""
+        DELETE FROM simhash_band WHERE owner_id = old.owner_id AND bookmark_id = old.id
+        AND band_key IN (SELECT {_band_key_sql("old")} FROM {_BAND_NUMBERS});"""
+
+SIMHASH_DDL = [
+    f"""CREATE TRIGGER IF NOT EXISTS bookmark_simhash_ai AFTER INSERT ON bookmark BEGIN{_INSERT_BANDS}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS bookmark_simhash_au AFTER UPDATE OF simhash, owner_id ON bookmark BEGIN{_DELETE_BANDS}{_INSERT_BANDS}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS bookmark_simhash_ad AFTER DELETE ON bookmark BEGIN{_DELETE_BANDS}
+    END""",
+]
+
+for statement in SIMHASH_DDL:
+    event.listen(SimhashBand.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+
+def band_keys(signature: int) -> list[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [(band << BAND_BITS) | ((signature >> (BAND_BITS * band)) & mask) for band in range(SIMHASH_BANDS)]
+
+
+def candidates_statement(owner_id: int, signature: int):
+    """(bookmark_id, simhash) of the owner's bookmarks sharing a band with the
+    signature - a bookmark sharing several bands comes up once per band."""
+    return (select(SimhashBand.bookmark_id, SimhashBand.simhash)
+            .where(SimhashBand.owner_id == owner_id,
+                   SimhashBand.band_key.in_(band_keys(signature))))
+
+
+def buckets_statement(owner_id: int):
+    """(band_key, bookmark_id, simhash) of every band bucket holding two or
+    more of the owner's bookmarks, in band_key order - range scans of the
+    primary key only."""
+    shared = (select(SimhashBand.band_key)
+              .where(SimhashBand.owner_id == owner_id)
+              .group_by(SimhashBand.band_key)
+              .having(func.count() > 1))
+    return (select(SimhashBand.band_key, SimhashBand.bookmark_id, SimhashBand.simhash)
+            .where(SimhashBand.owner_id == owner_id,
+                   SimhashBand.band_key.in_(shared))
+            .order_by(SimhashBand.band_key))
+
+
+def near_duplicate_clusters(rows, max_distance: int = SIMHASH_DISTANCE,
+                            bucket_limit: int = BUCKET_LIMIT) -> list[list[int]]:
+    """Union-find over the pairs found within the same band bucket.
+
+    rows come from buckets_statement(). The work is the sum of the squared
+    bucket sizes, not the square of the bookmark count, and identical
+    signatures are joined without comparing them.
+    """
+    parent: dict[int, int] = {}
+
+    def find(item: int) -> int:
+        root = item
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while item != root:
+            parent[item], item = root, parent.get(item, item)
+        return root
+
+    def union(first: int, second: int):
+        parent.setdefault(first, first)
+        parent.setdefault(second, second)
+        first, second = find(first), find(second)
+        if first != second:
+            parent[max(first, second)] = min(first, second)
+
+    for _, bucket in groupby(rows, key=itemgetter(0)):
+        by_signature: dict[int, list[int]] = {}
+        for _, bookmark_id, signature in bucket:
+            by_signature.setdefault(signature, []).append(bookmark_id)
+        for same in by_signature.values():
+            for bookmark_id in same[1:]:
+                union(same[0], bookmark_id)
+        distinct = list(by_signature.items())
+        if len(distinct) > bucket_limit:
+            continue
+        for index, (signature, members) in enumerate(distinct):
+            for other_signature, other_members in distinct[index + 1:]:
+                if hamming_distance(signature, other_signature) <= max_distance:
+                    union(members[0], other_members[0])
+
+    clusters: dict[int, list[int]] = {}
+    for bookmark_id in parent:
+        clusters.setdefault(find(bookmark_id), []).append(bookmark_id)
+    return sorted((sorted(members) for members in clusters.values() if len(members) > 1),
+                  key=lambda members: (-len(members), members[0]))
@@ -0,0 +1,54 @@
+from typing import List
+from sqlalchemy import DDL, event, func, select
+
+from .models import BookmarkTag, Tag
+
+
+# Bookmark.tags stays the denormalized copy returned by the API, the tag and
+# bookmark_tag tables are the indexed form used for filtering and counting.
+# Triggers keep them in sync on every write path, the same way as bookmark_fts.
+_INSERT_LINKS = """
+        INSERT OR IGNORE INTO tag(owner_id, name)
+        SELECT new.owner_id, value FROM json_each(new.tags) WHERE type = 'text';
+        INSERT OR IGNORE INTO bookmark_tag(bookmark_id, tag_id)
+        SELECT new.id, tag.id FROM json_each(new.tags)
+        JOIN tag ON tag.owner_id = new.owner_id AND tag.name = json_each.value
+        WHERE json_each.type = 'text';"""
+
+TAG_DDL = [
+    f"""CREATE TRIGGER IF NOT EXISTS bookmark_tag_ai AFTER INSERT ON bookmark BEGIN{_INSERT_LINKS}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS bookmark_tag_au AFTER UPDATE OF tags, owner_id ON bookmark BEGIN
+        DELETE FROM bookmark_tag WHERE bookmark_id = old.id;{_INSERT_LINKS}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bookmark_tag_ad AFTER DELETE ON bookmark BEGIN
+        DELETE FROM bookmark_tag WHERE bookmark_id = old.id;
+    END""",
+]
+
+for statement in TAG_DDL:
+    event.listen(BookmarkTag.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+
+def tagged_with_any(owner_id: int, tags: List[str]):
+    """Ids of the owner's bookmarks carrying at least one of the tags."""
+    return (select(BookmarkTag.bookmark_id)
+            .join(Tag, Tag.id == BookmarkTag.tag_id)
+            .where(Tag.owner_id == owner_id,
+                   Tag.name.in_(tags)))
+
+
+def tagged_with_all(owner_id: int, tags: List[str]):
+    """Ids of the owner's bookmarks carrying every one of the tags."""
+    return (tagged_with_any(owner_id, tags)
+            .group_by(BookmarkTag.bookmark_id)
+            .having(func.count(BookmarkTag.tag_id) == len(set(tags))))
+
+
+def tag_counts_statement(owner_id: int):
+    count = func.count(BookmarkTag.bookmark_id).label("count")
+    return (select(Tag.name, count)
+            .join(BookmarkTag, BookmarkTag.tag_id == Tag.id)
+            .where(Tag.owner_id == owner_id)
+            .group_by(Tag.id)
+            .order_by(count.desc(), Tag.name))
@@ -1,7 +1,16 @@
 from fastapi import FastAPI
-from .db.database import engine, Base
+from .db.database import engine, read_engine, Base, SessionLocal, ReadSessionLocal
 from .db.models import User, Bookmark
-from .routers import bookmarks, users
+from .routers import bookmarks, favicons, users
+from .utils.http_client import start_http_client, close_http_client
+from .utils.enrichment import start_enrichment_queue, stop_enrichment_queue
+from .utils.semantic_index import start_semantic_indexer, stop_semantic_indexer
+from .utils.articles import start_article_extractor, stop_article_extractor
+from .utils.metadata_cache import get_metadata_cache, close_metadata_cache
+from .utils.token_cache import token_cache
+from .utils.response_cache import response_cache
+from .utils.passwords import shutdown_password_executor
+from .utils.request_timing import REQUEST_TIMING, RequestTimingMiddleware, instrument_engine
 from contextlib import asynccontextmanager
 import asyncio
 
@@ -11,19 +20,53 @@ import asyncio
 #         await connection.run_sync(Base.metadata.create_all)
 
 
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-#     await create_tables()
-#     yield
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # W razie potrzeby stworzenia bazy na nowo - odkomentować create_tables()
+    # await create_tables()
+    await start_http_client()
+    await start_enrichment_queue(SessionLocal)
+    # long reads while embedding - kept off the single writer connection
+    await start_semantic_indexer(ReadSessionLocal)
+    await start_article_extractor(SessionLocal)
+    yield
+    # finish queued scrapes before the HTTP client goes away
+    await stop_enrichment_queue()
+    await stop_article_extractor()
+    await stop_semantic_indexer()
+    await close_http_client()
+    close_metadata_cache()
+    shutdown_password_executor()
 
 
 app = FastAPI(
-    title="BookmarkManager")
-# W razie potrzeby stworzenia bazy na nowo - dodać parametr lifespan=lifespan
+    title="BookmarkManager",
+    lifespan=lifespan)
+
+if REQUEST_TIMING:
+    instrument_engine(engine)
+    instrument_engine(read_engine)
+    app.add_middleware(RequestTimingMiddleware)
 
 @app.get("/healthy")
 def health_check():
     return {"status": "Healthy"}
 
+
+@app.get("/stats/metadata-cache")
+def metadata_cache_stats():
+    return get_metadata_cache().stats.as_dict()
+
+
+@app.get("/stats/token-cache")
+def token_cache_stats():
+    return {**token_cache.stats.as_dict(), "size": len(token_cache)}
+
+
+@app.get("/stats/response-cache")
+def response_cache_stats():
+    return {**response_cache.stats.as_dict(), **response_cache.backend.info()}
+
 app.include_router(bookmarks.router)
-app.include_router(users.router)
\ No newline at end of file
+app.include_router(users.router)
+app.include_router(favicons.router)
\ No newline at end of file
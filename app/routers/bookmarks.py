@@ -1,15 +1,37 @@
+import asyncio
 from typing import Annotated, List
-from fastapi import APIRouter, Depends, status, Path, HTTPException, Query
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+import httpx
+from fastapi import APIRouter, Depends, status, Path, HTTPException, Query, Request, Header, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, case, select, func, update
 from enum import Enum
 
-from ..db.database import get_db
-from ..db.models import Bookmark 
-from ..schemas.schemas import BookmarkResponse, BookmarkCreate, BookmarkUpdate, BookmarkWithOwnerResponse, PaginateBookmarkReponse
+from ..db.database import get_db, get_read_db, get_read_sessionmaker
+from ..db.models import Bookmark, User
+from ..db.fts import search_statement
+from ..db.bulk import bulk_delete, bulk_retag, bulk_set_favorite, bulk_target
+from ..db.counters import adjust_counters, get_counters, is_tagged
+from ..db.tags import tagged_with_any, tagged_with_all, tag_counts_statement
+from ..db.articles import article_statement
+from ..db.simhash import SIMHASH_DISTANCE, buckets_statement, candidates_statement, near_duplicate_clusters
+from ..schemas.schemas import BookmarkResponse, BookmarkCreate, BookmarkUpdate, BookmarkWithOwnerResponse, PaginateBookmarkReponse, SearchBookmarkResponse, SemanticSearchResponse, TagCountResponse, DuplicateGroupResponse, RelatedBookmarkResponse, NearDuplicateClusterResponse, ArticleResponse, ImportBookmarksResponse, BookmarkBulkRequest, BookmarkBulkResponse, BulkAction
 from .users import get_current_user
-from ..utils.scraper import scrape_title, scrape_favicon
+from ..utils.metadata_cache import get_page_metadata
+from ..utils.http_client import get_http_client
+from ..utils.enrichment import EnrichmentQueue, get_enrichment_queue, STATUS_DONE, STATUS_PENDING, TITLE_MAX_LENGTH
+from ..utils.bookmark_import import ImportFormat, import_bookmarks, parse_bookmarks
+from ..utils.bookmark_export import EXPORT_MEDIA_TYPES, ExportFormat, export_bookmarks
+from ..utils.fast_json import FastJSONResponse
+from ..utils.etags import bookmark_etag, etag_matches, make_etag
+from ..utils.response_cache import cached_response, response_cache
+from ..utils.cursor import InvalidCursor, decode_cursor, encode_cursor, keyset_after, keyset_null_tail
+from ..utils.urls import canonical_url, url_hash
+from ..utils.simhash import hamming_distance, simhash
+from ..utils.semantic_index import SemanticIndexer, get_semantic_indexer, submit_semantic_sync
+from ..utils.articles import decompress_article, submit_article_extraction
+from ..utils.favicons import FaviconStore, get_favicon_store
 
 
 
@@ -19,7 +41,13 @@ router = APIRouter(
 )
 
 db_dependency = Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
+http_client_dependency = Annotated[httpx.AsyncClient, Depends(get_http_client)]
+enrichment_dependency = Annotated[EnrichmentQueue | None, Depends(get_enrichment_queue)]
+read_sessionmaker_dependency = Annotated[async_sessionmaker[AsyncSession], Depends(get_read_sessionmaker)]
+semantic_indexer_dependency = Annotated[SemanticIndexer | None, Depends(get_semantic_indexer)]
+favicon_store_dependency = Annotated[FaviconStore, Depends(get_favicon_store)]
 
 
 class SortBy(str, Enum):
@@ -31,110 +59,460 @@ class SortBy(str, Enum):
     FAVORITE_ASC = "Not favorite"
     
 
+# sort column and direction - id is always the tie-breaker, so every order is
+# total and can be resumed from a cursor
+SORT_COLUMNS = {
+    SortBy.CREATED_AT_DESC: (Bookmark.created_at, True),
+    SortBy.CREATED_AT_ASC: (Bookmark.created_at, False),
+    SortBy.TITLE_DESC: (Bookmark.title, True),
+    SortBy.TITLE_ASC: (Bookmark.title, False),
+    SortBy.FAVORITE_DESC: (Bookmark.favorite, True),
+    SortBy.FAVORITE_ASC: (Bookmark.favorite, False)
+}
 
-@router.get("/", status_code=status.HTTP_200_OK, response_model=PaginateBookmarkReponse)
-async def get_all_bookmarks(db: db_dependency,
+
+# read path - only the columns BookmarkResponse returns, as plain rows: no ORM
+# hydration, no identity map, no owner loaded just to be thrown away
+BOOKMARK_COLUMNS = tuple(getattr(Bookmark, name) for name in BookmarkResponse.model_fields)
+
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=PaginateBookmarkReponse, response_class=FastJSONResponse)
+async def get_all_bookmarks(request: Request,
+                            db: read_db_dependency,
                             user: user_dependency,
                             skip: int = Query(0, ge=0),
                             limit: int = Query(10, ge=1, le=100),
-                            sort_by: SortBy = Query(SortBy.CREATED_AT_DESC, description="Sort order")):
-    sort_options = {
-        SortBy.CREATED_AT_DESC: Bookmark.created_at.desc(),
-        SortBy.CREATED_AT_ASC: Bookmark.created_at.asc(),
-        SortBy.TITLE_DESC: Bookmark.title.desc(),
-        SortBy.TITLE_ASC: Bookmark.title.asc(),
-        SortBy.FAVORITE_DESC: Bookmark.favorite.desc(),
-        SortBy.FAVORITE_ASC: Bookmark.favorite.asc()
-    }
-    
-    
-    data_stmt = (select(Bookmark)
-            .options(selectinload(Bookmark.owner))
-            .where(Bookmark.owner_id == user.get("id"))
-            .order_by(sort_options[sort_by])
-            .offset(skip)
+                            sort_by: SortBy = Query(SortBy.CREATED_AT_DESC, description="Sort order"),
+                            tag: str | None = Query(None, description="Only bookmarks with this tag"),
+                            tags_all: List[str] | None = Query(None, description="Only bookmarks with all of these tags"),
+                            cursor: str | None = Query(None, description="next_cursor of the previous page, replaces skip"),
+                            if_none_match: str | None = Header(None)):
+    cache_key = await response_cache.key(user.get("id"), request)
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        return cached_response(cached, if_none_match)
+    
+    sort_column, descending = SORT_COLUMNS[sort_by]
+    order_by = ((sort_column.desc(), Bookmark.id.desc()) if descending
+                else (sort_column.asc(), Bookmark.id.asc()))
+    
+    filters = [Bookmark.owner_id == user.get("id")]
+    if tag is not None:
+        filters.append(Bookmark.id.in_(tagged_with_any(user.get("id"), [tag])))
+    if tags_all:
+        filters.append(Bookmark.id.in_(tagged_with_all(user.get("id"), tags_all)))
+    
+    data_stmt = (select(*BOOKMARK_COLUMNS)
+            .where(*filters)
+            .order_by(*order_by)
             .limit(limit))
     
-    count_stmt = (select(func.count())
-                  .select_from(Bookmark)
-                  .where(Bookmark.owner_id == user.get("id")))
+    tail_stmt = None
+    if cursor is not None:
+        try:
+            value, last_id = decode_cursor(cursor, sort_by.name, is_datetime=sort_column is Bookmark.created_at)
+        except InvalidCursor as exception:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exception))
+        null_tail = keyset_null_tail(sort_column, value, descending)
+        if null_tail is not None:
+            tail_stmt = data_stmt.where(null_tail)
+        data_stmt = data_stmt.where(keyset_after(sort_column, Bookmark.id, value, last_id, descending))
+    else:
+        data_stmt = data_stmt.offset(skip)
+    
+    if len(filters) == 1:
+        count = (await get_counters(db, user.get("id"), save=False)).bookmark_count
+        last_update = (await db.execute(select(func.max(Bookmark.updated_at))
+                                        .where(*filters))).scalar_one()
+    else:
+        count_stmt = (select(func.count(), func.max(Bookmark.updated_at))
+                      .select_from(Bookmark)
+                      .where(*filters))
+        count, last_update = (await db.execute(count_stmt)).one()
+    
+    etag = make_etag(user.get("id"), count, last_update, sort_by.name, skip, limit, tag, tags_all, cursor)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
     
     data_result = await db.execute(data_stmt)
-    count_result = await db.execute(count_stmt)    
+    bookmarks = data_result.all()
+    if tail_stmt is not None and len(bookmarks) < limit:
+        bookmarks += (await db.execute(tail_stmt.limit(limit - len(bookmarks)))).all()
+    
+    next_cursor = None
+    if len(bookmarks) == limit:
+        last = bookmarks[-1]
+        next_cursor = encode_cursor(sort_by.name, getattr(last, sort_column.key), last.id)
+
+    
+    response = FastJSONResponse({"total": count,
+                                 "page": (skip//limit) + 1 if cursor is None else None,
+                                 "size": len(bookmarks),
+                                 "items": bookmarks,
+                                 "next_cursor": next_cursor},
+                                model=PaginateBookmarkReponse,
+                                headers={"ETag": etag})
+    await response_cache.set(cache_key, response, etag)
+    return response
+
+
+
+
+@router.get("/tags", status_code=status.HTTP_200_OK, response_model=List[TagCountResponse], response_class=FastJSONResponse)
+async def get_tag_counts(request: Request,
+                         db: read_db_dependency,
+                         user: user_dependency):
+    cache_key = await response_cache.key(user.get("id"), request)
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        return cached_response(cached)
+    
+    result = await db.execute(tag_counts_statement(user.get("id")))
+    response = FastJSONResponse([{"name": name, "count": count} for name, count in result.all()],
+                                model=List[TagCountResponse])
+    await response_cache.set(cache_key, response)
+    return response
+
+
+
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=SearchBookmarkResponse, response_class=FastJSONResponse)
+async def search_bookmarks(db: read_db_dependency,
+                           user: user_dependency,
+                           q: str = Query(min_length=1, max_length=200, description="Words to search for"),
+                           prefix: bool = Query(False, description="Treat the last word as a prefix (search as you type)"),
+                           skip: int = Query(0, ge=0),
+                           limit: int = Query(10, ge=1, le=100)):
+    stmt = search_statement(q, user.get("id"), skip=skip, limit=limit, prefix=prefix)
+    if stmt is None:
+        return FastJSONResponse({"query": q, "page": 1, "size": 0, "items": []}, model=SearchBookmarkResponse)
     
-    bookmarks = data_result.scalars().all()
-    count = count_result.scalar_one()
+    result = await db.execute(stmt)
+    items = [{**{column.key: getattr(bookmark, column.key) for column in BOOKMARK_COLUMNS},
+              "rank": rank,
+              "title_highlight": title_highlight,
+              "snippet": snippet or None}
+             for bookmark, rank, title_highlight, snippet in result.all()]
+    
+    return FastJSONResponse({"query": q,
+                             "page": (skip//limit) + 1,
+                             "size": len(items),
+                             "items": items},
+                            model=SearchBookmarkResponse)
+
+
+
+
+
+@router.get("/semantic-search", status_code=status.HTTP_200_OK, response_model=SemanticSearchResponse, response_class=FastJSONResponse)
+async def semantic_search_bookmarks(db: read_db_dependency,
+                                    user: user_dependency,
+                                    indexer: semantic_indexer_dependency,
+                                    q: str = Query(min_length=1, max_length=500, description="Text to find similar bookmarks for"),
+                                    limit: int = Query(10, ge=1, le=100)):
+    if indexer is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Semantic search is disabled.")
+    # answered from the index as it is - a stale one is refreshed in the
+    # background, never here
+    pending = await indexer.is_stale(db, user.get("id"))
+    if pending:
+        indexer.submit(user.get("id"))
+    hits = await indexer.search(user.get("id"), q, limit)
+    
+    scores = dict(hits)
+    result = await db.execute(select(*BOOKMARK_COLUMNS)
+                              .where(Bookmark.owner_id == user.get("id"), Bookmark.id.in_(scores.keys())))
+    items = sorted(({**row._asdict(), "score": scores[row.id]} for row in result.all()),
+                   key=lambda item: -item["score"])
+    return FastJSONResponse({"query": q, "size": len(items), "pending": pending, "items": items},
+                            model=SemanticSearchResponse)
+    
+    
+    
+    
+@router.get("/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse)
+async def export_all_bookmarks(session_factory: read_sessionmaker_dependency,
+                               user: user_dependency,
+                               format: ExportFormat = Query(ExportFormat.NDJSON, description="ndjson, csv or netscape (browser HTML)")):
+    media_type, extension = EXPORT_MEDIA_TYPES[format]
+    return StreamingResponse(export_bookmarks(session_factory, user.get("id"), format),
+                             media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="bookmarks.{extension}"'})
+
+
+
 
+@router.get("/duplicates", status_code=status.HTTP_200_OK, response_model=List[DuplicateGroupResponse], response_class=FastJSONResponse)
+async def get_duplicates(db: read_db_dependency,
+                         user: user_dependency,
+                         limit: int = Query(100, gt=0, le=1000)):
+    # new rows can't be duplicates - the unique index turns them away - so
+    # the only ones left are those saved before it, which the backfill left
+    # with a NULL url_hash: an index seek, then one IN over the originals
+    stmt = (select(*BOOKMARK_COLUMNS)
+            .where(Bookmark.owner_id == user.get("id"), Bookmark.url_hash.is_(None))
+            .order_by(Bookmark.id))
+    legacy = (await db.execute(stmt)).all()
+    groups: dict[bytes, list] = {}
+    for row in legacy:
+        groups.setdefault(url_hash(row.url), []).append(row._asdict())
     
-    return {"total": count,
-            "page": (skip//limit) + 1,
-            "size": len(bookmarks),
-            "items": bookmarks}
+    stmt = (select(Bookmark.url_hash, *BOOKMARK_COLUMNS)
+            .where(Bookmark.owner_id == user.get("id"), Bookmark.url_hash.in_(groups.keys())))
+    for row in await db.execute(stmt):
+        bookmark = row._asdict()
+        groups[bookmark.pop("url_hash")].insert(0, bookmark)
+    
+    duplicates = [{"canonical_url": canonical_url(bookmarks[0]["url"]), "bookmarks": bookmarks}
+                  for bookmarks in groups.values() if len(bookmarks) > 1]
+    return FastJSONResponse(duplicates[:limit], model=List[DuplicateGroupResponse])
+
+
 
 
+@router.get("/near-duplicates", status_code=status.HTTP_200_OK, response_model=List[NearDuplicateClusterResponse], response_class=FastJSONResponse)
+async def get_near_duplicates(db: read_db_dependency,
+                              user: user_dependency,
+                              limit: int = Query(50, gt=0, le=500)):
+    # only the band buckets shared by two or more bookmarks leave the database
+    rows = (await db.execute(buckets_statement(user.get("id")))).all()
+    clusters = (await asyncio.to_thread(near_duplicate_clusters, rows))[:limit]
+    
+    ids = [bookmark_id for cluster in clusters for bookmark_id in cluster]
+    result = await db.execute(select(*BOOKMARK_COLUMNS).where(Bookmark.id.in_(ids)))
+    bookmarks = {row.id: row._asdict() for row in result.all()}
+    return FastJSONResponse([{"size": len(cluster), "bookmarks": [bookmarks[bookmark_id] for bookmark_id in cluster]}
+                             for cluster in clusters],
+                            model=List[NearDuplicateClusterResponse])
+
 
 
 
-@router.get("/{bookmark_id}", status_code=status.HTTP_200_OK, response_model=BookmarkWithOwnerResponse)
-async def get_bookmark(db: db_dependency,
+@router.get("/{bookmark_id}", status_code=status.HTTP_200_OK, response_model=BookmarkWithOwnerResponse, response_class=FastJSONResponse)
+async def get_bookmark(db: read_db_dependency,
                        user: user_dependency, 
-                       bookmark_id: int = Path(gt=0)):
+                       bookmark_id: int = Path(gt=0),
+                       if_none_match: str | None = Header(None)):
+    target = (Bookmark.id == bookmark_id, Bookmark.owner_id == user.get("id"))
+    if if_none_match is not None:
+        updated_at = (await db.execute(select(Bookmark.updated_at).where(*target))).one_or_none()
+        if updated_at is not None:
+            etag = bookmark_etag(bookmark_id, updated_at.updated_at)
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
     
-    stmt = (select(Bookmark)
-            .options(selectinload(Bookmark.owner))
-            .where(Bookmark.id == bookmark_id,
-                   Bookmark.owner_id == user.get("id")))
+    stmt = (select(*BOOKMARK_COLUMNS, User.username)
+            .join(User, User.id == Bookmark.owner_id)
+            .where(*target))
     result = await db.execute(stmt)
-    bookmark = result.scalar_one_or_none()
+    row = result.one_or_none()
     
-    if bookmark is None:
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookmark not found.")
-    return bookmark
+    bookmark = row._asdict()
+    bookmark["owner"] = {"id": user.get("id"), "username": bookmark.pop("username")}
+    return FastJSONResponse(bookmark, model=BookmarkWithOwnerResponse,
+                            headers={"ETag": bookmark_etag(bookmark_id, bookmark["updated_at"])})
+
+
+
+
+@router.get("/{bookmark_id}/related", status_code=status.HTTP_200_OK, response_model=List[RelatedBookmarkResponse], response_class=FastJSONResponse)
+async def get_related_bookmarks(db: read_db_dependency,
+                                user: user_dependency,
+                                bookmark_id: int = Path(gt=0),
+                                max_distance: int = Query(SIMHASH_DISTANCE, ge=0, le=SIMHASH_DISTANCE, description="Differing bits of the page signatures"),
+                                limit: int = Query(20, gt=0, le=100)):
+    signature = (await db.execute(select(Bookmark.simhash)
+                                  .where(Bookmark.id == bookmark_id, Bookmark.owner_id == user.get("id")))).one_or_none()
+    if signature is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookmark not found.")
+    if signature.simhash is None:
+        # not scraped (yet), or too little text on the page
+        return FastJSONResponse([], model=List[RelatedBookmarkResponse])
+    
+    candidates = (await db.execute(candidates_statement(user.get("id"), signature.simhash))).all()
+    distances = {candidate.bookmark_id: hamming_distance(signature.simhash, candidate.simhash)
+                 for candidate in candidates if candidate.bookmark_id != bookmark_id}
+    related = sorted((distance, candidate_id) for candidate_id, distance in distances.items()
+                     if distance <= max_distance)[:limit]
+    
+    result = await db.execute(select(*BOOKMARK_COLUMNS).where(Bookmark.id.in_([candidate_id for _, candidate_id in related])))
+    bookmarks = {row.id: row._asdict() for row in result.all()}
+    return FastJSONResponse([{**bookmarks[candidate_id], "distance": distance} for distance, candidate_id in related],
+                            model=List[RelatedBookmarkResponse])
+    
     
 
 
+@router.get("/{bookmark_id}/article", status_code=status.HTTP_200_OK, response_model=ArticleResponse, response_class=FastJSONResponse)
+async def get_bookmark_article(db: read_db_dependency,
+                               user: user_dependency,
+                               bookmark_id: int = Path(gt=0)):
+    row = (await db.execute(article_statement(user.get("id"), bookmark_id))).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookmark not found.")
+    if row.content is None:
+        # not extracted yet, or nothing readable on the page
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Article not found.")
+    article = row._asdict()
+    article["text"] = decompress_article(article.pop("content"))
+    return FastJSONResponse(article, model=ArticleResponse)
+
+
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=BookmarkResponse)
 async def create_bookmark(db: db_dependency,
                           bookmark_request: BookmarkCreate,
-                          user: user_dependency):
-    title_tag = await scrape_title(str(bookmark_request.url))
+                          user: user_dependency,
+                          http_client: http_client_dependency,
+                          enrichment: enrichment_dependency,
+                          favicons: favicon_store_dependency):
     data = bookmark_request.model_dump(mode="json")
-    data.pop("title", None)
+    data["url_hash"] = url_hash(data["url"])
+    # no scrape for a page the user has already saved
+    exists = await db.scalar(select(Bookmark.id)
+                             .where(Bookmark.owner_id == user.get("id"), Bookmark.url_hash == data["url_hash"]))
+    if exists is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Bookmark already exists.")
+    # the SELECT began a transaction on the only writer connection - give it
+    # back while the page is scraped; a concurrent save of the same URL still
+    # ends in the IntegrityError below
+    await db.rollback()
+    metadata = remember_favicon = None
+    if enrichment is None:
+        # one request for title and favicon
+        metadata = await get_page_metadata(bookmark_request.url, http_client)
+        data["title"] = metadata.title[:TITLE_MAX_LENGTH] if metadata else ""
+        data["favicon_url"] = metadata.favicon_url if metadata else None
+        if metadata is not None:
+            data["favicon_hash"], remember_favicon = await favicons.resolve(db, bookmark_request.url,
+                                                                            metadata.favicon_url, http_client)
+        data["simhash"] = simhash(metadata.title, metadata.description) if metadata else None
+    else:
+        # saved right away with the title sent by the client, the worker pool
+        # replaces it (and fills the favicon) once the page has been scraped
+        data["enrichment_status"] = STATUS_PENDING
     bookmark = Bookmark(**data,
-                        owner_id=user.get("id"),
-                        title=title_tag
+                        owner_id=user.get("id")
     )
     db.add(bookmark)
+    if remember_favicon is not None:
+        await db.execute(remember_favicon)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # saved by a concurrent request since the check above
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Bookmark already exists.")
+    await adjust_counters(db, user.get("id"),
+                          bookmarks=1,
+                          favorites=int(bookmark.favorite),
+                          tagged=int(is_tagged(bookmark.tags)))
     await db.commit()
+    await response_cache.invalidate(user.get("id"))
+    submit_semantic_sync(user.get("id"))
     await db.refresh(bookmark)
+    if metadata is not None and metadata.title:
+        submit_article_extraction(bookmark.id, bookmark.url)
+    
+    if enrichment is not None and not enrichment.submit(bookmark.id, bookmark.url):
+        # queue full - don't lose the work, do it in this request instead;
+        # enrich() needs the writer connection this session holds
+        bookmark_id, url = bookmark.id, bookmark.url
+        await db.rollback()
+        await enrichment.enrich(bookmark_id, url)
+        await db.refresh(bookmark)
     return bookmark
     
     
     
     
+@router.post("/import", status_code=status.HTTP_200_OK, response_model=ImportBookmarksResponse,
+             openapi_extra={"requestBody": {"required": True,
+                                            "content": {"text/html": {"schema": {"type": "string"}},
+                                                        "application/json": {"schema": {"type": "array", "items": {}}},
+                                                        "application/x-ndjson": {"schema": {"type": "string"}}}}})
+async def import_bookmarks_file(request: Request,
+                                db: db_dependency,
+                                user: user_dependency,
+                                enrichment: enrichment_dependency,
+                                format: ImportFormat | None = Query(None, description="Netscape HTML, JSON array or NDJSON, detected when empty"),
+                                scrape: bool = Query(False, description="Queue imported bookmarks for scraping (background mode only)")):
+    entries = parse_bookmarks(request.stream(), format, request.headers.get("content-type"))
+    summary = await import_bookmarks(db, user.get("id"), entries,
+                                     enrichment=enrichment if scrape else None)
+    if summary.aborted and not summary.processed:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=summary.aborted)
+    return summary
+    
+    
+    
+    
+@router.post("/bulk", status_code=status.HTTP_200_OK, response_model=BookmarkBulkResponse)
+async def bulk_update_bookmarks(db: db_dependency,
+                                bulk_request: BookmarkBulkRequest,
+                                user: user_dependency):
+    bookmark_filter = bulk_request.filter.model_dump() if bulk_request.filter else {}
+    target = bulk_target(user.get("id"), ids=bulk_request.ids, **bookmark_filter)
+    
+    if bulk_request.action == BulkAction.DELETE:
+        affected = await bulk_delete(db, user.get("id"), target)
+    elif bulk_request.action == BulkAction.SET_FAVORITE:
+        affected = await bulk_set_favorite(db, user.get("id"), target, bulk_request.favorite)
+    elif bulk_request.action == BulkAction.ADD_TAGS:
+        affected = await bulk_retag(db, user.get("id"), target, add=bulk_request.tags)
+    elif bulk_request.action == BulkAction.REMOVE_TAGS:
+        affected = await bulk_retag(db, user.get("id"), target, remove=bulk_request.tags)
+    else:
+        affected = await bulk_retag(db, user.get("id"), target, add=bulk_request.tags, remove=bulk_request.from_tags)
+    await db.commit()
+    await response_cache.invalidate(user.get("id"))
+    
+    return {"action": bulk_request.action, "affected": affected}
+    
+    
+    
+    
 @router.put("/{bookmark_id}", status_code=status.HTTP_200_OK, response_model=BookmarkResponse)
 async def update_bookmark(db: db_dependency, 
                           bookmark_request: BookmarkUpdate,
                           user: user_dependency, 
-                          bookmark_id: int = Path(gt=0)):
-    
-    stmt = (select(Bookmark)
-        .options(selectinload(Bookmark.owner))
-        .where(
-        Bookmark.id == bookmark_id,
-        Bookmark.owner_id == user.get("id")))
-    result = await db.execute(stmt)
-    bookmark = result.scalar_one_or_none()
+                          response: Response,
+                          bookmark_id: int = Path(gt=0),
+                          if_match: str | None = Header(None)):
     
-    if bookmark is None:
+    target = (Bookmark.id == bookmark_id, Bookmark.owner_id == user.get("id"))
+    current = (await db.execute(select(Bookmark.url, Bookmark.tags, Bookmark.updated_at).where(*target))).one_or_none()
+    if current is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookmark not found.")
+    if if_match is not None:
+        _check_if_match(if_match, bookmark_id, current.updated_at)
+        target += (_unchanged_since(current.updated_at),)
     
-    for key, value in bookmark_request.model_dump(exclude_unset=True, mode="json").items():
-        setattr(bookmark, key, value)
-    
+    values = bookmark_request.model_dump(exclude_unset=True, mode="json")
+    if canonical_url(values["url"]) != canonical_url(current.url):
+        values["url_hash"] = url_hash(values["url"])
+    # the client's title is final - a queued enrichment must not overwrite it
+    values["enrichment_status"] = case((Bookmark.enrichment_status == STATUS_PENDING, STATUS_DONE),
+                                       else_=Bookmark.enrichment_status)
+    try:
+        result = await db.execute(update(Bookmark)
+                                  .where(*target)
+                                  .values(**values)
+                                  .returning(*BOOKMARK_COLUMNS))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Bookmark already exists.")
+    bookmark = result.one_or_none()
+    if bookmark is None:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Bookmark was modified.")
+    await adjust_counters(db, user.get("id"),
+                          tagged=int(is_tagged(bookmark.tags)) - int(is_tagged(current.tags)))
     await db.commit()
-    await db.refresh(bookmark)
+    await response_cache.invalidate(user.get("id"))
+    submit_semantic_sync(user.get("id"))
+    response.headers["ETag"] = bookmark_etag(bookmark.id, bookmark.updated_at)
     return bookmark
 
 
@@ -144,18 +522,37 @@ async def update_bookmark(db: db_dependency,
 @router.delete("/{bookmark_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_bookmark(db: db_dependency,
                           user: user_dependency,
-                          bookmark_id: int = Path(gt=0)
+                          bookmark_id: int = Path(gt=0),
+                          if_match: str | None = Header(None)
                           ):
-    stmt = (select(Bookmark)
-            .options(selectinload(Bookmark.owner))
-            .where(Bookmark.id == bookmark_id,
-                   Bookmark.owner_id == user.get("id")))
-    result = await db.execute(stmt)
-    bookmark = result.scalar_one_or_none()
+    target = bulk_target(user.get("id"), ids=[bookmark_id])
+    if if_match is not None:
+        current = (await db.execute(select(Bookmark.updated_at).where(target))).one_or_none()
+        if current is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookmark not found.")
+        _check_if_match(if_match, bookmark_id, current.updated_at)
+        target = and_(target, _unchanged_since(current.updated_at))
     
-    if bookmark is None:
+    deleted = await bulk_delete(db, user.get("id"), target)
+    if not deleted:
+        if if_match is not None:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Bookmark was modified.")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bookmark not found.")
-    
-    await db.delete(bookmark)
     await db.commit()
+    await response_cache.invalidate(user.get("id"))
+
+
+
+def _check_if_match(if_match: str, bookmark_id: int, updated_at):
+    if not etag_matches(if_match, bookmark_etag(bookmark_id, updated_at)):
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Bookmark was modified.")
+
+
+def _unchanged_since(updated_at):
+    """Guard of the write itself, so a change landing after the If-Match check
+    still fails it. julianday() because rows written by CURRENT_TIMESTAMP have
+    no fractional part, unlike the bound parameter."""
+    if updated_at is None:
+        return Bookmark.updated_at.is_(None)
+    return func.julianday(Bookmark.updated_at) == func.julianday(updated_at)
     
@@ -0,0 +1,33 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Response, status
+from fastapi.responses import FileResponse
+
+from ..utils.etags import etag_matches
+from ..utils.favicons import FaviconStore, get_favicon_store
+
+
+router = APIRouter(
+    prefix="/favicons",
+    tags=["Favicons"])
+
+favicon_store_dependency = Annotated[FaviconStore, Depends(get_favicon_store)]
+
+# a hash names one content forever
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+# no auth - <img> tags can't send a bearer token, and the icons are the
+# sites' public ones
+@router.get("/{icon_hash}", status_code=status.HTTP_200_OK, response_class=FileResponse)
+async def get_favicon(store: favicon_store_dependency,
+                      icon_hash: str = Path(pattern="^[0-9a-f]{32}$"),
+                      if_none_match: str | None = Header(None)):
+    headers = {"Cache-Control": IMMUTABLE, "ETag": f'"{icon_hash}"', "X-Content-Type-Options": "nosniff"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    media_type = store.media_type(icon_hash)
+    if media_type is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Favicon not found.")
+    # streamed from the file, or handed to the server's sendfile when it
+    # supports the ASGI pathsend extension
+    return FileResponse(store.file(icon_hash), media_type=media_type, headers=headers)
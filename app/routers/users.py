@@ -2,23 +2,25 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from passlib.context import CryptContext
+from sqlalchemy import select, update
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 import os
+import time
 
 from ..db.database import get_db
 from ..db.models import User
 from ..schemas.schemas import CreateUserRequest, CreateUserResponse, Token
+from ..utils.passwords import hash_password, verify_password
+from ..utils.token_cache import token_cache
 
 
 ALGORITHM = os.getenv("ALGORITHM")
 SECRET_KEY = os.getenv("SECRET_KEY")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="user/token")
-bcrypt_context = CryptContext(schemes=["bcrypt"])
 
 router = APIRouter(
     prefix="/user",
@@ -35,8 +37,19 @@ async def authenticate_user(username: str, password: str, db: db_dependency):
     
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-    if not bcrypt_context.verify(password, user.hashed_password):
+    # bcrypt takes ~200ms - don't keep a pooled connection checked out meanwhile
+    db.expunge(user)
+    await db.rollback()
+    valid, new_hash = await verify_password(password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    if new_hash is not None:
+        # BCRYPT_ROUNDS changed since this hash was made
+        await db.execute(update(User)
+                         .where(User.id == user.id)
+                         .values(hashed_password=new_hash))
+        await db.commit()
+        user.hashed_password = new_hash
     return user
 
 
@@ -44,14 +57,18 @@ async def authenticate_user(username: str, password: str, db: db_dependency):
     
 def create_jwt(username: str, user_id: int, role:str, expires_delta: timedelta):
     encode = {"sub": username, "id": user_id, "role": role}
-    expires = datetime.now(timezone.utc) + expires_delta
-    encode.update({"exp": expires})
+    now = datetime.now(timezone.utc)
+    encode.update({"exp": now + expires_delta, "iat": now})
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
 
 
 def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+    digest = token_cache.digest(token, SECRET_KEY, ALGORITHM)
+    claims = token_cache.get(digest)
+    if claims is not None:
+        return claims
     try:
         payload = jwt.decode(token,
                              key=SECRET_KEY,
@@ -63,10 +80,17 @@ def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
                                 detail="Unauthorized",
                                 headers={"WWW-Authenticate": "Bearer"})
-        return {"sub": username, "id": user_id, "role": role}
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
     
+    if token_cache.is_revoked(digest, user_id, payload.get("iat", 0)):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+    claims = {"sub": username, "id": user_id, "role": role}
+    # tokens without exp never expire - not worth pinning in the cache
+    if payload.get("exp") is not None:
+        token_cache.put(digest, claims, payload["exp"], payload.get("iat", 0))
+    return claims
+    
     
     
     
@@ -77,12 +101,24 @@ async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
                             detail="Invalid credentials")
-    token = create_jwt(user.username, user.id, user.role, timedelta(minutes=30))
+    token = create_jwt(user.username, user.id, user.role, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     return {"access_token": token, "token_type": "bearer"}
 
 
 
     
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(token: Annotated[str, Depends(oauth2_scheme)],
+           user: Annotated[dict, Depends(get_current_user)]):
+    expires_at = jwt.get_unverified_claims(token).get("exp")
+    if expires_at is None:
+        # a token without exp never expires - deny it for as long as ours live
+        expires_at = time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    token_cache.revoke_token(token_cache.digest(token, SECRET_KEY, ALGORITHM), expires_at)
+
+
+
+    
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=CreateUserResponse)
 async def create_user(db: db_dependency, 
                       user_request: CreateUserRequest):
@@ -94,7 +130,7 @@ async def create_user(db: db_dependency,
     new_user = User(
         email=user_request.email,
         username=user_request.username,
-        hashed_password=bcrypt_context.hash(user_request.password),
+        hashed_password=await hash_password(user_request.password),
         role=user_request.role)
     db.add(new_user)
     await db.commit()
@@ -1,5 +1,6 @@
 from typing import Optional, List
-from pydantic import BaseModel, Field, HttpUrl, ConfigDict
+from enum import Enum
+from pydantic import BaseModel, Field, HttpUrl, ConfigDict, model_validator
 from datetime import datetime
 
     
@@ -21,18 +22,128 @@ class BookmarkResponse(BaseModel):
     tags: Optional[List[str]] = None
     created_at: datetime
     updated_at: datetime
+    enrichment_status: str = "done"
+    favicon_hash: Optional[str] = None
     
     
 class PaginateBookmarkReponse(BaseModel):
     total: int
-    page: int
+    page: Optional[int] = None
     size: int
     items: List[BookmarkResponse]    
+    next_cursor: Optional[str] = None
 
     
 class BookmarkWithOwnerResponse(BookmarkResponse):
     owner: UserResponse    
 
+
+class TagCountResponse(BaseModel):
+    name: str
+    count: int
+
+
+class DuplicateGroupResponse(BaseModel):
+    canonical_url: str
+    bookmarks: List[BookmarkResponse]
+
+
+class RelatedBookmarkResponse(BookmarkResponse):
+    distance: int
+
+
+class NearDuplicateClusterResponse(BaseModel):
+    size: int
+    bookmarks: List[BookmarkResponse]
+
+
+class ArticleResponse(BaseModel):
+    bookmark_id: int
+    word_count: int
+    reading_time: int
+    language: Optional[str] = None
+    extracted_at: Optional[datetime] = None
+    text: str
+
+
+class BookmarkSearchResult(BookmarkResponse):
+    rank: float
+    title_highlight: str
+    snippet: Optional[str] = None
+
+
+class SearchBookmarkResponse(BaseModel):
+    query: str
+    page: int
+    size: int
+    items: List[BookmarkSearchResult]
+
+    
+class SemanticSearchResult(BookmarkResponse):
+    score: float
+
+
+class SemanticSearchResponse(BaseModel):
+    query: str
+    size: int
+    pending: bool
+    items: List[SemanticSearchResult]
+
+    
+class ImportErrorResponse(BaseModel):
+    row: int
+    error: str
+
+
+class ImportBookmarksResponse(BaseModel):
+    processed: int
+    imported: int
+    duplicates: int
+    failed: int
+    deferred: int
+    errors: List[ImportErrorResponse]
+    aborted: Optional[str] = None
+
+    
+class BulkAction(str, Enum):
+    DELETE = "delete"
+    SET_FAVORITE = "set_favorite"
+    ADD_TAGS = "add_tags"
+    REMOVE_TAGS = "remove_tags"
+    MOVE = "move"
+
+
+class BookmarkFilter(BaseModel):
+    tag: Optional[str] = None
+    tags_all: Optional[List[str]] = None
+    favorite: Optional[bool] = None
+
+
+class BookmarkBulkRequest(BaseModel):
+    action: BulkAction
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=10000)
+    filter: Optional[BookmarkFilter] = None
+    favorite: Optional[bool] = None
+    tags: Optional[List[str]] = Field(None, min_length=1, max_length=255)
+    from_tags: Optional[List[str]] = Field(None, min_length=1, max_length=255)
+
+    @model_validator(mode="after")
+    def check_action_fields(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Pass either ids or filter.")
+        if self.action == BulkAction.SET_FAVORITE and self.favorite is None:
+            raise ValueError("set_favorite needs favorite.")
+        if self.action in (BulkAction.ADD_TAGS, BulkAction.REMOVE_TAGS, BulkAction.MOVE) and not self.tags:
+            raise ValueError(f"{self.action.value} needs tags.")
+        if self.action == BulkAction.MOVE and not self.from_tags:
+            raise ValueError("move needs from_tags.")
+        return self
+
+
+class BookmarkBulkResponse(BaseModel):
+    action: BulkAction
+    affected: int
+
     
 class BookmarkCreate(BaseModel):
     url: HttpUrl
@@ -0,0 +1,347 @@
+"""Readable article text of saved pages, extracted off the event loop.
+
+The scraper reads only <head>. Once a bookmark has been enriched,
+ArticleExtractor fetches the whole page, up to SCRAPER_MAX_PAGE_BYTES. It
+extracts the main text, word count, reading time and language. lxml parsing
+and the extraction are CPU-bound, so they run in ARTICLE_WORKERS processes.
+0 workers means a single in-process thread instead. The worker also
+compresses the text, so only zlib bytes cross the process boundary. The
+result is stored in bookmark_article (db/articles.py), and the list
+endpoints never read that table.
+
+Extraction is a readability-style text density heuristic:
+- Drop the boilerplate: scripts, navigation, headers, footers, asides, and
+  anything whose class or id says sidebar, comments, share and so on.
+- Credit each paragraph's text to its parent, and half of it to its
+  grandparent. Paragraphs made mostly of links count for little.
+- The best-scoring container, or <article> / itemprop=articleBody when the
+  page has one, supplies the text blocks of the article.
+
+The language is <html lang>, or else a guess from the stop words of a
+handful of languages.
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import re
+import zlib
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+import httpx
+import lxml.etree
+import lxml.html
+from dotenv import load_dotenv
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..db.articles import save_article_statement
+from ..db.models import Bookmark, BookmarkArticle
+from .http_client import get_http_client
+from .scraper import fetch_page
+from .simhash import simhash
+
+load_dotenv()
+
+ARTICLE_EXTRACTION = os.getenv("ARTICLE_EXTRACTION", "true").lower() in ("1", "true", "yes")
+ARTICLE_WORKERS = int(os.getenv("ARTICLE_WORKERS", "1"))
+# concurrent page downloads feeding the workers
+ARTICLE_FETCHERS = int(os.getenv("ARTICLE_FETCHERS", "4"))
+ARTICLE_QUEUE_SIZE = int(os.getenv("ARTICLE_QUEUE_SIZE", "1000"))
+ARTICLE_COMPRESSION_LEVEL = int(os.getenv("ARTICLE_COMPRESSION_LEVEL", "6"))
+WORDS_PER_MINUTE = int(os.getenv("WORDS_PER_MINUTE", "230"))
+
+logger = logging.getLogger(__name__)
+
+
+# === EXTRACTION ===
+_BOILERPLATE_TAGS = ("script", "style", "noscript", "template", "iframe", "svg", "canvas", "form",
+                     "button", "select", "nav", "header", "footer", "aside", "menu")
+_BOILERPLATE = re.compile(r"sidebar|comment|share|social|related|promo|advert|sponsor|cookie|banner|"
+                          r"newsletter|subscribe|popup|modal|breadcrumb|footer|masthead|menu|navbar",
+                          re.IGNORECASE)
+# "content-with-sidebar" is still the content
+_CONTENT = re.compile(r"article|body|content|entry|main|post|story|text", re.IGNORECASE)
+_PARAGRAPHS = ("p", "pre")
+_BLOCKS = ("p", "pre", "blockquote", "li", "h1", "h2", "h3", "h4", "h5", "h6")
+_MIN_PARAGRAPH = 25
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+STOP_WORDS = {
+    "en": "the and of to in is that for it with as was on are be this by not or have".split(),
+    "de": "der die und den von zu das mit sich des auf für ist im dem nicht ein eine auch".split(),
+    "fr": "le la les des et est un une du que qui dans pour pas sur au avec ce il".split(),
+    "es": "el la los las del que y en se por un para con una es al lo como".split(),
+    "it": "il di che la per un una del non sono della le con si gli nel alla".split(),
+    "pt": "o de que e do da em um para com não uma os no se na por mais".split(),
+    "nl": "de het een en van ik te dat die in is niet op met voor zijn er".split(),
+    "pl": "i w na z się nie do to że jest jak o co ale po przez od już".split(),
+}
+_LANGUAGE_OF = {}
+for _language, _words in STOP_WORDS.items():
+    for _word in _words:
+        _LANGUAGE_OF.setdefault(_word, set()).add(_language)
+_MIN_STOP_WORDS = 5
+
+
+@dataclass
+class Article:
+    text: str
+    word_count: int
+    reading_time: int  # minutes
+    language: str | None
+
+
+def _clean(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _link_density(element, length: int) -> float:
+    linked = sum(len(_clean(link.text_content())) for link in element.iter("a"))
+    return min(linked / length, 1.0) if length else 1.0
+
+
+def _is_boilerplate(element) -> bool:
+    if element.tag in ("html", "body", "article", "main"):
+        return False
+    names = f"{element.get('class', '')} {element.get('id', '')}"
+    return bool(_BOILERPLATE.search(names)) and not _CONTENT.search(names)
+
+
+def _container(document):
+    marked = document.xpath("//article | //*[@itemprop='articleBody']")
+    if marked:
+        return max(marked, key=lambda element: len(element.text_content()))
+
+    scores: dict = {}
+    for paragraph in document.iter(*_PARAGRAPHS):
+        text = _clean(paragraph.text_content())
+        if len(text) < _MIN_PARAGRAPH:
+            continue
+        score = (1 + text.count(",") + min(len(text) // 100, 3)) * (1 - _link_density(paragraph, len(text)))
+        parent = paragraph.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0) + score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0) + score / 2
+    return max(scores, key=scores.get) if scores else None
+
+
+def _blocks(container) -> list[str]:
+    blocks = []
+    for block in container.iter(*_BLOCKS):
+        # an <li> holding a <p> - the <p> comes up on its own
+        if any(inner is not block for inner in block.iter(*_BLOCKS)):
+            continue
+        text = _clean(block.text_content())
+        if text and _link_density(block, len(text)) < 0.5:
+            blocks.append(text)
+    return blocks
+
+
+def guess_language(words: list[str]) -> str | None:
+    hits = Counter(language for word in words for language in _LANGUAGE_OF.get(word, ()))
+    if not hits:
+        return None
+    language, count = hits.most_common(1)[0]
+    return language if count >= _MIN_STOP_WORDS else None
+
+
+def _declared_language(document) -> str | None:
+    declared = (document.get("lang") or document.get("{http://www.w3.org/XML/1998/namespace}lang") or "").strip()
+    primary = re.split(r"[-_]", declared.lower())[0]
+    return primary if primary.isalpha() and len(primary) <= 3 else None
+
+
+def extract_article(html: str) -> Article | None:
+    """Main text of the page, None when there is none to be found."""
+    if not html.strip():
+        return None
+    try:
+        document = lxml.html.document_fromstring(html)
+    except (lxml.etree.ParserError, ValueError):
+        return None
+
+    for element in list(document.iter(*_BOILERPLATE_TAGS, lxml.etree.Comment)):
+        element.drop_tree()
+    for element in [element for element in document.iter() if isinstance(element.tag, str) and _is_boilerplate(element)]:
+        if element.getparent() is not None:
+            element.drop_tree()
+
+    container = _container(document)
+    if container is None:
+        return None
+    blocks = _blocks(container) or [_clean(container.text_content())]
+    text = "\n\n".join(block for block in blocks if block)
+    words = _WORD.findall(text.lower())
+    if not words:
+        return None
+    return Article(text=text,
+                   word_count=len(words),
+                   reading_time=max(1, math.ceil(len(words) / WORDS_PER_MINUTE)),
+                   language=_declared_language(document) or guess_language(words))
+
+
+# === WORKER SIDE ===
+@dataclass
+class ExtractedArticle:
+    """What a worker sends back - the text already compressed."""
+    word_count: int
+    reading_time: int
+    language: str | None
+    content: bytes
+    simhash: int | None
+
+
+def _extract(html: str, compression_level: int) -> ExtractedArticle | None:
+    article = extract_article(html)
+    if article is None:
+        return None
+    return ExtractedArticle(word_count=article.word_count,
+                            reading_time=article.reading_time,
+                            language=article.language,
+                            content=zlib.compress(article.text.encode(), compression_level),
+                            simhash=simhash(article.text))
+
+
+def decompress_article(content: bytes) -> str:
+    return zlib.decompress(content).decode()
+
+
+# === QUEUE ===
+class ArticleExtractor:
+    """Bounded queue of enriched bookmarks, fetched by ARTICLE_FETCHERS tasks
+    and parsed on the worker pool."""
+
+    def __init__(self,
+                 session_factory: async_sessionmaker[AsyncSession],
+                 workers: int = ARTICLE_WORKERS,
+                 fetchers: int = ARTICLE_FETCHERS,
+                 maxsize: int = ARTICLE_QUEUE_SIZE,
+                 compression_level: int = ARTICLE_COMPRESSION_LEVEL,
+                 client_factory: Callable[[], httpx.AsyncClient] = get_http_client):
+        self.session_factory = session_factory
+        self.client_factory = client_factory
+        self.workers = workers
+        self.fetchers = fetchers
+        self.compression_level = compression_level
+        self._queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue(maxsize=maxsize)
+        self._tasks: list[asyncio.Task] = []
+        self._executor: Executor | None = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, requeue: bool = True):
+        if self.running:
+            return
+        if self.workers > 0:
+            # spawn - a forked child would inherit the parent's event loop,
+            # open database connections and threads
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="article")
+        self._tasks = [asyncio.create_task(self._worker(), name=f"article-{i}")
+                       for i in range(self.fetchers)]
+        if requeue:
+            await self._requeue_missing()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, bookmark_id: int, url: str) -> bool:
+        """Queue a bookmark; False when the queue is full - the next start()
+        picks it up again."""
+        try:
+            self._queue.put_nowait((bookmark_id, url))
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def join(self):
+        """Wait until every queued bookmark has been extracted."""
+        await self._queue.join()
+
+    async def _requeue_missing(self):
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Bookmark.id, Bookmark.url)
+                .outerjoin(BookmarkArticle, BookmarkArticle.bookmark_id == Bookmark.id)
+                .where(BookmarkArticle.bookmark_id.is_(None), Bookmark.enrichment_status == "done")
+                .order_by(Bookmark.id.desc())
+                .limit(self._queue.maxsize - self._queue.qsize()))
+            for bookmark_id, url in result.all():
+                self.submit(bookmark_id, url)
+
+    async def _worker(self):
+        while True:
+            bookmark_id, url = await self._queue.get()
+            try:
+                await self.extract(bookmark_id, url)
+            except Exception:
+                logger.exception("Article extraction of bookmark %s failed", bookmark_id)
+            finally:
+                self._queue.task_done()
+
+    async def extract(self, bookmark_id: int, url: str):
+        html = await fetch_page(url, self.client_factory())
+        article = None
+        if html is not None:
+            article = await asyncio.get_running_loop().run_in_executor(self._executor, _extract, html,
+                                                                       self.compression_level)
+        # an empty row when there's no article either - not fetched again
+        # on every start
+        async with self.session_factory() as session:
+            await session.execute(save_article_statement(bookmark_id, url, article))
+            if article is not None and article.simhash is not None:
+                # the body says more than the head did; updated_at is kept,
+                # nothing the API returns has changed
+                await session.execute(update(Bookmark)
+                                      .where(Bookmark.id == bookmark_id, Bookmark.url == url)
+                                      .values(simhash=article.simhash, updated_at=Bookmark.updated_at))
+            await session.commit()
+
+
+article_extractor: ArticleExtractor | None = None
+
+
+async def start_article_extractor(session_factory: async_sessionmaker[AsyncSession]) -> ArticleExtractor | None:
+    global article_extractor
+    if not ARTICLE_EXTRACTION:
+        return None
+    article_extractor = ArticleExtractor(session_factory)
+    await article_extractor.start()
+    return article_extractor
+
+
+async def stop_article_extractor():
+    global article_extractor
+    if article_extractor is not None:
+        await article_extractor.stop()
+        article_extractor = None
+
+
+def get_article_extractor() -> ArticleExtractor | None:
+    if article_extractor is not None and article_extractor.running:
+        return article_extractor
+    return None
+
+
+def submit_article_extraction(bookmark_id: int, url: str):
+    """After a bookmark's page has been scraped - no-op when disabled."""
+    if article_extractor is not None and article_extractor.running:
+        article_extractor.submit(bookmark_id, url)
@@ -0,0 +1,119 @@
+"""Streaming export of all of a user's bookmarks.
+
+Rows come from a server-side cursor (stream_scalars with yield_per) and each
+partition is rendered to one chunk of the response, so a million-row account
+is exported with the memory of a single chunk. The header goes out before the
+query runs to keep the time to first byte low.
+"""
+import csv
+import html
+import io
+import os
+from datetime import timezone
+from enum import Enum
+from typing import AsyncIterator, Iterable
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..db.models import Bookmark
+
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+CSV_COLUMNS = ["id", "url", "title", "description", "tags", "favorite", "favicon_url", "created_at", "updated_at"]
+
+NETSCAPE_HEADER = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<!-- This is an automatically generated file. -->
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+"""
+NETSCAPE_FOOTER = "</DL><p>\n"
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+    NETSCAPE = "netscape"
+
+
+# media type, file extension
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: ("application/x-ndjson", "ndjson"),
+    ExportFormat.CSV: ("text/csv; charset=utf-8", "csv"),
+    ExportFormat.NETSCAPE: ("text/html; charset=utf-8", "html"),
+}
+
+
+def _as_dict(bookmark: Bookmark) -> dict:
+    return {"id": bookmark.id,
+            "url": bookmark.url,
+            "title": bookmark.title,
+            "description": bookmark.description,
+            "tags": bookmark.tags,
+            "favorite": bookmark.favorite,
+            "favicon_url": bookmark.favicon_url,
+            "created_at": bookmark.created_at.isoformat() if bookmark.created_at else None,
+            "updated_at": bookmark.updated_at.isoformat() if bookmark.updated_at else None}
+
+
+def render_ndjson(bookmarks: Iterable[Bookmark]) -> bytes:
+    return b"".join(to_json(_as_dict(bookmark)) + b"\n" for bookmark in bookmarks)
+
+
+def render_csv(bookmarks: Iterable[Bookmark]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for bookmark in bookmarks:
+        row = _as_dict(bookmark)
+        row["tags"] = ",".join(row["tags"] or [])
+        writer.writerow([row[column] for column in CSV_COLUMNS])
+    return buffer.getvalue().encode()
+
+
+def render_netscape(bookmarks: Iterable[Bookmark]) -> bytes:
+    lines = []
+    for bookmark in bookmarks:
+        attributes = f'HREF="{html.escape(bookmark.url)}"'
+        if bookmark.created_at:
+            # stored as naive UTC
+            attributes += f' ADD_DATE="{int(bookmark.created_at.replace(tzinfo=timezone.utc).timestamp())}"'
+        if bookmark.tags:
+            attributes += f' TAGS="{html.escape(",".join(bookmark.tags))}"'
+        lines.append(f"    <DT><A {attributes}>{html.escape(bookmark.title)}</A>\n")
+        if bookmark.description:
+            lines.append(f"    <DD>{html.escape(bookmark.description)}\n")
+    return "".join(lines).encode()
+
+
+RENDERERS = {
+    ExportFormat.NDJSON: render_ndjson,
+    ExportFormat.CSV: render_csv,
+    ExportFormat.NETSCAPE: render_netscape,
+}
+
+
+async def export_bookmarks(session_factory: async_sessionmaker[AsyncSession],
+                           owner_id: int,
+                           format: ExportFormat,
+                           chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    if format == ExportFormat.CSV:
+        yield (",".join(CSV_COLUMNS) + "\r\n").encode()
+    elif format == ExportFormat.NETSCAPE:
+        yield NETSCAPE_HEADER.encode()
+
+    render = RENDERERS[format]
+    stmt = (select(Bookmark)
+            .where(Bookmark.owner_id == owner_id)
+            .order_by(Bookmark.id)
+            .execution_options(yield_per=chunk_size))
+    # its own session - the request's one is closed before the body is sent
+    async with session_factory() as session:
+        result = await session.stream_scalars(stmt)
+        async for partition in result.partitions():
+            yield render(partition)
+
+    if format == ExportFormat.NETSCAPE:
+        yield NETSCAPE_FOOTER.encode()
@@ -0,0 +1,382 @@
+"""Streaming import of browser bookmark exports.
+
+The request body is parsed chunk by chunk (Netscape bookmark HTML, a JSON
+array or NDJSON) and written in batches - one executemany INSERT and one
+commit per batch. Nothing but the current batch is held in memory, so a 50k
+bookmark file costs the same RAM as a 50 bookmark one.
+"""
+import codecs
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from html.parser import HTMLParser
+from typing import Any, AsyncIterable, AsyncIterator
+from pydantic import HttpUrl, TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.counters import adjust_counters, is_tagged
+from ..db.models import Bookmark
+from .enrichment import EnrichmentQueue, STATUS_PENDING, TITLE_MAX_LENGTH
+from .response_cache import response_cache
+from .semantic_index import submit_semantic_sync
+from .urls import url_hash
+
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "100"))
+
+URL_MAX_LENGTH = 2048
+DESCRIPTION_MAX_LENGTH = 255
+
+_url_adapter = TypeAdapter(HttpUrl)
+
+
+class ImportFormat(str, Enum):
+    HTML = "html"
+    JSON = "json"
+    NDJSON = "ndjson"
+
+
+class ImportFormatError(ValueError):
+    """The file itself can't be read - wrong format, truncated JSON..."""
+
+
+class InvalidRow(ValueError):
+    """One entry of the file is broken, the rest of the import goes on."""
+
+
+@dataclass
+class ImportSummary:
+    processed: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    deferred: int = 0
+    errors: list[dict] = field(default_factory=list)
+    aborted: str | None = None
+
+    def add_error(self, row: int, error: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+
+# === FORMAT DETECTION ===
+CONTENT_TYPES = {
+    "text/html": ImportFormat.HTML,
+    "application/json": ImportFormat.JSON,
+    "application/x-ndjson": ImportFormat.NDJSON,
+    "application/jsonl": ImportFormat.NDJSON,
+    "application/jsonlines": ImportFormat.NDJSON,
+}
+
+
+def detect_format(content_type: str | None, head: bytes) -> ImportFormat:
+    """Content-Type first, then a look at the first byte of the body."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CONTENT_TYPES:
+        return CONTENT_TYPES[media_type]
+    first = head.lstrip(codecs.BOM_UTF8 + b" \t\r\n")[:1]
+    if first == b"<":
+        return ImportFormat.HTML
+    if first == b"[":
+        return ImportFormat.JSON
+    if first == b"{":
+        return ImportFormat.NDJSON
+    raise ImportFormatError("Unknown import format, expected Netscape HTML, JSON or NDJSON.")
+
+
+# === PARSERS - async iterables of bytes in, raw entries out ===
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield _loads(line)
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield _loads(buffer)
+
+
+def _loads(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as exception:
+        return InvalidRow(f"Invalid JSON: {exception}")
+
+
+async def iter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """Items of a top-level JSON array, decoded one at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    json_decoder = json.JSONDecoder()
+    buffer = ""
+    started = finished = False
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        position = 0
+        while not finished:
+            position = _skip_whitespace(buffer, position)
+            if position == len(buffer):
+                break
+            char = buffer[position]
+            if not started:
+                if char != "[":
+                    raise ImportFormatError("JSON import must be an array of bookmarks.")
+                started = True
+                position += 1
+            elif char == ",":
+                position += 1
+            elif char == "]":
+                finished = True
+            else:
+                try:
+                    value, position = json_decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    break  # the item continues in the next chunk
+                yield value
+        buffer = buffer[position:]
+        if finished:
+            return
+    raise ImportFormatError("JSON import is truncated or invalid." if started
+                            else "JSON import is empty.")
+
+
+def _skip_whitespace(text: str, position: int) -> int:
+    while position < len(text) and text[position] in " \t\r\n":
+        position += 1
+    return position
+
+
+class NetscapeBookmarkParser(HTMLParser):
+    """<DT><A HREF ADD_DATE TAGS>title</A> entries, with the <DD> description
+    that may follow. html.parser drops input as soon as it's consumed - unlike
+    libxml2's push parser, which keeps the whole document buffered."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.entries: list[dict] = []
+        self._pending: dict | None = None
+        self._text: list[str] | None = None
+        self._in_description = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self._flush()
+            attributes = dict(attrs)
+            self._pending = {"url": attributes.get("href"),
+                             "tags": attributes.get("tags"),
+                             "created_at": attributes.get("add_date")}
+            self._text = []
+        elif tag == "dd" and self._pending is not None:
+            self._in_description = True
+            self._text = []
+        elif tag in ("dt", "dl", "h3"):
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._pending is not None and not self._in_description:
+            self._pending["title"] = "".join(self._text)
+            self._text = None
+        elif tag in ("dd", "dl"):
+            self._flush()
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _flush(self):
+        if self._pending is not None:
+            if self._in_description:
+                self._pending["description"] = "".join(self._text).strip() or None
+            self.entries.append(self._pending)
+        self._pending = self._text = None
+        self._in_description = False
+
+
+async def iter_netscape_html(chunks: AsyncIterable[bytes]) -> AsyncIterator[dict]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    parser = NetscapeBookmarkParser()
+    async for chunk in chunks:
+        parser.feed(decoder.decode(chunk))
+        for entry in parser.entries:
+            yield entry
+        parser.entries.clear()
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    for entry in parser.entries:
+        yield entry
+
+
+PARSERS = {
+    ImportFormat.HTML: iter_netscape_html,
+    ImportFormat.JSON: iter_json_array,
+    ImportFormat.NDJSON: iter_ndjson,
+}
+
+
+async def parse_bookmarks(chunks: AsyncIterable[bytes],
+                          format: ImportFormat | None = None,
+                          content_type: str | None = None) -> AsyncIterator[Any]:
+    iterator = aiter(chunks)
+    head = b""
+    async for head in iterator:
+        if head.strip():
+            break
+    if format is None:
+        format = detect_format(content_type, head)
+
+    async def rest():
+        yield head
+        async for chunk in iterator:
+            yield chunk
+
+    async for entry in PARSERS[format](rest()):
+        yield entry
+
+
+# === ROWS ===
+def bookmark_values(entry: Any) -> dict:
+    """Raw entry of any format -> column values, ValueError when unusable."""
+    if isinstance(entry, Exception):
+        raise entry
+    if not isinstance(entry, dict):
+        raise InvalidRow("Entry is not an object.")
+
+    try:
+        url = str(_url_adapter.validate_python(entry.get("url")))
+    except ValidationError:
+        raise InvalidRow(f"Invalid URL: {entry.get('url')!r}")
+    if len(url) > URL_MAX_LENGTH:
+        raise InvalidRow("URL is too long.")
+
+    title = " ".join(str(entry.get("title") or "").split())
+    values = {"url": url,
+              "title": (title or url)[:TITLE_MAX_LENGTH],
+              "description": (str(entry["description"])[:DESCRIPTION_MAX_LENGTH]
+                              if entry.get("description") else None),
+              "tags": _tags(entry.get("tags")),
+              "favorite": bool(entry.get("favorite", False))}
+    created_at = _timestamp(entry.get("created_at"))
+    if created_at is not None:
+        values["created_at"] = created_at
+    return values
+
+
+def _tags(tags: Any) -> list[str] | None:
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    if not isinstance(tags, list):
+        return None
+    names = list(dict.fromkeys(str(tag).strip() for tag in tags if str(tag).strip()))
+    return names or None
+
+
+def _timestamp(value: Any) -> datetime | None:
+    """Epoch seconds (Netscape ADD_DATE) or ISO 8601, stored as naive UTC."""
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, (int, float)) or str(value).isdigit():
+            return datetime.fromtimestamp(int(value), timezone.utc).replace(tzinfo=None)
+        parsed = datetime.fromisoformat(str(value))
+    except (ValueError, OverflowError, OSError):
+        raise InvalidRow(f"Invalid date: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+# === WRITER ===
+async def import_bookmarks(db: AsyncSession,
+                           owner_id: int,
+                           entries: AsyncIterable[Any],
+                           batch_size: int = IMPORT_BATCH_SIZE,
+                           enrichment: EnrichmentQueue | None = None) -> ImportSummary:
+    """Insert parsed entries in batches, skipping URLs the user already has
+    (same canonical URL, compared by url_hash).
+
+    With an enrichment queue the rows are saved as "pending" and queued for
+    scraping; the ones that don't fit in the queue stay pending and are picked
+    up by the next start of the queue. Without one nothing is scraped.
+    """
+    summary = ImportSummary()
+    batch: dict[bytes, dict] = {}
+    try:
+        async for entry in entries:
+            summary.processed += 1
+            try:
+                values = bookmark_values(entry)
+            except ValueError as exception:
+                summary.add_error(summary.processed, str(exception))
+                continue
+            values["url_hash"] = url_hash(values["url"])
+            if values["url_hash"] in batch:
+                summary.duplicates += 1
+                continue
+            batch[values["url_hash"]] = values
+            if len(batch) >= batch_size:
+                await _write_batch(db, owner_id, batch, summary, enrichment)
+                batch = {}
+    except ImportFormatError as exception:
+        summary.aborted = str(exception)
+    if batch:
+        await _write_batch(db, owner_id, batch, summary, enrichment)
+    return summary
+
+
+async def _write_batch(db: AsyncSession,
+                       owner_id: int,
+                       batch: dict[bytes, dict],
+                       summary: ImportSummary,
+                       enrichment: EnrichmentQueue | None):
+    existing = await db.scalars(select(Bookmark.url_hash)
+                                .where(Bookmark.owner_id == owner_id,
+                                       Bookmark.url_hash.in_(batch.keys())))
+    for digest in existing:
+        del batch[digest]
+        summary.duplicates += 1
+    if not batch:
+        await db.rollback()  # end the lookup's transaction
+        return
+
+    rows = [{**values,
+             "owner_id": owner_id,
+             "enrichment_status": STATUS_PENDING if enrichment is not None else "done"}
+            for values in batch.values()]
+    # a concurrent import or save can add one of these URLs between the
+    # lookup and the insert - the unique index skips it as a duplicate
+    statement = (insert(Bookmark)
+                 .on_conflict_do_nothing(index_elements=["owner_id", "url_hash"])
+                 .returning(Bookmark.id, Bookmark.url_hash))
+    inserted = (await db.execute(statement, rows)).all()
+    summary.duplicates += len(rows) - len(inserted)
+    rows = [batch[digest] for _, digest in inserted]
+    await adjust_counters(db, owner_id,
+                          bookmarks=len(rows),
+                          favorites=sum(row["favorite"] for row in rows),
+                          tagged=sum(is_tagged(row["tags"]) for row in rows))
+    await db.commit()
+    await response_cache.invalidate(owner_id)
+    submit_semantic_sync(owner_id)
+
+    summary.imported += len(rows)
+    if enrichment is not None:
+        for bookmark_id, digest in inserted:
+            summary.deferred += 1
+            enrichment.submit(bookmark_id, batch[digest]["url"])
+    logger.info("Import for user %s: %d processed, %d imported, %d duplicates, %d failed",
+                owner_id, summary.processed, summary.imported, summary.duplicates, summary.failed)
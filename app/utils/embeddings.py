@@ -0,0 +1,214 @@
+"""Text embeddings for semantic search, computed off the event loop.
+
+When EMBEDDING_MODEL_PATH points at a locally stored Hugging Face model
+directory, texts are embedded with that model. Tokens are mean pooled over
+the last hidden state and L2 normalised. Nothing is ever downloaded.
+
+Without a model, or when transformers/torch are not installed,
+HashingEmbedder takes over. It hashes word unigrams and bigrams into
+EMBEDDING_DIMENSIONS signed buckets, weights them by sublinear term
+frequency, and L2 normalises the result. This is the hashing trick: there is
+no vocabulary to fit or store, and a vector never changes as the corpus
+grows.
+
+Both embedders are CPU-bound. EmbeddingPool runs them in EMBEDDING_WORKERS
+processes, and each process loads the model once. 0 workers means a single
+in-process thread instead, for tests and tiny deployments.
+
+The workers are shared by index syncs and search queries. Only one job per
+worker is handed to the executor at a time, and a waiting query takes the
+next free worker before any sync batch - a search waits for at most the
+batches already running, not for a whole sync.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import re
+import zlib
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "")
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "256"))  # hashing fallback only
+EMBEDDING_MAX_TOKENS = int(os.getenv("EMBEDDING_MAX_TOKENS", "256"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "1"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+# lanes of EmbeddingPool, lowest first
+PRIORITY_QUERY = 0
+PRIORITY_SYNC = 1
+
+logger = logging.getLogger(__name__)
+
+
+# === EMBEDDERS ===
+_TOKEN = re.compile(r"\w+")
+STOP_WORDS = frozenset("a an and are as at be by for from how in is it of on or that the this to was what "
+                       "why with you your".split())
+
+
+class HashingEmbedder:
+    """Feature hashing of words and word pairs - no model, no fitted state."""
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    @staticmethod
+    def features(text: str) -> list[str]:
+        words = [word for word in _TOKEN.findall(text.lower()) if word not in STOP_WORDS]
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in Counter(self.features(text)).items():
+                digest = zlib.crc32(feature.encode())
+                # the top bit picks the sign, so collisions cancel out on average
+                sign = -1.0 if digest & 0x80000000 else 1.0
+                vectors[row, digest % self.dimensions] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class TransformerEmbedder:
+    """Mean pooled sentence embeddings of a local transformers model."""
+
+    def __init__(self, path: str, max_tokens: int = EMBEDDING_MAX_TOKENS):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self.torch = torch
+        self.max_tokens = max_tokens
+        self.tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+        self.model = AutoModel.from_pretrained(path, local_files_only=True).eval()
+        self.dimensions = self.model.config.hidden_size
+        self.name = f"model-{os.path.basename(os.path.normpath(path))}-{self.dimensions}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        with self.torch.inference_mode():
+            batch = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_tokens,
+                                   return_tensors="pt")
+            hidden = self.model(**batch).last_hidden_state
+            mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            pooled = self.torch.nn.functional.normalize(pooled, dim=1)
+        return pooled.numpy().astype(np.float32)
+
+
+def load_embedder(model_path: str = EMBEDDING_MODEL_PATH, dimensions: int = EMBEDDING_DIMENSIONS):
+    if model_path:
+        try:
+            return TransformerEmbedder(model_path)
+        except Exception:
+            logger.warning("Embedding model %r could not be loaded, using the hashing embedder",
+                           model_path, exc_info=True)
+    return HashingEmbedder(dimensions)
+
+
+# === WORKER SIDE ===
+_embedder = None
+
+
+def _init_worker(model_path: str, dimensions: int):
+    global _embedder
+    _embedder = load_embedder(model_path, dimensions)
+    if isinstance(_embedder, TransformerEmbedder):
+        # one intra-op thread per process - the pool already uses the cores
+        _embedder.torch.set_num_threads(1)
+
+
+def _describe() -> tuple[str, int]:
+    return _embedder.name, _embedder.dimensions
+
+
+def _embed(texts: list[str]) -> np.ndarray:
+    return _embedder.embed(texts)
+
+
+# === POOL ===
+class EmbeddingPool:
+    """embed() batches texts across the workers; the event loop only waits."""
+
+    def __init__(self,
+                 workers: int = EMBEDDING_WORKERS,
+                 model_path: str = EMBEDDING_MODEL_PATH,
+                 dimensions: int = EMBEDDING_DIMENSIONS,
+                 batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.workers = workers
+        self.model_path = model_path
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+        self.name: str | None = None
+        self._executor: Executor | None = None
+        self._free_slots = max(workers, 1)
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    async def start(self):
+        if self._executor is not None:
+            return
+        initargs = (self.model_path, self.dimensions)
+        if self.workers > 0:
+            # spawn - a forked child would inherit the parent's event loop,
+            # open database connections and threads
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_init_worker, initargs=initargs)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding",
+                                                initializer=_init_worker, initargs=initargs)
+        self.name, self.dimensions = await self._run(_describe)
+
+    async def _run(self, function, *args, priority: int = PRIORITY_SYNC):
+        await self._acquire(priority)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int):
+        if self._free_slots and not self._waiters:
+            self._free_slots -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        # FIFO within a lane
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                self._release()  # handed a slot just as it was cancelled
+            raise
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._free_slots += 1
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        return np.concatenate(await asyncio.gather(*(self._run(_embed, batch) for batch in batches)))
+
+    async def embed_query(self, text: str) -> np.ndarray:
+        """One text, ahead of every queued sync batch."""
+        return (await self._run(_embed, [text], priority=PRIORITY_QUERY))[0]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
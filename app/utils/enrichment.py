@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+from typing import Callable
+import httpx
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..db.models import Bookmark
+from .articles import submit_article_extraction
+from .favicons import get_favicon_store
+from .http_client import get_http_client
+from .metadata_cache import get_page_metadata
+from .response_cache import response_cache
+from .semantic_index import submit_semantic_sync
+from .simhash import simhash
+
+
+logger = logging.getLogger(__name__)
+
+# "inline" scrapes inside POST /bookmarks/ (the old behaviour), "background"
+# returns 201 at once and lets the worker pool fill in title and favicon
+ENRICHMENT_MODE = os.getenv("ENRICHMENT_MODE", "inline")
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "4"))
+ENRICHMENT_QUEUE_SIZE = int(os.getenv("ENRICHMENT_QUEUE_SIZE", "1000"))
+ENRICHMENT_DRAIN_TIMEOUT = float(os.getenv("ENRICHMENT_DRAIN_TIMEOUT", "30"))
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+TITLE_MAX_LENGTH = 100
+
+
+class EnrichmentQueue:
+    """Bounded queue of bookmarks waiting for scraping, served by N workers."""
+
+    def __init__(self,
+                 session_factory: async_sessionmaker[AsyncSession],
+                 workers: int = ENRICHMENT_WORKERS,
+                 maxsize: int = ENRICHMENT_QUEUE_SIZE,
+                 client_factory: Callable[[], httpx.AsyncClient] = get_http_client):
+        self.session_factory = session_factory
+        self.client_factory = client_factory
+        self.workers = workers
+        self._queue: asyncio.Queue[tuple[int, str]] = asyncio.Queue(maxsize=maxsize)
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self, requeue: bool = True):
+        if self.running:
+            return
+        self._tasks = [asyncio.create_task(self._worker(), name=f"enrichment-{i}")
+                       for i in range(self.workers)]
+        if requeue:
+            await self._requeue_pending()
+
+    def submit(self, bookmark_id: int, url: str) -> bool:
+        """Queue a bookmark; False when the queue is full (caller scrapes inline)."""
+        try:
+            self._queue.put_nowait((bookmark_id, url))
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def drain(self, timeout: float | None = ENRICHMENT_DRAIN_TIMEOUT):
+        """Finish queued work (up to timeout), then stop the workers.
+
+        Whatever is left stays "pending" in the database and is queued again
+        by the next start().
+        """
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Enrichment drain timed out, %d bookmark(s) left pending", self.pending())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _requeue_pending(self):
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Bookmark.id, Bookmark.url)
+                .where(Bookmark.enrichment_status == STATUS_PENDING)
+                .order_by(Bookmark.id)
+                .limit(self._queue.maxsize - self._queue.qsize()))
+            for bookmark_id, url in result.all():
+                self.submit(bookmark_id, url)
+
+    async def _worker(self):
+        while True:
+            bookmark_id, url = await self._queue.get()
+            try:
+                await self.enrich(bookmark_id, url)
+            except Exception:
+                logger.exception("Enrichment of bookmark %s failed", bookmark_id)
+            finally:
+                self._queue.task_done()
+
+    async def enrich(self, bookmark_id: int, url: str):
+        metadata = await get_page_metadata(url, self.client_factory())
+        values = {"enrichment_status": STATUS_DONE if metadata and metadata.title else STATUS_FAILED}
+        remember_favicon = None
+        if metadata is not None:
+            if metadata.title:
+                values["title"] = metadata.title[:TITLE_MAX_LENGTH]
+            if metadata.favicon_url:
+                values["favicon_url"] = metadata.favicon_url
+                values["favicon_hash"], remember_favicon = await self._favicon(url, metadata.favicon_url)
+            values["simhash"] = simhash(metadata.title, metadata.description)
+
+        async with self.session_factory() as session:
+            if remember_favicon is not None:
+                await session.execute(remember_favicon)
+            # a bookmark the user edited meanwhile is no longer pending -
+            # their title wins over the scraped one
+            result = await session.execute(update(Bookmark)
+                                           .where(Bookmark.id == bookmark_id,
+                                                  Bookmark.enrichment_status == STATUS_PENDING)
+                                           .values(**values)
+                                           .returning(Bookmark.owner_id))
+            owner_id = result.scalar_one_or_none()
+            await session.commit()
+        if owner_id is not None:
+            await response_cache.invalidate(owner_id)
+            submit_semantic_sync(owner_id)
+            if values["enrichment_status"] == STATUS_DONE:
+                submit_article_extraction(bookmark_id, url)
+
+    async def _favicon(self, url: str, icon_url: str):
+        async with self.session_factory() as session:
+            return await get_favicon_store().resolve(session, url, icon_url, self.client_factory())
+
+
+enrichment_queue: EnrichmentQueue | None = None
+
+
+async def start_enrichment_queue(session_factory: async_sessionmaker[AsyncSession]) -> EnrichmentQueue | None:
+    global enrichment_queue
+    if ENRICHMENT_MODE != "background":
+        return None
+    enrichment_queue = EnrichmentQueue(session_factory)
+    await enrichment_queue.start()
+    return enrichment_queue
+
+
+async def stop_enrichment_queue():
+    global enrichment_queue
+    if enrichment_queue is not None:
+        await enrichment_queue.drain()
+        enrichment_queue = None
+
+
+def get_enrichment_queue() -> EnrichmentQueue | None:
+    """Running queue in background mode, None means scrape inline."""
+    if enrichment_queue is not None and enrichment_queue.running:
+        return enrichment_queue
+    return None
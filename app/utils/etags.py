@@ -0,0 +1,38 @@
+"""Weak ETags for bookmark reads, conditional requests.
+
+Pollers of GET /bookmarks/ and GET /bookmarks/{id} send If-None-Match and get
+a 304 when nothing changed. The tags are computed from a couple of cheap
+aggregates (count, max(updated_at)) and the query parameters, so a 304 is
+answered before a single row is loaded or serialized. PUT and DELETE accept
+If-Match for optimistic concurrency.
+
+All tags are weak and compared weakly, If-Match included.
+"""
+import hashlib
+from datetime import datetime
+from typing import Any
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha256("\0".join(map(str, parts)).encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def bookmark_etag(bookmark_id: int, updated_at: datetime | None) -> str:
+    return make_etag("bookmark", bookmark_id, updated_at.isoformat() if updated_at else "")
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """Does an If-None-Match / If-Match header value match etag? "*" matches any."""
+    if not header:
+        return False
+    opaque = _opaque(etag)
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or _opaque(candidate) == opaque:
+            return True
+    return False
+
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
@@ -0,0 +1,40 @@
+"""Fast JSON responses for the bookmark routers.
+
+By default FastAPI validates the return value against response_model, turns
+it back into plain Python objects and hands those to json.dumps. Routes that
+return a FastJSONResponse skip that round trip: pydantic-core validates the
+content once and writes the JSON bytes itself, with one compiled TypeAdapter
+per response model, built on first use and then reused.
+
+Routes opt in by returning FastJSONResponse(content, model=...); keep
+response_model on the route for the OpenAPI schema.
+"""
+from functools import lru_cache
+from typing import Any
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from .request_timing import timed
+
+
+@lru_cache(maxsize=None)
+def get_adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def dump_json(model: Any, content: Any) -> bytes:
+    """Validate content (dicts, rows or ORM objects) as model, serialize to bytes."""
+    adapter = get_adapter(model)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def __init__(self, content: Any, model: Any, status_code: int = 200, headers: dict | None = None):
+        self.model = model
+        super().__init__(content, status_code=status_code, headers=headers)
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return dump_json(self.model, content)
@@ -0,0 +1,231 @@
+"""Content-addressed favicon store behind GET /favicons/{hash}.
+
+Clients used to load favicon_url from the bookmarked site on every render.
+Instead, each icon is downloaded once per domain, when the first bookmark of
+that domain is enriched. The favicon table remembers the domain's icon hash,
+so later bookmarks of the domain download nothing. The bytes are stored
+under their hash:
+
+    FAVICON_STORE_PATH/<first 2 hex digits>/<hash>
+
+so the same icon reached from many domains (CDNs, blog platforms) is stored
+once. With Pillow installed and FAVICON_SIZE > 0, icons are normalised to a
+PNG of at most FAVICON_SIZE px, on a worker thread. Without it, the original
+bytes are kept.
+
+Only raster images are stored. An SVG served from this origin could run
+scripts, so it is refused and the bookmark keeps just its remote favicon_url.
+A file never changes once written, so it is served with an immutable
+Cache-Control.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+import httpx
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import Favicon
+from .http_client import get_http_client
+
+try:
+    from PIL import Image
+except ImportError:  # optional - icons are stored as downloaded
+    Image = None
+
+load_dotenv()
+
+FAVICON_STORE_PATH = os.getenv("FAVICON_STORE_PATH", "favicons")
+FAVICON_SIZE = int(os.getenv("FAVICON_SIZE", "64"))  # 0 - keep the original
+FAVICON_MAX_BYTES = int(os.getenv("FAVICON_MAX_BYTES", str(256 * 1024)))
+FAVICON_TTL = float(os.getenv("FAVICON_TTL", str(30 * 24 * 3600)))
+FAVICON_NEGATIVE_TTL = float(os.getenv("FAVICON_NEGATIVE_TTL", str(24 * 3600)))
+
+# a small file can still decode to a huge image
+MAX_PIXELS = 1024 * 1024
+
+MEDIA_TYPES = {
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"\x00\x00\x01\x00": "image/x-icon",
+    b"GIF87a": "image/gif",
+    b"GIF89a": "image/gif",
+    b"\xff\xd8\xff": "image/jpeg",
+    b"RIFF": "image/webp",
+    b"BM": "image/bmp",
+}
+
+
+def media_type(data: bytes) -> str | None:
+    """Type of a raster image from its magic bytes, None for anything else."""
+    for magic, name in MEDIA_TYPES.items():
+        if data.startswith(magic):
+            if name == "image/webp" and data[8:12] != b"WEBP":
+                return None
+            return name
+    return None
+
+
+def _now() -> datetime:
+    # naive UTC, like everything SQLite stores
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _content_length(response: httpx.Response) -> int:
+    # a malformed header counts as unknown - the body is capped as it streams
+    try:
+        return int(response.headers.get("Content-Length") or 0)
+    except ValueError:
+        return 0
+
+
+def favicon_domain(url) -> str:
+    host = (urlsplit(str(url)).hostname or "").lower()
+    return host.removeprefix("www.")
+
+
+def normalize_icon(data: bytes, size: int = FAVICON_SIZE) -> bytes | None:
+    """A PNG of at most size x size px, None when it isn't a usable image."""
+    if media_type(data) is None:
+        return None
+    if Image is None or size <= 0:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width * image.height > MAX_PIXELS:
+                return None
+            if image.format == "ICO":
+                # the largest of the sizes inside the .ico
+                image.size = max(image.info.get("sizes") or [image.size])
+            image = image.convert("RGBA")
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, format="PNG", optimize=True)
+            return output.getvalue()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+class FaviconStore:
+    def __init__(self, path: str = FAVICON_STORE_PATH, size: int = FAVICON_SIZE,
+                 max_bytes: int = FAVICON_MAX_BYTES, ttl: float = FAVICON_TTL,
+                 negative_ttl: float = FAVICON_NEGATIVE_TTL):
+        self.path = path
+        self.size = size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # one download per icon at a time, concurrent enrichments share it
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    def file(self, icon_hash: str) -> str:
+        return os.path.join(self.path, icon_hash[:2], icon_hash)
+
+    # === DOMAINS ===
+    async def lookup(self, db: AsyncSession, page_url) -> tuple[bool, str | None]:
+        """(known, hash) of the page's domain. known is False when the domain
+        was never fetched or its entry has expired. A known domain may still
+        have no icon (hash None)."""
+        row = (await db.execute(select(Favicon.hash, Favicon.fetched_at)
+                                .where(Favicon.domain == favicon_domain(page_url)))).one_or_none()
+        if row is None or row.fetched_at is None:
+            return False, None
+        ttl = self.ttl if row.hash is not None else self.negative_ttl
+        return row.fetched_at + timedelta(seconds=ttl) > _now(), row.hash
+
+    def remember_statement(self, page_url, icon_hash: str | None):
+        statement = insert(Favicon).values(domain=favicon_domain(page_url), hash=icon_hash,
+                                           fetched_at=_now())
+        return statement.on_conflict_do_update(index_elements=["domain"],
+                                               set_={"hash": statement.excluded.hash,
+                                                     "fetched_at": statement.excluded.fetched_at})
+
+    async def resolve(self, db: AsyncSession, page_url, icon_url: str | None,
+                      client: httpx.AsyncClient | None = None):
+        """(hash, domain entry to write or None) of the page's icon, downloaded
+        only when its domain has none yet. The lookup's transaction on db is
+        ended before the download - the writer connection isn't held for it.
+        The caller executes the entry in its own write."""
+        known, icon_hash = await self.lookup(db, page_url)
+        await db.rollback()
+        if known or not icon_url:
+            return icon_hash, None
+        icon_hash = await self.fetch(icon_url, client)
+        return icon_hash, self.remember_statement(page_url, icon_hash)
+
+    # === FILES ===
+    async def fetch(self, icon_url: str, client: httpx.AsyncClient | None = None) -> str | None:
+        """Download, normalise and store an icon, None when there's no usable one."""
+        future = self._in_flight.get(icon_url)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[icon_url] = future
+        try:
+            data = await self._download(icon_url, client or get_http_client())
+            icon_hash = await asyncio.to_thread(self._store, data) if data else None
+        except Exception as exception:
+            future.set_exception(exception)
+            future.exception()  # waiters re-raise it, don't warn when there are none
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(icon_hash)
+            return icon_hash
+        finally:
+            del self._in_flight[icon_url]
+
+    async def _download(self, icon_url: str, client: httpx.AsyncClient) -> bytes | None:
+        try:
+            async with client.stream("GET", icon_url) as response:
+                response.raise_for_status()
+                if _content_length(response) > self.max_bytes:
+                    return None
+                data = bytearray()
+                async for chunk in response.aiter_bytes():
+                    data += chunk
+                    if len(data) > self.max_bytes:
+                        return None
+                return bytes(data)
+        except httpx.HTTPError:
+            return None
+
+    def _store(self, data: bytes) -> str | None:
+        icon = normalize_icon(data, self.size)
+        if icon is None:
+            return None
+        icon_hash = hashlib.sha256(icon).hexdigest()[:32]
+        path = self.file(icon_hash)
+        if not os.path.exists(path):
+            # written aside and renamed - a reader never sees half a file
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(icon)
+            os.replace(temporary, path)
+        return icon_hash
+
+    def media_type(self, icon_hash: str) -> str | None:
+        """Type of a stored icon, None when there's no such file."""
+        try:
+            with open(self.file(icon_hash), "rb") as file:
+                return media_type(file.read(16)) or "application/octet-stream"
+        except OSError:
+            return None
+
+
+_store: FaviconStore | None = None
+
+
+def get_favicon_store() -> FaviconStore:
+    global _store
+    if _store is None:
+        _store = FaviconStore()
+    return _store
@@ -0,0 +1,61 @@
+import os
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
+# One pooled client for every outgoing request, so repeated scrapes reuse
+# TCP/TLS connections instead of handshaking per bookmark.
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+# needs the h2 package (pip install "httpx[http2]")
+HTTP2 = _env_flag("HTTP2")
+
+USER_AGENT = os.getenv("HTTP_USER_AGENT", "BookmarkManager/1.0")
+
+_client: httpx.AsyncClient | None = None
+
+
+def create_http_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=transport,
+        http2=HTTP2,
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        headers={"User-Agent": USER_AGENT})
+
+
+async def start_http_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """Create the shared client (called from the app lifespan)."""
+    global _client
+    await close_http_client()
+    _client = create_http_client(transport)
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared client, also usable as a FastAPI dependency.
+
+    Created lazily when the lifespan hook didn't run (scripts, ASGI test clients).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
@@ -0,0 +1,251 @@
+"""Page metadata cache in front of the scraper.
+
+Popular URLs get saved over and over, so scraped metadata is kept per
+normalized URL in two tiers: an in-process LRU and a SQLite file that survives
+restarts. Fresh entries cost nothing; expired ones are revalidated with
+If-None-Match/If-Modified-Since, so an unchanged page costs one cheap 304.
+Failed fetches are cached too (for a shorter time) so a dead site isn't
+hammered on every save.
+"""
+import asyncio
+import dataclasses
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+import httpx
+from dotenv import load_dotenv
+
+from .request_timing import timed
+from .scraper import PageMetadata, fetch_metadata
+from .urls import normalize_url
+
+load_dotenv()
+
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", "2048"))
+METADATA_CACHE_PATH = os.getenv("METADATA_CACHE_PATH", "metadata_cache.db")
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", str(24 * 3600)))
+METADATA_CACHE_NEGATIVE_TTL = float(os.getenv("METADATA_CACHE_NEGATIVE_TTL", "600"))
+
+
+@dataclass
+class CacheEntry:
+    metadata: PageMetadata | None  # None - the last fetch failed
+    expires_at: float
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    refreshed: int = 0
+    failures: int = 0
+
+    @property
+    def requests(self) -> int:
+        return self.hits + self.negative_hits + self.misses + self.revalidated + self.refreshed
+
+    @property
+    def hit_rate(self) -> float:
+        # a 304 revalidation counts as a hit - no page was downloaded
+        served = self.hits + self.negative_hits + self.revalidated
+        return served / self.requests if self.requests else 0.0
+
+    def as_dict(self) -> dict:
+        return {**dataclasses.asdict(self), "requests": self.requests, "hit_rate": round(self.hit_rate, 4)}
+
+
+class SQLiteCacheStore:
+    """Persistent tier - one small table in its own SQLite file."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS url_metadata (
+                url TEXT PRIMARY KEY,
+                metadata TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL
+            )""")
+        self._connection.commit()
+
+    def load(self, url: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT metadata, etag, last_modified, expires_at FROM url_metadata WHERE url = ?",
+                (url,)).fetchone()
+        if row is None:
+            return None
+        metadata, etag, last_modified, expires_at = row
+        return CacheEntry(metadata=PageMetadata(**json.loads(metadata)) if metadata else None,
+                          expires_at=expires_at,
+                          etag=etag,
+                          last_modified=last_modified)
+
+    def save(self, url: str, entry: CacheEntry):
+        metadata = json.dumps(dataclasses.asdict(entry.metadata)) if entry.metadata else None
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO url_metadata (url, metadata, etag, last_modified, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, metadata, entry.etag, entry.last_modified, entry.expires_at))
+            self._connection.commit()
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM url_metadata")
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class MetadataCache:
+    def __init__(self,
+                 max_entries: int = METADATA_CACHE_SIZE,
+                 path: str | None = METADATA_CACHE_PATH,
+                 ttl: float = METADATA_CACHE_TTL,
+                 negative_ttl: float = METADATA_CACHE_NEGATIVE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._store = SQLiteCacheStore(path) if path else None
+        # one fetch per URL at a time, concurrent saves of the same URL share it
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    async def get(self, url, client: httpx.AsyncClient | None = None) -> PageMetadata | None:
+        key = normalize_url(url)
+        entry = await self._lookup(key)
+        if entry is not None and entry.fresh(time.time()):
+            if entry.metadata is None:
+                self.stats.negative_hits += 1
+            else:
+                self.stats.hits += 1
+            return entry.metadata
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            metadata = await self._fetch(key, str(url), entry, client)
+        except Exception as exception:
+            future.set_exception(exception)
+            future.exception()  # waiters re-raise it, don't warn when there are none
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(metadata)
+            return metadata
+        finally:
+            del self._in_flight[key]
+
+    async def _fetch(self, key: str, url: str, entry: CacheEntry | None,
+                     client: httpx.AsyncClient | None) -> PageMetadata | None:
+        headers = {}
+        if entry is not None and entry.metadata is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        result = await fetch_metadata(url, client, headers=headers or None)
+        now = time.time()
+        if result is not None and result.not_modified and entry is not None and entry.metadata is not None:
+            self.stats.revalidated += 1
+            new_entry = dataclasses.replace(entry,
+                                            expires_at=now + self.ttl,
+                                            etag=result.etag or entry.etag,
+                                            last_modified=result.last_modified or entry.last_modified)
+        elif result is not None and result.metadata is not None:
+            if entry is None:
+                self.stats.misses += 1
+            else:
+                self.stats.refreshed += 1
+            new_entry = CacheEntry(metadata=result.metadata,
+                                   expires_at=now + self.ttl,
+                                   etag=result.etag,
+                                   last_modified=result.last_modified)
+        else:
+            self.stats.failures += 1
+            self.stats.misses += 1
+            new_entry = CacheEntry(metadata=None, expires_at=now + self.negative_ttl)
+
+        await self._remember(key, new_entry)
+        return new_entry.metadata
+
+    async def _lookup(self, key: str) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if self._store is None:
+            return None
+        entry = await asyncio.to_thread(self._store.load, key)
+        if entry is not None:
+            self._put(key, entry)
+        return entry
+
+    async def _remember(self, key: str, entry: CacheEntry):
+        self._put(key, entry)
+        if self._store is not None:
+            await asyncio.to_thread(self._store.save, key, entry)
+
+    def _put(self, key: str, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.stats = CacheStats()
+        if self._store is not None:
+            self._store.clear()
+
+    def close(self):
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+
+_cache: MetadataCache | None = None
+
+
+def get_metadata_cache() -> MetadataCache:
+    global _cache
+    if _cache is None:
+        _cache = MetadataCache()
+    return _cache
+
+
+def close_metadata_cache():
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+
+
+async def get_page_metadata(url, client: httpx.AsyncClient | None = None) -> PageMetadata | None:
+    """Cached scrape_metadata()."""
+    with timed("scrape"):
+        return await get_metadata_cache().get(url, client)
@@ -0,0 +1,60 @@
+"""bcrypt off the event loop.
+
+A bcrypt hash or verify takes ~200ms of CPU at the default cost. Called from an
+async handler it froze every other request of the worker for that long, so it
+runs on a small dedicated thread pool instead (bcrypt releases the GIL). At
+most PASSWORD_HASH_MAX_PENDING operations are queued or running; further
+logins wait their turn rather than piling up work.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+
+# hashes made with other rounds still verify, and are flagged for a rehash
+bcrypt_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor: ThreadPoolExecutor | None = None
+_pending: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+
+async def _run(function, *args):
+    global _pending
+    loop = asyncio.get_running_loop()
+    if _pending is None or _pending[0] is not loop:
+        _pending = (loop, asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING))
+    async with _pending[1]:
+        return await loop.run_in_executor(_get_executor(), function, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(bcrypt_context.hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """(valid, new hash) - the new hash is set when the stored one was made
+    with other parameters and should replace it."""
+    return await _run(bcrypt_context.verify_and_update, password, hashed_password)
+
+
+def shutdown_password_executor():
+    global _executor, _pending
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    _pending = None
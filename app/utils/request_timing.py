@@ -0,0 +1,171 @@
+"""Per-request SQL and timing instrumentation.
+
+RequestTimingMiddleware gives every request a RequestTimings record. While
+the request runs, three things add to it: SQLAlchemy cursor events (query
+count and DB time), timed("scrape") around page scraping and
+timed("serialize") around response rendering. The totals go out as a
+Server-Timing header and one log line per request on the "app.timing"
+logger. The fields are also passed as `extra`, for JSON log formatters.
+
+SLOW_QUERY_MS logs every statement that takes longer, together with its
+EXPLAIN QUERY PLAN.
+
+With REQUEST_TIMING=false neither the middleware nor the events are
+installed. A timed() block then costs one ContextVar lookup.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+load_dotenv()
+
+REQUEST_TIMING = os.getenv("REQUEST_TIMING", "true").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS") or 0)  # 0 = no slow query log
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger("app.timing")
+slow_query_logger = logging.getLogger("app.timing.slow_query")
+
+
+@dataclass
+class RequestTimings:
+    queries: int = 0
+    db: float = 0.0
+    scrape: float = 0.0
+    serialize: float = 0.0
+
+    def server_timing(self, total: float) -> str:
+        metrics = [f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"']
+        if self.scrape:
+            metrics.append(f"scrape;dur={self.scrape * 1000:.1f}")
+        if self.serialize:
+            metrics.append(f"serialize;dur={self.serialize * 1000:.1f}")
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def as_dict(self, total: float) -> dict:
+        return {"queries": self.queries,
+                "db_ms": round(self.db * 1000, 2),
+                "scrape_ms": round(self.scrape * 1000, 2),
+                "serialize_ms": round(self.serialize * 1000, 2),
+                "total_ms": round(total * 1000, 2)}
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> RequestTimings | None:
+    return _current.get()
+
+
+class timed:
+    """with timed("scrape"): ... - adds the block's duration to the request."""
+
+    __slots__ = ("field", "timings", "start")
+
+    def __init__(self, field: str):
+        self.field = field
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            elapsed = time.perf_counter() - self.start
+            setattr(self.timings, self.field, getattr(self.timings, self.field) + elapsed)
+
+
+# === SQLALCHEMY EVENTS ===
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    timings = _current.get()
+    if timings is not None:
+        timings.queries += 1
+        timings.db += elapsed
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        _log_slow_query(conn, statement, parameters, executemany, elapsed)
+
+
+def _log_slow_query(conn, statement: str, parameters, executemany: bool, elapsed: float):
+    plan = None
+    if SLOW_QUERY_EXPLAIN and not executemany and conn.dialect.name == "sqlite" \
+            and statement.lstrip()[:6].upper() in ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT"):
+        try:
+            cursor = conn.connection.cursor()
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plan = [row[-1] for row in cursor.fetchall()]
+            cursor.close()
+        except Exception as exception:
+            plan = [f"EXPLAIN failed: {exception}"]
+    slow_query_logger.warning("Slow query %.1fms: %s%s", elapsed * 1000, " ".join(statement.split()),
+                              "".join(f"\n    {step}" for step in plan or ()),
+                              extra={"duration_ms": round(elapsed * 1000, 2),
+                                     "statement": statement,
+                                     "query_plan": plan})
+
+
+def instrument_engine(engine: AsyncEngine):
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def uninstrument_engine(engine: AsyncEngine):
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# === MIDDLEWARE ===
+class RequestTimingMiddleware:
+    """Plain ASGI middleware - BaseHTTPMiddleware would run the endpoint in
+    another task, out of reach of the ContextVar.
+
+    The header leaves with the start of the response, so for a streamed body
+    (the export) it covers only what happened before the first chunk; the log
+    line covers the whole request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                header = timings.server_timing(time.perf_counter() - start)
+                message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            fields = timings.as_dict(time.perf_counter() - start)
+            logger.info("%s %s %s %.1fms queries=%d db=%.1fms scrape=%.1fms serialize=%.1fms",
+                        scope["method"], scope["path"], status_code, fields["total_ms"], fields["queries"],
+                        fields["db_ms"], fields["scrape_ms"], fields["serialize_ms"],
+                        extra={"method": scope["method"], "path": scope["path"],
+                               "status_code": status_code, **fields})
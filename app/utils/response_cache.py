@@ -0,0 +1,178 @@
+"""Per-user cache of rendered GET responses.
+
+Clients re-request the same first page of their bookmarks over and over
+between writes. The rendered body (and its ETag) is cached under the user,
+the route and the query string; a hit costs neither SQL nor serialization.
+
+Every key also carries the user's generation number. A write bumps it
+(invalidate()), which orphans all of that user's entries at once - they are
+never read again and age out of the LRU. A page rendered while a write was
+committing is stored under the old generation, so it can't be served stale.
+
+The store is pluggable (ResponseCacheBackend); the default is an in-process
+LRU bounded by entry count and total bytes. RESPONSE_CACHE_SIZE=0 disables
+the cache.
+
+With the default backend the generations are per process too: a write
+handled by one worker doesn't invalidate what another worker has cached,
+so with several workers a client can be served a page that predates its own
+write. Run a single worker, or plug in a shared backend, before enabling the
+cache behind a multi-worker server.
+"""
+import dataclasses
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from fastapi import Request, Response, status
+
+from .etags import etag_matches
+
+load_dotenv()
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+
+@dataclass
+class ResponseCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def as_dict(self) -> dict:
+        return {**dataclasses.asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str | None = None
+    media_type: str = "application/json"
+
+
+class ResponseCacheBackend(ABC):
+    """Where entries and generations live. A shared store (Redis, memcached)
+    plugs in here; generations must then live in the same store, so that a
+    write seen by one worker invalidates the entries of all of them."""
+
+    @abstractmethod
+    async def get(self, key: str) -> CachedResponse | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, response: CachedResponse):
+        ...
+
+    @abstractmethod
+    async def get_generation(self, user_id: int) -> int:
+        ...
+
+    @abstractmethod
+    async def bump_generation(self, user_id: int) -> int:
+        ...
+
+    def info(self) -> dict:
+        return {}
+
+
+class MemoryBackend(ResponseCacheBackend):
+    """LRU in the worker's memory. Only touched from the event loop. Entries
+    and generations are private to the process - see the module docstring."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        # never evicted - a forgotten generation would restart at 0 and
+        # resurrect the entries stored under it
+        self._generations: dict[int, int] = {}
+
+    async def get(self, key: str) -> CachedResponse | None:
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+        return response
+
+    async def set(self, key: str, response: CachedResponse):
+        if len(response.body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous.body)
+        self._entries[key] = response
+        self._bytes += len(response.body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+            self.evictions += 1
+
+    async def get_generation(self, user_id: int) -> int:
+        return self._generations.get(user_id, 0)
+
+    async def bump_generation(self, user_id: int) -> int:
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        return self._generations[user_id]
+
+    def info(self) -> dict:
+        return {"size": len(self._entries), "bytes": self._bytes, "evictions": self.evictions}
+
+
+class ResponseCache:
+    def __init__(self, backend: ResponseCacheBackend | None = None, enabled: bool = RESPONSE_CACHE_SIZE > 0):
+        self.backend = backend or MemoryBackend()
+        self.enabled = enabled
+        self.stats = ResponseCacheStats()
+
+    async def key(self, user_id: int, request: Request) -> str | None:
+        """Cache key of this request, None when the cache is off."""
+        if not self.enabled:
+            return None
+        generation = await self.backend.get_generation(user_id)
+        query = "&".join(sorted(f"{name}={value}" for name, value in request.query_params.multi_items()))
+        return f"{user_id}:{generation}:{request.url.path}?{query}"
+
+    async def get(self, key: str | None) -> CachedResponse | None:
+        if key is None:
+            return None
+        response = await self.backend.get(key)
+        if response is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return response
+
+    async def set(self, key: str | None, response: Response, etag: str | None = None):
+        if key is None or response.status_code != status.HTTP_200_OK:
+            return
+        await self.backend.set(key, CachedResponse(bytes(response.body), etag, response.media_type))
+        self.stats.stores += 1
+
+    async def invalidate(self, user_id: int):
+        """Call after every committed write to the user's bookmarks."""
+        if self.enabled:
+            await self.backend.bump_generation(user_id)
+            self.stats.invalidations += 1
+
+    def reset(self, backend: ResponseCacheBackend | None = None):
+        self.backend = backend or MemoryBackend()
+        self.stats = ResponseCacheStats()
+
+
+def cached_response(cached: CachedResponse, if_none_match: str | None = None) -> Response:
+    headers = {"ETag": cached.etag} if cached.etag else None
+    if cached.etag and etag_matches(if_none_match, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(cached.body, media_type=cached.media_type, headers=headers)
+
+
+response_cache = ResponseCache()
@@ -1,53 +1,212 @@
-import httpx
-from bs4 import BeautifulSoup
+import logging
+import os
+import re
+from dataclasses import dataclass, field
 from urllib.parse import urljoin, urlparse
+import httpx
+import lxml.etree
+import lxml.html
+
+from .http_client import get_http_client
+
+
+logger = logging.getLogger(__name__)
+
+# Everything we extract lives in <head>, so the body is streamed only until
+# </head> shows up (or the cap is hit) and the rest of the page is never read.
+SCRAPER_MAX_HEAD_BYTES = int(os.getenv("SCRAPER_MAX_HEAD_BYTES", str(256 * 1024)))
+# the whole page, for article extraction - anything past this is cut off
+SCRAPER_MAX_PAGE_BYTES = int(os.getenv("SCRAPER_MAX_PAGE_BYTES", str(2 * 1024 * 1024)))
+
+ICON_RELS = {"icon", "apple-touch-icon", "apple-touch-icon-precomposed"}
+FEED_TYPES = ("application/rss+xml", "application/atom+xml", "application/feed+json")
+
+_HEAD_END = re.compile(rb"</head\s*>|<body[\s>]", re.IGNORECASE)
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class PageMetadata:
+    url: str
+    title: str = ""
+    favicon_url: str | None = None
+    description: str | None = None
+    canonical_url: str | None = None
+    feed_links: list[str] = field(default_factory=list)
+
+
+@dataclass
+class FetchResult:
+    status_code: int
+    metadata: PageMetadata | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+
+async def read_head(response: httpx.Response, max_bytes: int = SCRAPER_MAX_HEAD_BYTES) -> bytes:
+    """Read a streamed response until the end of <head> or max_bytes."""
+    buffer = bytearray()
+    async for chunk in response.aiter_bytes():
+        # look back a little so a tag split between two chunks is still found
+        search_from = max(0, len(buffer) - 8)
+        buffer += chunk
+        match = _HEAD_END.search(buffer, search_from)
+        if match:
+            return bytes(buffer[:match.end()])
+        if len(buffer) >= max_bytes:
+            return bytes(buffer[:max_bytes])
+    return bytes(buffer)
+
+
+async def read_body(response: httpx.Response, max_bytes: int = SCRAPER_MAX_PAGE_BYTES) -> bytes:
+    buffer = bytearray()
+    async for chunk in response.aiter_bytes():
+        buffer += chunk
+        if len(buffer) >= max_bytes:
+            return bytes(buffer[:max_bytes])
+    return bytes(buffer)
+
+
+def _decode(head: bytes, header_encoding: str | None) -> str:
+    encoding = header_encoding
+    if encoding is None:
+        match = _META_CHARSET.search(head)
+        encoding = match.group(1).decode("ascii", "ignore") if match else "utf-8"
+    try:
+        return head.decode(encoding, errors="replace")
+    except LookupError:
+        return head.decode("utf-8", errors="replace")
+
 
-async def scrape_title(url) -> str:
+def _clean(text: str | None) -> str | None:
+    if text is None:
+        return None
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text or None
+
+
+def _icon_size(sizes: str) -> int:
+    best = 0
+    for size in sizes.lower().split():
+        if size == "any":
+            return 1024  # scalable (svg)
+        width = size.split("x")[0]
+        if width.isdigit():
+            best = max(best, int(width))
+    return best
+
+
+def parse_head(html: str, url: str) -> PageMetadata:
+    metadata = PageMetadata(url=url)
+    if not html.strip():
+        return metadata
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
+        document = lxml.html.document_fromstring(html)
+    except (lxml.etree.ParserError, ValueError):
+        return metadata
+
+    base_url = url
+    base = document.find(".//base[@href]")
+    if base is not None:
+        base_url = urljoin(url, base.get("href"))
+
+    title = document.find(".//title")
+    metadata.title = _clean(title.text_content() if title is not None else None) or ""
+
+    metas = {}
+    for meta in document.iter("meta"):
+        key = (meta.get("name") or meta.get("property") or "").lower()
+        if key and key not in metas and meta.get("content"):
+            metas[key] = meta.get("content")
+    metadata.title = metadata.title or _clean(metas.get("og:title")) or ""
+    metadata.description = _clean(metas.get("description") or metas.get("og:description"))
+
+    icons = []
+    for link in document.iter("link"):
+        rel = set((link.get("rel") or "").lower().split())
+        href = link.get("href")
+        if not href:
+            continue
+        href = urljoin(base_url, href.strip())
+        if rel & ICON_RELS:
+            icons.append((_icon_size(link.get("sizes") or ""), href))
+        elif "canonical" in rel and metadata.canonical_url is None:
+            metadata.canonical_url = href
+        elif "alternate" in rel and (link.get("type") or "").lower() in FEED_TYPES:
+            metadata.feed_links.append(href)
+
+    if icons:
+        # largest declared size wins, document order breaks ties
+        metadata.favicon_url = max(icons, key=lambda icon: icon[0])[1]
+    else:
+        parsed = urlparse(url)
+        metadata.favicon_url = f"{parsed.scheme}://{parsed.netloc}/favicon.ico"
+    return metadata
+
+
+async def fetch_metadata(url, client: httpx.AsyncClient | None = None,
+                         headers: dict[str, str] | None = None) -> FetchResult | None:
+    """One streamed GET, optionally conditional (If-None-Match/If-Modified-Since).
+
+    A 304 comes back as a FetchResult without metadata, None means the page
+    couldn't be fetched.
+    """
+    client = client or get_http_client()
+    url = str(url)
+    try:
+        async with client.stream("GET", url, headers=headers) as response:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if response.status_code == 304:
+                return FetchResult(304, etag=etag, last_modified=last_modified)
             response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-        title_tag = soup.find("title").text
-        return title_tag
-    except (httpx.HTTPError, Exception) as exception:
-        print(exception)
-        return ""
-    
-    
-async def scrape_favicon(url):
+            head = await read_head(response)
+            final_url = str(response.url)
+            encoding = response.charset_encoding
+    except httpx.HTTPError as exception:
+        logger.warning("Fetching %s failed: %s", url, exception)
+        return None
+    return FetchResult(response.status_code,
+                       metadata=parse_head(_decode(head, encoding), final_url),
+                       etag=etag,
+                       last_modified=last_modified)
+
+
+async def fetch_page(url, client: httpx.AsyncClient | None = None,
+                     max_bytes: int = SCRAPER_MAX_PAGE_BYTES) -> str | None:
+    """The whole HTML page, None when it can't be fetched or isn't HTML."""
+    client = client or get_http_client()
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=5.0)
+        async with client.stream("GET", str(url)) as response:
             response.raise_for_status()
+            if "html" not in response.headers.get("Content-Type", "text/html").lower():
+                return None
+            body = await read_body(response, max_bytes)
+            encoding = response.charset_encoding
+    except httpx.HTTPError:
+        return None
+    return _decode(body, encoding)
+
+
+async def scrape_metadata(url, client: httpx.AsyncClient | None = None) -> PageMetadata | None:
+    """Title, best favicon, description, canonical URL and feeds in one request.
+
+    Returns None when the page can't be fetched.
+    """
+    result = await fetch_metadata(url, client)
+    return result.metadata if result else None
+
+
+async def scrape_title(url, client: httpx.AsyncClient | None = None) -> str:
+    metadata = await scrape_metadata(url, client)
+    return metadata.title if metadata else ""
+
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        icons = []
-        
-        for link in soup.find_all("link"):
-            rel = link.get("rel")
-            if not rel:
-                continue
-            if any(x in rel for x in ["icon", "shortcut icon", "apple-touch-icon"]):
-                href = link.get("href")
-                if href:
-                    size = link.get("sizes", "")
-                    full_url = urljoin(url, href)
-                    icons.append((full_url, size))
-        
-        if icons == []: #fallback - If there is no link tags with favicon URL
-            parsed = urlparse(url)
-            fallback = f"{parsed.scheme}://{parsed.netloc}/favicon.ico"
-            icons.append(fallback)
-            if icons == []:
-                return ""
-        
-        icons_with_size = [(icon, size) for icon, size in icons if size.split("x")[0].isdigit()]
-        if icons_with_size:
-            highest_resolution = max(icons_with_size, key=lambda x: int(x[1].split("x")[0]))
-            return highest_resolution[0]
-        
-    except (httpx.HTTPError, Exception) as exception:
-        print(exception)
-        return []
\ No newline at end of file
+async def scrape_favicon(url, client: httpx.AsyncClient | None = None) -> str:
+    metadata = await scrape_metadata(url, client)
+    return (metadata.favicon_url or "") if metadata else ""
@@ -0,0 +1,314 @@
+"""Per-user vector index behind GET /bookmarks/semantic-search.
+
+Each user's vectors live in EMBEDDING_INDEX_PATH/<user id>/ in three files:
+- vectors.npy: rows x dimensions of float32, L2 normalised
+- ids.npy: the bookmark id of each row, 0 for a free row
+- meta.json: the embedder, the rows in use and the sync watermark
+
+Both arrays are opened as memory maps. Hot indexes stay in the page cache,
+and cold ones cost no RAM. A top-k query is one matrix-vector product plus
+an argpartition, run on a worker thread (numpy releases the GIL).
+
+SemanticIndexer keeps the indexes in sync in the background. Writes to
+title, description or url queue the user. The worker then embeds every
+bookmark modified since the watermark on the EmbeddingPool, and frees the
+rows of deleted ones. A search that finds its index behind queues it too,
+and answers from what is indexed so far. Embedding never happens in a
+request.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..db.counters import get_counters
+from ..db.models import Bookmark
+from .embeddings import EmbeddingPool
+
+load_dotenv()
+
+SEMANTIC_SEARCH = os.getenv("SEMANTIC_SEARCH", "true").lower() in ("1", "true", "yes")
+EMBEDDING_INDEX_PATH = os.getenv("EMBEDDING_INDEX_PATH", "vector_index")
+EMBEDDING_OPEN_INDEXES = int(os.getenv("EMBEDDING_OPEN_INDEXES", "128"))
+EMBEDDING_SYNC_BATCH = int(os.getenv("EMBEDDING_SYNC_BATCH", "1024"))
+
+INITIAL_CAPACITY = 256
+
+logger = logging.getLogger(__name__)
+
+
+def bookmark_text(title: str | None, description: str | None) -> str:
+    return "\n".join(part for part in (title, description) if part)
+
+
+class VectorIndex:
+    """Memory-mapped vectors of one user. One writer; searches may run
+    concurrently with it."""
+
+    def __init__(self, path: str, embedder: str, dimensions: int):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta = self._read_meta()
+        if meta is None or meta["embedder"] != embedder or meta["dimensions"] != dimensions:
+            # new user, or vectors from another model - start over
+            meta = {"embedder": embedder, "dimensions": dimensions, "count": 0, "watermark": None}
+            self._allocate(INITIAL_CAPACITY, dimensions)
+            self._write_meta(meta)
+        self.meta = meta
+        self._open()
+        self._rows: dict[int, int] | None = None
+        self._free: list[int] = []
+
+    # === FILES ===
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_meta(self) -> dict | None:
+        try:
+            with open(self._file("meta.json")) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta: dict):
+        with open(self._file("meta.json.tmp"), "w") as file:
+            json.dump(meta, file)
+        os.replace(self._file("meta.json.tmp"), self._file("meta.json"))
+
+    def _allocate(self, capacity: int, dimensions: int, vectors=None, ids=None):
+        """Write fresh files of the given capacity (copying the used rows)
+        and swap them in - an open memmap of the old ones stays valid."""
+        count = self.meta["count"] if vectors is not None else 0
+        new_vectors = np.lib.format.open_memmap(self._file("vectors.npy.tmp"), mode="w+",
+                                                dtype=np.float32, shape=(capacity, dimensions))
+        new_ids = np.lib.format.open_memmap(self._file("ids.npy.tmp"), mode="w+",
+                                            dtype=np.int64, shape=(capacity,))
+        if count:
+            new_vectors[:count] = vectors[:count]
+            new_ids[:count] = ids[:count]
+        new_vectors.flush()
+        new_ids.flush()
+        del new_vectors, new_ids
+        os.replace(self._file("vectors.npy.tmp"), self._file("vectors.npy"))
+        os.replace(self._file("ids.npy.tmp"), self._file("ids.npy"))
+
+    def _open(self):
+        self.vectors = np.load(self._file("vectors.npy"), mmap_mode="r+")
+        self.ids = np.load(self._file("ids.npy"), mmap_mode="r+")
+
+    # === READ ===
+    @property
+    def watermark(self) -> float | None:
+        return self.meta["watermark"]
+
+    def __len__(self) -> int:
+        return len(self.rows())
+
+    def rows(self) -> dict[int, int]:
+        """bookmark id -> row, built on first use."""
+        if self._rows is None:
+            count = self.meta["count"]
+            ids = np.asarray(self.ids[:count])
+            used = np.flatnonzero(ids)
+            self._rows = dict(zip(ids[used].tolist(), used.tolist()))
+            self._free = np.flatnonzero(ids == 0).tolist()
+        return self._rows
+
+    def search(self, query: np.ndarray, k: int) -> list[tuple[int, float]]:
+        # one consistent snapshot - the writer may swap the arrays meanwhile
+        vectors, ids, count = self.vectors, self.ids, self.meta["count"]
+        if not count:
+            return []
+        scores = vectors[:count] @ query
+        scores[np.asarray(ids[:count]) == 0] = -np.inf
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(ids[row]), float(scores[row])) for row in top if scores[row] > -np.inf]
+
+    # === WRITE ===
+    def upsert(self, bookmark_ids: list[int], vectors: np.ndarray):
+        rows = self.rows()
+        for bookmark_id, vector in zip(bookmark_ids, vectors):
+            row = rows.get(bookmark_id)
+            if row is None:
+                row = self._free.pop() if self._free else self._append()
+                rows[bookmark_id] = row
+                self.ids[row] = bookmark_id
+            self.vectors[row] = vector
+
+    def _append(self) -> int:
+        row = self.meta["count"]
+        if row == len(self.ids):
+            self._allocate(2 * len(self.ids), self.vectors.shape[1], self.vectors, self.ids)
+            self._open()
+        self.meta["count"] = row + 1
+        return row
+
+    def remove(self, bookmark_ids):
+        rows = self.rows()
+        for bookmark_id in bookmark_ids:
+            row = rows.pop(bookmark_id, None)
+            if row is not None:
+                self.ids[row] = 0
+                self._free.append(row)
+
+    def save(self, watermark: float | None):
+        self.vectors.flush()
+        self.ids.flush()
+        self.meta["watermark"] = watermark
+        self._write_meta(self.meta)
+
+
+class SemanticIndexer:
+    """Background sync of the vector indexes, one user at a time."""
+
+    def __init__(self,
+                 session_factory: async_sessionmaker[AsyncSession],
+                 pool: EmbeddingPool | None = None,
+                 path: str = EMBEDDING_INDEX_PATH,
+                 open_indexes: int = EMBEDDING_OPEN_INDEXES,
+                 sync_batch: int = EMBEDDING_SYNC_BATCH):
+        self.session_factory = session_factory
+        self.pool = pool or EmbeddingPool()
+        self.path = path
+        self.open_indexes = open_indexes
+        self.sync_batch = sync_batch
+        self._indexes: OrderedDict[int, VectorIndex] = OrderedDict()
+        # one open at a time - two could allocate the same user's files
+        self._opening = asyncio.Lock()
+        self._queue: asyncio.Queue[int] = asyncio.Queue()
+        self._queued: set[int] = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        if self.running:
+            return
+        await self.pool.start()
+        self._task = asyncio.create_task(self._worker(), name="semantic-indexer")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.pool.shutdown()
+
+    def submit(self, user_id: int):
+        """Queue a sync of the user's index (once, however often called)."""
+        if user_id not in self._queued:
+            self._queued.add(user_id)
+            self._queue.put_nowait(user_id)
+
+    async def join(self):
+        """Wait until every queued sync has finished."""
+        await self._queue.join()
+
+    async def _worker(self):
+        while True:
+            user_id = await self._queue.get()
+            self._queued.discard(user_id)
+            try:
+                await self.sync(user_id)
+            except Exception:
+                logger.exception("Semantic index sync of user %s failed", user_id)
+            finally:
+                self._queue.task_done()
+
+    async def open_index(self, user_id: int) -> VectorIndex:
+        """The user's index, created or opened on a worker thread - it
+        touches the disk and may write fresh files."""
+        index = self._indexes.get(user_id)
+        if index is None:
+            async with self._opening:
+                index = self._indexes.get(user_id)
+                if index is None:
+                    index = await asyncio.to_thread(self._load, user_id)
+                    self._indexes[user_id] = index
+                    if len(self._indexes) > self.open_indexes:
+                        self._indexes.popitem(last=False)
+        self._indexes.move_to_end(user_id)
+        return index
+
+    def _load(self, user_id: int) -> VectorIndex:
+        index = VectorIndex(os.path.join(self.path, str(user_id)), self.pool.name, self.pool.dimensions)
+        index.rows()  # read the ids here rather than on the first len() in a request
+        return index
+
+    async def is_stale(self, db: AsyncSession, user_id: int) -> bool:
+        """Cheap check on the read path: an index seek for max(updated_at),
+        and the user's bookmark counter against the rows of the index."""
+        index = await self.open_index(user_id)
+        modified = await db.scalar(select(func.julianday(func.max(Bookmark.updated_at)))
+                                   .where(Bookmark.owner_id == user_id))
+        if modified is not None and (index.watermark is None or modified > index.watermark):
+            return True
+        counters = await get_counters(db, user_id, save=False)
+        return counters.bookmark_count != len(index)
+
+    async def sync(self, user_id: int):
+        index = await self.open_index(user_id)
+        modified = func.julianday(Bookmark.updated_at)
+        async with self.session_factory() as session:
+            live = set(await session.scalars(select(Bookmark.id).where(Bookmark.owner_id == user_id)))
+            await asyncio.to_thread(index.remove, [bookmark_id for bookmark_id in index.rows() if bookmark_id not in live])
+
+            # >= - rows saved in the same instant as the watermark are
+            # embedded again rather than missed
+            stmt = (select(Bookmark.id, Bookmark.title, Bookmark.description, modified.label("modified"))
+                    .where(Bookmark.owner_id == user_id)
+                    .execution_options(yield_per=self.sync_batch))
+            if index.watermark is not None:
+                stmt = stmt.where(modified >= index.watermark)
+            watermark = index.watermark
+            result = await session.stream(stmt)
+            async for rows in result.partitions():
+                vectors = await self.pool.embed([bookmark_text(row.title, row.description) for row in rows])
+                await asyncio.to_thread(index.upsert, [row.id for row in rows], vectors)
+                watermark = max([watermark or 0.0, *(row.modified for row in rows if row.modified is not None)])
+        await asyncio.to_thread(index.save, watermark)
+
+    async def search(self, user_id: int, query: str, k: int) -> list[tuple[int, float]]:
+        vector = await self.pool.embed_query(query)
+        index = await self.open_index(user_id)
+        return await asyncio.to_thread(index.search, vector, k)
+
+
+semantic_indexer: SemanticIndexer | None = None
+
+
+async def start_semantic_indexer(session_factory: async_sessionmaker[AsyncSession]) -> SemanticIndexer | None:
+    global semantic_indexer
+    if not SEMANTIC_SEARCH:
+        return None
+    semantic_indexer = SemanticIndexer(session_factory)
+    await semantic_indexer.start()
+    return semantic_indexer
+
+
+async def stop_semantic_indexer():
+    global semantic_indexer
+    if semantic_indexer is not None:
+        await semantic_indexer.stop()
+        semantic_indexer = None
+
+
+def get_semantic_indexer() -> SemanticIndexer | None:
+    if semantic_indexer is not None and semantic_indexer.running:
+        return semantic_indexer
+    return None
+
+
+def submit_semantic_sync(user_id: int):
+    """After a write to title, description or url - no-op when disabled."""
+    if semantic_indexer is not None and semantic_indexer.running:
+        semantic_indexer.submit(user_id)
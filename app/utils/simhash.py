@@ -0,0 +1,55 @@
+"""64-bit SimHash signatures of page content, for near-duplicate detection.
+
+Each distinct word is hashed to 64 bits and weighted by how often it occurs.
+Every bit position adds the word's weight when its bit is set and subtracts
+it when it is clear. The signature keeps the sign of each position. Pages that share
+most of their wording end up a few bits apart. Words, not word pairs: the
+text is a page's title and description, and in a text that short every
+extra feature moves bits. Mirrors, AMP versions and
+reposts usually differ by 0-3 bits, while unrelated pages differ by about 32.
+
+Signatures are stored as signed 64-bit integers, which is what SQLite's
+INTEGER holds. The matching is done by LSH banding (app/db/simhash.py).
+"""
+import hashlib
+import re
+from collections import Counter
+import numpy as np
+
+
+SIMHASH_BITS = 64
+# fewer words than this say too little about the page to compare it
+SIMHASH_MIN_WORDS = 4
+
+_TOKEN = re.compile(r"\w+")
+_MASK = (1 << SIMHASH_BITS) - 1
+
+
+def _features(text: str) -> Counter:
+    words = _TOKEN.findall(text.lower())
+    if len(words) < SIMHASH_MIN_WORDS:
+        return Counter()
+    return Counter(words)
+
+
+def simhash(*texts: str | None) -> int | None:
+    """Signature of the texts taken together, None when there is too little."""
+    features = _features(" ".join(text for text in texts if text))
+    if not features:
+        return None
+    digests = np.frombuffer(b"".join(hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                                     for feature in features), dtype=np.uint8)
+    bits = np.unpackbits(digests.reshape(len(features), 8), axis=1, bitorder="little")
+    weights = np.fromiter(features.values(), dtype=np.float64, count=len(features))
+    # +weight for a set bit, -weight for a clear one
+    totals = weights @ (2 * bits.astype(np.float64) - 1)
+    value = int.from_bytes(np.packbits(totals > 0, bitorder="little").tobytes(), "little")
+    return to_signed(value)
+
+
+def to_signed(value: int) -> int:
+    return value - (1 << SIMHASH_BITS) if value >> (SIMHASH_BITS - 1) else value
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return ((first ^ second) & _MASK).bit_count()
@@ -0,0 +1,133 @@
+"""Cache of verified bearer tokens.
+
+get_current_user used to run a full jwt.decode signature check on every
+request, although a client sends the same token for its whole 30 minute life.
+Verified claims are kept in a bounded LRU keyed by a digest of the token (the
+token itself is never stored), and each entry expires with the token's exp.
+The digest covers the key and algorithm too, so rotating SECRET_KEY
+invalidates every entry at once.
+"""
+import dataclasses
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+@dataclass
+class TokenCacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+    revoked: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def as_dict(self) -> dict:
+        return {**dataclasses.asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+@dataclass
+class CachedToken:
+    claims: dict
+    expires_at: float
+    issued_at: float
+
+
+class TokenCache:
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.stats = TokenCacheStats()
+        # get_current_user is a sync dependency - it runs on the threadpool
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, CachedToken] = OrderedDict()
+        self._revoked_tokens: dict[bytes, float] = {}  # digest -> exp
+        self._revoked_users: dict[int, float] = {}  # user id -> tokens issued before are invalid
+
+    @staticmethod
+    def digest(token: str, key: str | None, algorithm: str | None) -> bytes:
+        return hashlib.sha256(f"{algorithm}\0{key}\0{token}".encode()).digest()
+
+    def get(self, digest: bytes) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            if entry.expires_at <= time.time():
+                del self._entries[digest]
+                self.stats.expired += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.stats.hits += 1
+            return dict(entry.claims)
+
+    def put(self, digest: bytes, claims: dict, expires_at: float, issued_at: float = 0):
+        with self._lock:
+            if digest in self._revoked_tokens:
+                return  # revoked while it was being verified
+            self._entries[digest] = CachedToken(dict(claims), expires_at, issued_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def is_revoked(self, digest: bytes, user_id, issued_at: float = 0) -> bool:
+        """Checked once per token, before it's cached - cached tokens were
+        already dropped by revoke_token() / revoke_user()."""
+        with self._lock:
+            revoked = (digest in self._revoked_tokens
+                       or issued_at < self._revoked_users.get(user_id, float("-inf")))
+            if revoked:
+                self.stats.revoked += 1
+            return revoked
+
+    # === REVOCATION HOOKS ===
+    def revoke_token(self, digest: bytes, expires_at: float):
+        """Reject this one token until it would have expired anyway."""
+        now = time.time()
+        with self._lock:
+            self._entries.pop(digest, None)
+            self._revoked_tokens[digest] = expires_at
+            # the deny list only has to outlive the tokens on it
+            for revoked, revoked_expires_at in list(self._revoked_tokens.items()):
+                if revoked_expires_at <= now:
+                    del self._revoked_tokens[revoked]
+
+    def revoke_user(self, user_id: int, before: float | None = None):
+        """Reject every token of the user issued before `before` (default now).
+
+        iat has whole-second resolution, so a token issued in the same second
+        as the revocation stays valid.
+        """
+        cutoff = int(time.time() if before is None else before)
+        with self._lock:
+            self._revoked_users[user_id] = cutoff
+            for digest, entry in list(self._entries.items()):
+                if entry.claims.get("id") == user_id and entry.issued_at < cutoff:
+                    del self._entries[digest]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._revoked_tokens.clear()
+            self._revoked_users.clear()
+            self.stats = TokenCacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache()
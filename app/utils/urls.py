@@ -0,0 +1,48 @@
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url) -> str:
+    """Same resource, same string: lowercase scheme and host, no default port,
+    no fragment, "/" for an empty path. Path and query are left untouched."""
+    parts = urlsplit(str(url).strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username or parts.password:
+        credentials = parts.username or ""
+        if parts.password:
+            credentials += f":{parts.password}"
+        host = f"{credentials}@{host}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+# query parameters that only tell the site where a click came from
+TRACKING_PARAMETERS = frozenset({"fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid",
+                                 "mc_cid", "mc_eid", "igshid", "yclid", "_ga", "_gl"})
+TRACKING_PREFIXES = ("utm_",)
+
+
+def canonical_url(url) -> str:
+    """Identity of a bookmark, stricter than normalize_url(): http and https
+    are the same page, trailing slashes and tracking parameters don't count,
+    the remaining query parameters are sorted."""
+    parts = urlsplit(normalize_url(url))
+    scheme = "https" if parts.scheme == "http" else parts.scheme
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted((name, value)
+                             for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if name.lower() not in TRACKING_PARAMETERS
+                             and not name.lower().startswith(TRACKING_PREFIXES)))
+    return urlunsplit((scheme, parts.netloc, path, query, ""))
+
+
+def url_hash(url) -> bytes:
+    """Fixed-width key of canonical_url() - 16 bytes of its SHA-256."""
+    return hashlib.sha256(canonical_url(url).encode()).digest()[:16]
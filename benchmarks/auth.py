@@ -0,0 +1,54 @@
+"""Authentication overhead per request.
+
+Times get_current_user for a client reusing one bearer token - first with the
+token cache emptied before every call (a full jwt.decode each time, the old
+behaviour), then with the cache warm.
+
+    python -m benchmarks.auth --requests 100000
+"""
+import argparse
+import os
+import statistics
+import time
+from datetime import timedelta
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+import app.routers.users as users  # noqa: E402
+from app.utils.token_cache import token_cache  # noqa: E402
+
+
+def measure(token: str, requests: int, cached: bool) -> list[float]:
+    timings = []
+    for _ in range(requests):
+        if not cached:
+            token_cache.clear()
+        start = time.perf_counter()
+        users.get_current_user(token)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+
+    users.SECRET_KEY = users.SECRET_KEY or "benchmark-secret"
+    users.ALGORITHM = users.ALGORITHM or "HS256"
+    token = users.create_jwt("benchmark", 1, "user", timedelta(minutes=30))
+
+    uncached = measure(token, args.requests, cached=False)
+    token_cache.clear()
+    cached = measure(token, args.requests, cached=True)
+
+    print(f"{'':>10}  {'median us':>10}  {'p99 us':>8}")
+    for name, timings in (("jwt.decode", uncached), ("cached", cached)):
+        p99 = statistics.quantiles(timings, n=100)[98]
+        print(f"{name:>10}  {statistics.median(timings):>10.2f}  {p99:>8.2f}")
+    print(f"speed-up {statistics.median(uncached) / statistics.median(cached):.1f}x, "
+          f"hit rate {token_cache.stats.hit_rate:.4f}")
+
+
+if __name__ == "__main__":
+    main()
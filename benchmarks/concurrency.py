@@ -0,0 +1,116 @@
+"""Mixed read/write throughput: one default engine vs the tuned read/write split.
+
+Runs the app in-process (httpx ASGITransport, one event loop like a single
+worker) with --clients concurrent clients for --seconds each. Every client
+lists a page of bookmarks, and every --write-every-th request is a PUT
+instead. The response cache is off, so each GET reaches the database.
+
+- "single engine" is the old setup: one default create_async_engine and no
+  PRAGMAs. SQLite then uses the rollback journal with synchronous=FULL.
+- "read/write split" is create_engines() with the production profile. It
+  uses WAL with synchronous=NORMAL, a query_only reader pool and a single
+  writer connection.
+
+Each setup gets its own freshly seeded SQLite file.
+
+    python -m benchmarks.concurrency --clients 16 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+_directory = tempfile.mkdtemp(prefix="concurrency-")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("METADATA_CACHE_PATH", "")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from app.db.database import Base, create_engines  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routers.users import get_current_user  # noqa: E402
+from app.utils.response_cache import response_cache  # noqa: E402
+
+from .harness import percentile, use_engines  # noqa: E402
+
+
+def seed(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    connection = sqlite3.connect(path)
+    connection.execute("INSERT INTO user (id, email, username, hashed_password, role, is_active) "
+                       "VALUES (1, 'bench@example.com', 'bench', 'x', 'user', 1)")
+    connection.executemany("INSERT INTO bookmark (title, url, favorite, owner_id, enrichment_status) "
+                           "VALUES (?, ?, 0, 1, 'done')",
+                           ((f"Bookmark {i}", f"https://site{i}.test/") for i in range(rows)))
+    connection.commit()
+    connection.close()
+
+
+async def client_loop(client: httpx.AsyncClient, rows: int, write_every: int, deadline: float,
+                      seed_value: int) -> tuple[list[float], int]:
+    rng = random.Random(seed_value)
+    timings, errors, requests = [], 0, 0
+    while time.perf_counter() < deadline:
+        requests += 1
+        start = time.perf_counter()
+        if requests % write_every == 0:
+            bookmark_id = rng.randint(1, rows)
+            response = await client.put(f"/bookmarks/{bookmark_id}",
+                                        json={"title": f"Edited {requests}", "url": f"https://site{bookmark_id}.test/"})
+        else:
+            response = await client.get(f"/bookmarks/?limit=50&skip={rng.randrange(0, min(rows - 50, 1000))}")
+        if response.status_code >= 400:
+            errors += 1
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, errors
+
+
+async def scenario(name: str, write_engine, read_engine, args) -> None:
+    use_engines(write_engine, read_engine)
+    deadline = time.perf_counter() + args.seconds
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+                                 base_url="http://bench", timeout=60) as client:
+        results = await asyncio.gather(*(client_loop(client, args.rows, args.write_every, deadline, i)
+                                         for i in range(args.clients)))
+    await write_engine.dispose()
+    await read_engine.dispose()
+
+    timings = [timing for client_timings, _ in results for timing in client_timings]
+    errors = sum(client_errors for _, client_errors in results)
+    p99 = percentile(timings, 99)
+    print(f"{name:>18}  {len(timings) / args.seconds:>8.1f}  {statistics.median(timings):>8.1f}  "
+          f"{p99:>8.1f}  {errors:>6}")
+
+
+async def main(args):
+    app.dependency_overrides[get_current_user] = lambda: {"id": 1, "sub": "bench", "role": "user"}
+    response_cache.enabled = False
+
+    single_path = os.path.join(_directory, "single.db")
+    split_path = os.path.join(_directory, "split.db")
+    seed(single_path, args.rows)
+    seed(split_path, args.rows)
+
+    print(f"{'':>18}  {'req/s':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'errors':>6}")
+    single = create_async_engine(f"sqlite+aiosqlite:///{single_path}")
+    await scenario("single engine", single, single, args)
+    write_engine, read_engine = create_engines(f"sqlite+aiosqlite:///{split_path}", profile="production", echo=False)
+    await scenario("read/write split", write_engine, read_engine, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-every", type=int, default=5, help="every n-th request of a client is a PUT")
+    args = parser.parse_args()
+    asyncio.run(main(args))
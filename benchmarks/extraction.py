@@ -0,0 +1,101 @@
+"""Article extraction benchmark: the event loop with and without the pool.
+
+Generates --pages synthetic article pages (navigation, sidebar, comments and
+about --paragraphs paragraphs of text each). It extracts them first on the
+event loop, as a naive implementation would, then on the ArticleExtractor
+worker pool. For each it reports pages/s and the worst event loop stall seen
+meanwhile. Then it compares the stored zlib size with the raw text.
+
+    python -m benchmarks.extraction --workers 1 --pages 500
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+from app.utils.articles import ARTICLE_COMPRESSION_LEVEL, _extract, extract_article  # noqa: E402
+
+from .search import WORDS  # noqa: E402
+from .seed import title  # noqa: E402
+from .semantic import loop_lag  # noqa: E402
+
+
+def page(rng: random.Random, paragraphs: int) -> str:
+    def sentence() -> str:
+        words = rng.choices(WORDS, k=rng.randint(8, 20))
+        return " ".join(words).capitalize() + ", " + " ".join(rng.choices(WORDS, k=6)) + "."
+
+    heading = title(rng)
+    nav = "".join(f"<li><a href='/section/{i}'>Section {i}</a></li>" for i in range(30))
+    body = "".join(f"<p>{' '.join(sentence() for _ in range(4))}</p>" for _ in range(paragraphs))
+    comments = "".join(f"<div class='comment'><p>{sentence()}</p></div>" for _ in range(20))
+    return (f"<html lang='en'><head><title>{heading}</title><style>body{{margin:0}}</style>"
+            f"<script>{'var x = 1;' * 200}</script></head><body><header><nav><ul>{nav}</ul></nav></header>"
+            f"<div id='sidebar'><p>{sentence()}</p></div><main><h1>{heading}</h1>{body}</main>"
+            f"<section class='comments'>{comments}</section><footer>{sentence()}</footer></body></html>")
+
+
+async def on_loop(pages: list[str]):
+    samples = []
+    ticker = asyncio.create_task(loop_lag(samples))
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    for html in pages:
+        _extract(html, ARTICLE_COMPRESSION_LEVEL)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    ticker.cancel()
+    print(f"on the event loop: {len(pages) / elapsed:,.0f} pages/s, max loop stall {max(samples) * 1000:.1f}ms")
+
+
+async def on_pool(pages: list[str], workers: int, concurrency: int):
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(executor, _extract, html, ARTICLE_COMPRESSION_LEVEL)
+                           for html in pages[:workers]))  # warm up every worker
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def extract(html: str):
+        async with semaphore:
+            return await loop.run_in_executor(executor, _extract, html, ARTICLE_COMPRESSION_LEVEL)
+
+    samples = []
+    ticker = asyncio.create_task(loop_lag(samples))
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(extract(html) for html in pages))
+    elapsed = time.perf_counter() - start
+    ticker.cancel()
+    executor.shutdown()
+    print(f"on {workers} worker process(es): {len(pages) / elapsed:,.0f} pages/s, "
+          f"max loop stall {max(samples) * 1000:.1f}ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=4, help="pages in flight, like ARTICLE_FETCHERS")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    pages = [page(rng, args.paragraphs) for _ in range(args.pages)]
+    print(f"{len(pages)} pages, {sum(map(len, pages)) / len(pages) / 1024:.0f} KiB of HTML each")
+    asyncio.run(on_loop(pages))
+    results = asyncio.run(on_pool(pages, args.workers, args.concurrency))
+
+    text = sum(len(extract_article(html).text.encode()) for html in pages[:100])
+    stored = sum(len(result.content) for result in results[:100])
+    print(f"text {text / 100 / 1024:.1f} KiB per page, stored {stored / 100 / 1024:.1f} KiB "
+          f"(zlib level {ARTICLE_COMPRESSION_LEVEL}, {text / stored:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Favicon store benchmark: downloads saved and serving throughput.
+
+Resolves the icons of --pages bookmarks spread over --domains domains through
+FaviconStore, one after another. Every icon download costs --latency ms. It
+reports how many downloads happened and the wall time, against one download
+per bookmark. It then serves the stored icons through the app with
+GET /favicons/{hash}.
+
+    python -m benchmarks.favicons --pages 2000 --domains 100
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+import zlib
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("FAVICON_STORE_PATH", tempfile.mkdtemp(prefix="favicons-"))
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db.database import Base  # noqa: E402
+from app.main import app  # noqa: E402
+from app.utils.favicons import get_favicon_store  # noqa: E402
+
+
+def icon(domain: str) -> bytes:
+    # a few icons are shared between domains, like a blog platform's
+    rng = random.Random(zlib.crc32(domain.encode()) % 40)
+    output = io.BytesIO()
+    Image.new("RGBA", (48, 48), tuple(rng.randrange(256) for _ in range(4))).save(output, format="ICO")
+    return output.getvalue()
+
+
+async def resolve(pages: list[str], latency: float):
+    downloads = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal downloads
+        downloads += 1
+        await asyncio.sleep(latency)
+        return httpx.Response(200, content=icon(request.url.host), headers={"Content-Type": "image/x-icon"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine)
+    store = get_favicon_store()
+
+    # one after another, like inline saves on the single writer connection
+    hashes = []
+    start = time.perf_counter()
+    for page in pages:
+        async with session_factory() as session:
+            icon_hash, remember = await store.resolve(session, page, f"https://{page.split('/')[2]}/favicon.ico", client)
+            if remember is not None:
+                await session.execute(remember)
+                await session.commit()
+            hashes.append(icon_hash)
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    await engine.dispose()
+    naive = len(pages) * latency
+    print(f"{len(pages)} bookmarks: {downloads} downloads in {elapsed:.2f}s "
+          f"(one per bookmark: {len(pages)} downloads, ~{naive:.1f}s), "
+          f"{len(set(hashes))} distinct files in the store")
+    return sorted(set(hashes))
+
+
+async def serve(hashes: list[str], requests: int):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        timings = []
+        for index in range(requests):
+            start = time.perf_counter()
+            response = await client.get(f"/favicons/{hashes[index % len(hashes)]}")
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200
+        revalidated = await client.get(str(response.url), headers={"If-None-Match": response.headers["ETag"]})
+    print(f"GET /favicons/{{hash}}: median {statistics.median(timings):.2f}ms, "
+          f"{len(response.content)} bytes, {response.headers['Cache-Control']}; "
+          f"revalidation {revalidated.status_code}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--domains", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=50, help="ms per icon download")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    pages = [f"https://site{rng.randrange(args.domains)}.test/post/{index}" for index in range(args.pages)]
+    hashes = asyncio.run(resolve(pages, args.latency / 1000))
+    asyncio.run(serve(hashes, args.requests))
+
+
+if __name__ == "__main__":
+    main()
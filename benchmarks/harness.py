@@ -0,0 +1,31 @@
+"""Helpers shared by the in-process benchmarks."""
+import statistics
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.db.database import get_db, get_read_db, get_read_sessionmaker
+from app.main import app
+
+
+def use_engines(write_engine: AsyncEngine, read_engine: AsyncEngine):
+    """Point the app's database dependencies at these engines."""
+    sessions = async_sessionmaker(autoflush=False, bind=write_engine, class_=AsyncSession)
+    read_sessions = async_sessionmaker(autoflush=False, bind=read_engine, class_=AsyncSession)
+
+    async def db():
+        async with sessions() as session:
+            yield session
+
+    async def read_db():
+        async with read_sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = db
+    app.dependency_overrides[get_read_db] = read_db
+    app.dependency_overrides[get_read_sessionmaker] = lambda: read_sessions
+
+
+def percentile(timings: list[float], percent: int) -> float:
+    if len(timings) < 2:
+        return timings[0] if timings else 0.0
+    return statistics.quantiles(timings, n=100, method="inclusive")[percent - 1]
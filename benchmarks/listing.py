@@ -0,0 +1,113 @@
+"""Bookmark listing read path: ORM entities vs column projection.
+
+Pages through one user's bookmarks the way GET /bookmarks/ does - newest
+first, 100 per page - once with full Bookmark instances plus the
+selectinload(owner) the endpoint used to issue, once with the BOOKMARK_COLUMNS
+row tuples it uses now. Both are serialized through the response model.
+
+    python -m benchmarks.listing --rows 100000
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+_directory = tempfile.mkdtemp(prefix="listing-")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import create_engine, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from app.db.database import Base  # noqa: E402
+from app.db.models import Bookmark  # noqa: E402
+from app.routers.bookmarks import BOOKMARK_COLUMNS  # noqa: E402
+from app.schemas.schemas import BookmarkResponse  # noqa: E402
+
+
+PAGE_SIZE = 100
+items_adapter = TypeAdapter(list[BookmarkResponse])
+
+
+def seed(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    connection = sqlite3.connect(path)
+    connection.execute("INSERT INTO user (id, email, username, hashed_password, role, is_active) "
+                       "VALUES (1, 'bench@example.com', 'bench', 'x', 'user', 1)")
+    connection.executemany(
+        "INSERT INTO bookmark (title, url, favorite, description, tags, owner_id, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, 1, datetime('now', ?), datetime('now', ?))",
+        ((f"Bookmark number {i}", f"https://site{i}.test/article", i % 5 == 0, "Some description " * 4,
+          '["reading", "later"]', f"-{i} minutes", f"-{i} minutes") for i in range(rows)))
+    connection.commit()
+    connection.close()
+
+
+def orm_page(offset: int):
+    return (select(Bookmark)
+            .options(selectinload(Bookmark.owner))
+            .where(Bookmark.owner_id == 1)
+            .order_by(Bookmark.created_at.desc(), Bookmark.id.desc())
+            .offset(offset).limit(PAGE_SIZE))
+
+
+def projection_page(offset: int):
+    return (select(*BOOKMARK_COLUMNS)
+            .where(Bookmark.owner_id == 1)
+            .order_by(Bookmark.created_at.desc(), Bookmark.id.desc())
+            .offset(offset).limit(PAGE_SIZE))
+
+
+async def fetch(session: AsyncSession, path: str, offset: int) -> bytes:
+    if path == "orm":
+        items = (await session.execute(orm_page(offset))).scalars().all()
+    else:
+        items = (await session.execute(projection_page(offset))).all()
+    return items_adapter.dump_json(items_adapter.validate_python(items, from_attributes=True))
+
+
+async def run(sessions: async_sessionmaker, path: str, pages: int) -> tuple[float, float]:
+    # one session per page, like one request per page
+    start = time.perf_counter()
+    for page in range(pages):
+        async with sessions() as session:
+            await fetch(session, path, page * PAGE_SIZE)
+    rows_per_second = pages * PAGE_SIZE / (time.perf_counter() - start)
+
+    tracemalloc.start()
+    peaks = []
+    for page in range(min(pages, 20)):
+        tracemalloc.reset_peak()
+        async with sessions() as session:
+            await fetch(session, path, page * PAGE_SIZE)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+    return rows_per_second, sum(peaks) / len(peaks) / 1024
+
+
+async def main(rows: int, pages: int):
+    path = os.path.join(_directory, "listing.db")
+    seed(path, rows)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    for path_name in ("orm", "projection"):
+        await run(sessions, path_name, 5)  # warm-up
+    print(f"{'read path':>10}  {'rows/s':>9}  {'peak KiB/page':>13}")
+    for path_name in ("orm", "projection"):
+        rows_per_second, peak = await run(sessions, path_name, pages)
+        print(f"{path_name:>10}  {rows_per_second:>9.0f}  {peak:>13.1f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.pages))
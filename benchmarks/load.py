@@ -0,0 +1,254 @@
+"""Load driver: simulated users against the ASGI app, per-endpoint report.
+
+Runs the app in-process (httpx ASGITransport, one event loop like a single
+worker) on a database from benchmarks.seed. It uses the production engine
+profile, reader pool and writer.
+
+--clients concurrent clients each log in as a random seeded user (a JWT
+signed like /user/token would) and loop through a weighted mix of requests:
+listing, cursor paging, tag filter, tag counts, search, single reads,
+creates, updates and deletes. Creates point at the local mock site, so the
+scrape path makes real HTTP requests. Every URL is unique, so the metadata
+cache misses.
+
+After --warmup seconds the driver measures for --duration seconds. It
+prints p50/p95/p99 latency and throughput per endpoint, and can write them
+as a JSON report (--report) and compare with an earlier one (--compare).
+
+    python -m benchmarks.seed --path bench.db --rows 2000000 --users 2000
+    python -m benchmarks.load --db bench.db --clients 32 --duration 60 --report after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("METADATA_CACHE_PATH", "")
+
+import httpx  # noqa: E402
+
+from app.db.database import create_engines  # noqa: E402
+from app.main import app  # noqa: E402
+from app.routers.users import create_jwt  # noqa: E402
+from app.utils.http_client import close_http_client, start_http_client  # noqa: E402
+from app.utils.response_cache import response_cache  # noqa: E402
+
+from .harness import percentile, use_engines  # noqa: E402
+from .mock_site import serve_mock_site  # noqa: E402
+from .search import WORDS  # noqa: E402
+from .seed import seed  # noqa: E402
+
+
+# relative weight of each request type
+MIX = {
+    "GET /bookmarks/": 30,
+    "GET /bookmarks/?cursor": 10,
+    "GET /bookmarks/?tag": 8,
+    "GET /bookmarks/tags": 7,
+    "GET /bookmarks/search": 12,
+    "GET /bookmarks/{id}": 15,
+    "POST /bookmarks/": 6,
+    "PUT /bookmarks/{id}": 8,
+    "DELETE /bookmarks/{id}": 4,
+}
+
+
+class SimulatedUser:
+    def __init__(self, client: httpx.AsyncClient, user_id: int, site_url: str, rng: random.Random):
+        self.client = client
+        self.rng = rng
+        self.site_url = site_url
+        self.name = f"user{user_id}"
+        token = create_jwt(self.name, user_id, "user", timedelta(hours=6))
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.ids: list[int] = []
+        self.created: list[int] = []
+        self.tags: list[str] = []
+        self.cursor: str | None = None
+        self.requests = 0
+
+    async def request(self, endpoint: str) -> tuple[str, httpx.Response]:
+        """One request of the given type, or a plain listing when the user
+        has nothing to act on yet - returns the endpoint actually hit."""
+        self.requests += 1
+        if endpoint == "GET /bookmarks/?cursor" and self.cursor:
+            response = await self._list({"limit": 20, "cursor": self.cursor})
+        elif endpoint == "GET /bookmarks/?tag" and self.tags:
+            response = await self._list({"limit": 20, "tag": self.rng.choice(self.tags)})
+        elif endpoint == "GET /bookmarks/tags":
+            response = await self.client.get("/bookmarks/tags", headers=self.headers)
+            if response.status_code == 200:
+                self.tags = [tag["name"] for tag in response.json()]
+        elif endpoint == "GET /bookmarks/search":
+            query = " ".join(self.rng.sample(WORDS, self.rng.choice((1, 2))))
+            response = await self.client.get("/bookmarks/search", params={"q": query, "limit": 20},
+                                             headers=self.headers)
+        elif endpoint == "GET /bookmarks/{id}" and self.ids:
+            response = await self.client.get(f"/bookmarks/{self.rng.choice(self.ids)}", headers=self.headers)
+        elif endpoint == "POST /bookmarks/":
+            url = f"{self.site_url}/page/{self.rng.choice((16, 64))}/{self.name}-{self.requests}"
+            response = await self.client.post("/bookmarks/", json={"title": "", "url": url}, headers=self.headers)
+            if response.status_code == 201:
+                self.created.append(response.json()["id"])
+        elif endpoint == "PUT /bookmarks/{id}" and self.ids:
+            bookmark_id = self.rng.choice(self.ids)
+            response = await self.client.put(f"/bookmarks/{bookmark_id}", headers=self.headers,
+                                             json={"title": f"Edited {self.requests}",
+                                                   "url": f"https://edited.test/{bookmark_id}",
+                                                   "tags": self.rng.sample(self.tags, min(2, len(self.tags))) or None})
+        elif endpoint == "DELETE /bookmarks/{id}" and self.created:
+            bookmark_id = self.created.pop()
+            response = await self.client.delete(f"/bookmarks/{bookmark_id}", headers=self.headers)
+            if bookmark_id in self.ids:
+                self.ids.remove(bookmark_id)
+        else:
+            endpoint = "GET /bookmarks/"
+            response = await self._list({"limit": 20})
+        return endpoint, response
+
+    async def _list(self, params: dict) -> httpx.Response:
+        response = await self.client.get("/bookmarks/", params=params, headers=self.headers)
+        if response.status_code == 200:
+            page = response.json()
+            self.cursor = page["next_cursor"]
+            self.ids = list(dict.fromkeys(self.ids + [item["id"] for item in page["items"]]))[-200:]
+        return response
+
+
+async def run_client(user: SimulatedUser, warmup_until: float, deadline: float, results: dict):
+    endpoints, weights = list(MIX), list(MIX.values())
+    while (now := time.perf_counter()) < deadline:
+        start = time.perf_counter()
+        endpoint, response = await user.request(user.rng.choices(endpoints, weights)[0])
+        elapsed = (time.perf_counter() - start) * 1000
+        if now >= warmup_until:
+            stats = results[endpoint]
+            stats["timings"].append(elapsed)
+            stats["errors"] += response.status_code >= 400
+
+
+def database_info(path: str) -> dict:
+    connection = sqlite3.connect(path)
+    users, bookmarks = connection.execute(
+        "SELECT (SELECT count(*) FROM user), (SELECT count(*) FROM bookmark)").fetchone()
+    connection.close()
+    return {"users": users, "bookmarks": bookmarks}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(timings: list[float], errors: int, duration: float) -> dict:
+    return {"requests": len(timings),
+            "errors": errors,
+            "throughput_rps": round(len(timings) / duration, 2),
+            "mean_ms": round(sum(timings) / len(timings), 2) if timings else 0.0,
+            "p50_ms": round(percentile(timings, 50), 2),
+            "p95_ms": round(percentile(timings, 95), 2),
+            "p99_ms": round(percentile(timings, 99), 2),
+            "max_ms": round(max(timings, default=0.0), 2)}
+
+
+def build_report(args, database: dict, results: dict) -> dict:
+    endpoints = {name: summarize(stats["timings"], stats["errors"], args.duration)
+                 for name, stats in sorted(results.items())}
+    every = [timing for stats in results.values() for timing in stats["timings"]]
+    return {"meta": {"started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                     "git_commit": git_commit(),
+                     "python": platform.python_version(),
+                     "sqlite": sqlite3.sqlite_version,
+                     "platform": platform.platform(),
+                     "cpu_count": os.cpu_count(),
+                     "database": database,
+                     "options": {"clients": args.clients, "duration": args.duration, "warmup": args.warmup,
+                                 "seed": args.seed, "response_cache": not args.no_response_cache}},
+            "summary": summarize(every, sum(stats["errors"] for stats in results.values()), args.duration),
+            "endpoints": endpoints}
+
+
+def print_report(report: dict, baseline: dict | None = None):
+    columns = ("requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+    print(f"{'endpoint':<26}" + "".join(f"{column:>16}" for column in columns))
+    rows = [*report["endpoints"].items(), ("all", report["summary"])]
+    for name, stats in rows:
+        before = (baseline["summary"] if name == "all" else baseline["endpoints"].get(name)) if baseline else None
+        cells = []
+        for column in columns:
+            cell = f"{stats[column]:g}"
+            if before and before.get(column) and column not in ("requests", "errors"):
+                cell += f" ({(stats[column] - before[column]) / before[column]:+.0%})"
+            cells.append(f"{cell:>16}")
+        print(f"{name:<26}" + "".join(cells))
+
+
+async def main(args):
+    path = args.db
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="load-"), "bench.db")
+        start = time.perf_counter()
+        seed(path, args.rows, args.users)
+        print(f"seeded {args.rows} bookmarks for {args.users} users in {time.perf_counter() - start:.1f}s -> {path}")
+    database = database_info(path)
+
+    write_engine, read_engine = create_engines(f"sqlite+aiosqlite:///{path}", echo=False)
+    use_engines(write_engine, read_engine)
+    response_cache.enabled = not args.no_response_cache
+    await start_http_client()
+
+    rng = random.Random(args.seed)
+    results = defaultdict(lambda: {"timings": [], "errors": 0})
+    with serve_mock_site() as site_url:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+                                     base_url="http://bench", timeout=120) as client:
+            users = [SimulatedUser(client, rng.randint(1, database["users"]), site_url, random.Random(rng.random()))
+                     for _ in range(args.clients)]
+            warmup_until = time.perf_counter() + args.warmup
+            deadline = warmup_until + args.duration
+            await asyncio.gather(*(run_client(user, warmup_until, deadline, results) for user in users))
+
+    await close_http_client()
+    await write_engine.dispose()
+    await read_engine.dispose()
+
+    report = build_report(args, database, results)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"report -> {args.report}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="database seeded by benchmarks.seed - seeds a throwaway one when missing")
+    parser.add_argument("--rows", type=int, default=200_000, help="rows of the throwaway database")
+    parser.add_argument("--users", type=int, default=1_000, help="users of the throwaway database")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds first")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-response-cache", action="store_true")
+    parser.add_argument("--report", help="write the JSON report here")
+    parser.add_argument("--compare", help="JSON report of an earlier run to compare with")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,97 @@
+"""GET /bookmarks/ latency while a burst of logins is going on.
+
+Runs the app in-process (httpx ASGITransport, one event loop like a single
+worker) against a throwaway SQLite file. One client keeps listing bookmarks
+while --logins concurrent logins hit POST /user/token, first with bcrypt
+called on the event loop (the old behaviour), then on the password executor.
+
+    python -m benchmarks.login_burst --logins 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_directory = tempfile.mkdtemp(prefix="login-burst-")
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite+aiosqlite:///{_directory}/bench.db"
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("METADATA_CACHE_PATH", "")
+
+import httpx  # noqa: E402
+
+import app.utils.passwords as passwords  # noqa: E402
+from app.db.database import Base, SessionLocal, engine  # noqa: E402
+from app.db.models import Bookmark, User  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+async def seed():
+    engine.sync_engine.echo = False
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as session:
+        session.add(User(id=1, email="bench@example.com", username="bench",
+                         hashed_password=passwords.bcrypt_context.hash("password"), role="user"))
+        session.add_all(Bookmark(title=f"Bookmark {i}", url=f"https://site{i}.test/", owner_id=1)
+                        for i in range(100))
+        await session.commit()
+
+
+async def on_loop(function, *args):
+    return function(*args)
+
+
+async def list_bookmarks(client: httpx.AsyncClient, headers: dict, stop: asyncio.Event) -> list[float]:
+    timings = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/bookmarks/", headers=headers)
+        response.raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.005)
+    return timings
+
+
+async def scenario(client: httpx.AsyncClient, headers: dict, logins: int) -> list[float]:
+    stop = asyncio.Event()
+    reader = asyncio.create_task(list_bookmarks(client, headers, stop))
+    await asyncio.sleep(0.2)
+    if logins:
+        await asyncio.gather(*(client.post("/user/token", data={"username": "bench", "password": "password"})
+                               for _ in range(logins)))
+    else:
+        await asyncio.sleep(1)
+    stop.set()
+    return await reader
+
+
+def report(name: str, timings: list[float]):
+    p99 = statistics.quantiles(timings, n=100, method="inclusive")[98] if len(timings) > 1 else timings[0]
+    print(f"{name:>16}  {len(timings):>8}  {statistics.median(timings):>8.1f}  {p99:>8.1f}  {max(timings):>8.1f}")
+
+
+async def main(logins: int):
+    await seed()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        response = await client.post("/user/token", data={"username": "bench", "password": "password"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        print(f"{'GET /bookmarks/':>16}  {'requests':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'max ms':>8}")
+        report("no logins", await scenario(client, headers, 0))
+
+        run = passwords._run
+        passwords._run = on_loop
+        report("bcrypt on loop", await scenario(client, headers, logins))
+        passwords._run = run
+        report("bcrypt executor", await scenario(client, headers, logins))
+    passwords.shutdown_password_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
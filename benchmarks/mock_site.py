@@ -0,0 +1,103 @@
+"""Local HTTP server standing in for the websites users bookmark.
+
+    /page/<size_kb>     HTML page with a realistic <head> and a body of ~size_kb KiB
+    /slow/<ms>          small page answered after a delay
+    /favicon.ico        tiny icon
+"""
+import contextlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+HEAD = """<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Benchmark page {size}</title>
+<meta name="description" content="Synthetic page used by the scraper benchmarks">
+<link rel="icon" href="/favicon.ico" sizes="32x32">
+<link rel="apple-touch-icon" href="/touch.png" sizes="180x180">
+<link rel="canonical" href="/page/{size}">
+<link rel="alternate" type="application/rss+xml" href="/feed.xml">
+<style>{style}</style>
+</head>
+"""
+
+PARAGRAPH = ("<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod "
+             "tempor incididunt ut labore et dolore magna aliqua. <a href=\"/x\">Link</a></p>\n")
+
+ICON = bytes(range(256)) * 4
+
+
+def build_page(size_kb: int) -> bytes:
+    # a few KiB of inline CSS, like most real sites have in <head>
+    style = "".join(f".c{i}{{margin:{i}px}}" for i in range(300))
+    head = HEAD.format(size=size_kb, style=style)
+    paragraphs = max(1, (size_kb * 1024 - len(head)) // len(PARAGRAPH))
+    return (head + "<body>\n" + PARAGRAPH * paragraphs + "</body></html>").encode()
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    pages: dict[int, bytes] = {}
+    chunk_size = 16 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            for start in range(0, len(body), self.chunk_size):
+                self.wfile.write(body[start:start + self.chunk_size])
+        except (BrokenPipeError, ConnectionResetError):
+            # clients that only read <head> hang up early
+            self.close_connection = True
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts[0] == "page" and len(parts) > 1 and parts[1].isdigit():
+            size = int(parts[1])
+            if size not in self.pages:
+                self.pages[size] = build_page(size)
+            self._send(self.pages[size], "text/html; charset=utf-8")
+        elif parts[0] == "slow" and len(parts) > 1 and parts[1].isdigit():
+            time.sleep(int(parts[1]) / 1000)
+            self._send(build_page(4), "text/html; charset=utf-8")
+        elif parts[0] in ("favicon.ico", "touch.png"):
+            self._send(ICON, "image/x-icon")
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+
+@contextlib.contextmanager
+def serve_mock_site(port: int = 0):
+    """Run the mock site in a background thread, yield its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockSiteHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def random_page_url(base_url: str, rng: random.Random, sizes=(16, 64, 256, 1024)) -> str:
+    return f"{base_url}/page/{rng.choice(sizes)}"
+
+
+if __name__ == "__main__":
+    with serve_mock_site(8765) as url:
+        print(f"mock site on {url} - Ctrl+C to stop")
+        with contextlib.suppress(KeyboardInterrupt):
+            threading.Event().wait()
@@ -0,0 +1,71 @@
+"""Scraper micro-benchmark against large pages served locally.
+
+Compares the old per-field scraping (one full download + html.parser parse
+for the title and another for the favicon) with scrape_metadata, which makes
+one request and stops reading after </head>.
+
+    python -m benchmarks.scraper --sizes 64 1024 5120 --rounds 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urljoin, urlparse
+
+import httpx
+from bs4 import BeautifulSoup
+
+from app.utils.http_client import create_http_client
+from app.utils.scraper import scrape_metadata
+
+from .mock_site import serve_mock_site
+
+
+async def legacy_scrape(url: str, client: httpx.AsyncClient):
+    response = await client.get(url)
+    title = BeautifulSoup(response.text, "html.parser").find("title").text
+
+    response = await client.get(url)
+    soup = BeautifulSoup(response.text, "html.parser")
+    icons = [(urljoin(url, link.get("href")), link.get("sizes", ""))
+             for link in soup.find_all("link")
+             if link.get("href") and any(rel in (link.get("rel") or []) for rel in ("icon", "apple-touch-icon"))]
+    sized = [icon for icon in icons if icon[1].split("x")[0].isdigit()]
+    favicon = max(sized, key=lambda icon: int(icon[1].split("x")[0]))[0] if sized else \
+        f"{urlparse(url).scheme}://{urlparse(url).netloc}/favicon.ico"
+    return title, favicon
+
+
+async def new_scrape(url: str, client: httpx.AsyncClient):
+    metadata = await scrape_metadata(url, client)
+    return metadata.title, metadata.favicon_url
+
+
+async def measure(scrape, url: str, client: httpx.AsyncClient, rounds: int) -> list[float]:
+    await scrape(url, client)  # warm-up, opens the connection
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await scrape(url, client)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def main(sizes: list[int], rounds: int):
+    with serve_mock_site() as base_url:
+        async with create_http_client() as client:
+            print(f"{'page':>9}  {'legacy ms':>10}  {'metadata ms':>12}  {'speed-up':>8}")
+            for size in sizes:
+                url = f"{base_url}/page/{size}"
+                assert await legacy_scrape(url, client) == await new_scrape(url, client)
+                legacy = statistics.median(await measure(legacy_scrape, url, client, rounds))
+                new = statistics.median(await measure(new_scrape, url, client, rounds))
+                print(f"{size:>6} KiB  {legacy:>10.2f}  {new:>12.2f}  {legacy / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 256, 1024, 5120])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.rounds))
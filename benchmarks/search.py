@@ -0,0 +1,126 @@
+"""Full-text search benchmark.
+
+Seeds a throwaway SQLite file with synthetic bookmarks spread across many
+users and times the exact statement used by GET /bookmarks/search.
+
+    python -m benchmarks.search --rows 1000000 --users 2000
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+from sqlalchemy import create_engine  # noqa: E402
+
+from app.db.database import Base  # noqa: E402
+from app.db.fts import search_statement  # noqa: E402
+
+
+WORDS = ("python sqlite fastapi async search index rust linux kernel docker cloud "
+         "recipe travel music guitar history science space rocket garden coffee "
+         "finance budget design typography photo camera running football chess "
+         "security crypto network database postgres cache performance testing").split()
+
+
+def vocabulary(size: int = 20_000, seed: int = 1) -> list[str]:
+    """Synthetic vocabulary ordered by frequency rank.
+
+    The searchable topic words sit at mid-frequency ranks (300-1300): the head
+    of the distribution behaves like stopwords, which nobody searches for.
+    """
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    filler = set()
+    while len(filler) < size - len(WORDS):
+        word = "".join(rng.choices(letters, k=rng.randint(3, 10)))
+        if word not in WORDS:
+            filler.add(word)
+    words = sorted(filler)
+    rng.shuffle(words)
+    for i, word in enumerate(WORDS):
+        words.insert(300 + 25 * i, word)
+    return words
+
+
+def zipf_cum_weights(size: int) -> list[float]:
+    # natural-language term frequencies are roughly Zipf distributed
+    return list(itertools.accumulate(1 / (rank + 1) for rank in range(size)))
+
+
+def seed(path: str, rows: int, users: int, batch: int = 50_000):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    import sqlite3
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.executemany(
+        "INSERT INTO user (id, email, username, hashed_password, role, is_active) VALUES (?, ?, ?, 'x', 'user', 1)",
+        ((i, f"user{i}@example.com", f"user{i}") for i in range(1, users + 1)))
+
+    rng = random.Random(42)
+    words = vocabulary()
+    cum_weights = zipf_cum_weights(len(words))
+    for start in range(0, rows, batch):
+        chunk = []
+        for i in range(start, min(start + batch, rows)):
+            title = " ".join(rng.choices(words, cum_weights=cum_weights, k=5)).capitalize()
+            description = " ".join(rng.choices(words, cum_weights=cum_weights, k=20))
+            tags = '["' + '", "'.join(rng.sample(WORDS, 2)) + '"]'
+            chunk.append((title, f"https://example{i % 997}.com/{i}", 0, description, tags, rng.randint(1, users)))
+        connection.executemany(
+            "INSERT INTO bookmark (title, url, favorite, description, tags, owner_id) VALUES (?, ?, ?, ?, ?, ?)",
+            chunk)
+        connection.commit()
+    connection.execute("INSERT INTO bookmark_fts(bookmark_fts) VALUES ('optimize')")
+    connection.commit()
+    connection.close()
+
+
+def run(path: str, users: int, queries: int, prefix: bool):
+    engine = create_engine(f"sqlite:///{path}")
+    rng = random.Random(7)
+    timings = []
+    with engine.connect() as connection:
+        for _ in range(queries):
+            query = " ".join(rng.sample(WORDS, rng.choice((1, 2))))
+            stmt = search_statement(query, rng.randint(1, users), limit=20, prefix=prefix)
+            start = time.perf_counter()
+            connection.execute(stmt).all()
+            timings.append((time.perf_counter() - start) * 1000)
+    engine.dispose()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--db", help="reuse an already seeded database file")
+    args = parser.parse_args()
+
+    path = args.db
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "search_bench.db")
+        start = time.perf_counter()
+        seed(path, args.rows, args.users)
+        print(f"seeded {args.rows} rows in {time.perf_counter() - start:.1f}s -> {path}")
+
+    for prefix in (False, True):
+        timings = sorted(run(path, args.users, args.queries, prefix))
+        quantiles = statistics.quantiles(timings, n=100)
+        print(f"{'prefix' if prefix else 'exact'} queries: {len(timings)}  "
+              f"p50: {quantiles[49]:.2f} ms  p95: {quantiles[94]:.2f} ms  "
+              f"p99: {quantiles[98]:.2f} ms  max: {timings[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
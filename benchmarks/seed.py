@@ -0,0 +1,221 @@
+"""Large-dataset seeder for the load benchmarks.
+
+Writes millions of bookmarks for thousands of users straight into an SQLite
+file. The data is shaped like real use:
+
+- bookmark counts per user follow a long-tail distribution
+- domains and tags are Zipf distributed, and each user keeps their own
+  favourite tags
+- titles are built from templates, dates span three years
+- some bookmarks have a description, a few are favorites
+- about 3% are reposts or mirrors: another URL with the title and
+  description of one of the user's recent bookmarks
+
+The database is created from the models (not migrated) and seeded without
+triggers or secondary indexes. The FTS index, the tag tables and the
+user_stats counters are then built in bulk, and the triggers and indexes are
+restored. The result is the same as if every row had gone through the API.
+Every user's password is "password".
+
+    python -m benchmarks.seed --users 2000 --rows 2000000 --path bench.db
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+from passlib.context import CryptContext  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+
+from app.db.database import Base  # noqa: E402
+from app.db.fts import FTS_DDL, FTS_TABLE  # noqa: E402
+from app.db.models import Bookmark  # noqa: E402
+from app.db.simhash import SIMHASH_DDL  # noqa: E402
+from app.db.tags import TAG_DDL  # noqa: E402
+from app.utils.simhash import simhash  # noqa: E402
+from app.utils.urls import url_hash  # noqa: E402
+
+from .search import WORDS  # noqa: E402
+
+
+PASSWORD = "password"
+
+TAGS = WORDS + ("to-read work reference tutorial howto video article paper tool library "
+                "inspiration recipe news blog opinion career interview book course free "
+                "javascript css html react golang java kotlin ios android ai ml data math").split()
+
+POPULAR_DOMAINS = ["github.com", "stackoverflow.com", "youtube.com", "en.wikipedia.org", "medium.com",
+                   "news.ycombinator.com", "reddit.com", "dev.to", "arxiv.org", "nytimes.com"]
+TLDS = ["com", "org", "io", "dev", "net", "co.uk", "de"]
+
+TITLE_TEMPLATES = [
+    "How to {verb} {topic} with {other}",
+    "{Topic} {noun}: {adjective} {other} tips",
+    "The {adjective} guide to {topic}",
+    "{Topic} vs {other} - which one should you pick?",
+    "Why {topic} matters for {other}",
+    "{Topic} {noun} ({year})",
+    "{number} {adjective} {topic} {noun}s",
+    "Show HN: a {adjective} {topic} {noun}",
+]
+VERBS = ["build", "learn", "debug", "scale", "test", "deploy", "design", "speed up", "understand"]
+NOUNS = ["tutorial", "cheatsheet", "library", "talk", "handbook", "checklist", "paper", "thread", "course"]
+ADJECTIVES = ["practical", "complete", "modern", "minimal", "ultimate", "beginner's", "advanced", "fast"]
+
+
+def zipf_cum_weights(size: int, exponent: float = 1.0) -> list[float]:
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(size)))
+
+
+def domains(rng: random.Random, count: int = 5000) -> list[str]:
+    names = set(POPULAR_DOMAINS)
+    while len(names) < count:
+        names.add(f"{rng.choice(WORDS)}{rng.choice(WORDS)}.{rng.choice(TLDS)}")
+    generated = sorted(names - set(POPULAR_DOMAINS))
+    rng.shuffle(generated)
+    return POPULAR_DOMAINS + generated
+
+
+def title(rng: random.Random) -> str:
+    topic, other = rng.sample(WORDS, 2)
+    return rng.choice(TITLE_TEMPLATES).format(verb=rng.choice(VERBS), topic=topic, Topic=topic.capitalize(),
+                                              other=other, noun=rng.choice(NOUNS),
+                                              adjective=rng.choice(ADJECTIVES),
+                                              year=rng.randint(2015, 2026), number=rng.randint(3, 25))
+
+
+def user_tags(rng: random.Random, tag_weights: list[float]) -> list[str]:
+    """Each user reuses a small personal set of tags, drawn from the global
+    popularity curve."""
+    return list(dict.fromkeys(rng.choices(TAGS, cum_weights=tag_weights, k=rng.randint(3, 15))))
+
+
+def bookmark_rows(rng: random.Random, rows: int, users: int, start_id: int = 1):
+    """(id, title, url, url_hash, favorite, description, tags, created_at,
+    updated_at, favicon_url, owner_id, simhash) tuples."""
+    # long tail of activity - a few heavy users, many with a handful of bookmarks
+    user_weights = list(itertools.accumulate(rng.paretovariate(1.2) for _ in range(users)))
+    tag_weights = zipf_cum_weights(len(TAGS))
+    tag_sets = [user_tags(rng, tag_weights) for _ in range(users)]
+    domain_names = domains(rng)
+    domain_weights = zipf_cum_weights(len(domain_names), 1.1)
+
+    first = datetime(2023, 1, 1)
+    step = timedelta(days=3 * 365) / rows
+    owners, sites = [], []
+    recent: dict[int, tuple[str, str | None]] = {}
+    for index in range(rows):
+        if not owners:
+            # drawn in blocks - choices() has a high per-call cost
+            owners = rng.choices(range(1, users + 1), cum_weights=user_weights, k=10_000)
+            sites = rng.choices(domain_names, cum_weights=domain_weights, k=10_000)
+        owner_id, domain = owners.pop(), sites.pop()
+        created_at = first + step * index
+        updated_at = created_at + timedelta(days=rng.randint(0, 30)) if rng.random() < 0.2 else created_at
+        tags = None
+        if rng.random() < 0.6:
+            own = tag_sets[owner_id - 1]
+            tags = '["' + '", "'.join(rng.sample(own, min(len(own), rng.randint(1, 4)))) + '"]'
+        if owner_id in recent and rng.random() < 0.03:
+            page_title, description = recent[owner_id]
+        else:
+            page_title = title(rng)
+            description = " ".join(rng.choices(WORDS, k=rng.randint(8, 25))) if rng.random() < 0.4 else None
+            recent[owner_id] = (page_title, description)
+        url = f"https://{domain}/{rng.choice(WORDS)}/{start_id + index}"
+        yield (start_id + index, page_title, url, url_hash(url), rng.random() < 0.08, description, tags,
+               created_at.isoformat(" "), updated_at.isoformat(" "),
+               f"https://{domain}/favicon.ico", owner_id, simhash(page_title, description))
+
+
+def _trigger_names(statements) -> list[str]:
+    return [statement.split("EXISTS", 1)[1].split()[0] for statement in statements if "TRIGGER" in statement]
+
+
+def seed(path: str, rows: int, users: int, batch: int = 50_000, seed_value: int = 42) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.execute("PRAGMA cache_size=-262144")
+    triggers = _trigger_names(FTS_DDL) + _trigger_names(TAG_DDL) + _trigger_names(SIMHASH_DDL)
+    for name in triggers:
+        connection.execute(f"DROP TRIGGER {name}")
+    indexes = [index for index in Bookmark.__table__.indexes]
+    for index in indexes:
+        connection.execute(f"DROP INDEX {index.name}")
+
+    password_hash = CryptContext(schemes=["bcrypt"]).hash(PASSWORD)
+    connection.executemany(
+        "INSERT INTO user (id, email, username, hashed_password, role, is_active) VALUES (?, ?, ?, ?, 'user', 1)",
+        ((i, f"user{i}@example.com", f"user{i}", password_hash) for i in range(1, users + 1)))
+
+    rng = random.Random(seed_value)
+    generated = bookmark_rows(rng, rows, users)
+    while chunk := list(itertools.islice(generated, batch)):
+        connection.executemany(
+            "INSERT INTO bookmark (id, title, url, url_hash, favorite, description, tags, created_at, "
+            "updated_at, favicon_url, owner_id, simhash, enrichment_status) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'done')",
+            chunk)
+        connection.commit()
+
+    # what the triggers and adjust_counters() would have done row by row
+    connection.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    connection.execute("""INSERT OR IGNORE INTO tag(owner_id, name)
+                          SELECT bookmark.owner_id, json_each.value FROM bookmark, json_each(bookmark.tags)
+                          WHERE json_each.type = 'text'""")
+    connection.execute("""INSERT OR IGNORE INTO bookmark_tag(bookmark_id, tag_id)
+                          SELECT bookmark.id, tag.id FROM bookmark, json_each(bookmark.tags)
+                          JOIN tag ON tag.owner_id = bookmark.owner_id AND tag.name = json_each.value
+                          WHERE json_each.type = 'text'""")
+    connection.execute("""INSERT OR IGNORE INTO simhash_band(owner_id, band_key, bookmark_id, simhash)
+                          SELECT bookmark.owner_id, (value << 16) | ((bookmark.simhash >> (16 * value)) & 65535),
+                                 bookmark.id, bookmark.simhash
+                          FROM bookmark, json_each('[0,1,2,3]')
+                          WHERE bookmark.simhash IS NOT NULL""")
+    connection.execute("""INSERT INTO user_stats(user_id, bookmark_count, favorite_count, tagged_count)
+                          SELECT user.id, count(bookmark.id), coalesce(sum(bookmark.favorite), 0),
+                                 coalesce(sum(json_array_length(bookmark.tags) > 0), 0)
+                          FROM user LEFT JOIN bookmark ON bookmark.owner_id = user.id
+                          GROUP BY user.id""")
+    for statement in FTS_DDL + TAG_DDL + SIMHASH_DDL:
+        connection.execute(statement)
+    for index in indexes:
+        columns = ", ".join(column.name for column in index.columns)
+        connection.execute(f"CREATE {'UNIQUE ' if index.unique else ''}INDEX {index.name} "
+                           f"ON {index.table.name} ({columns})")
+    connection.commit()
+    connection.execute("ANALYZE")
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    connection.close()
+    return {"users": users, "bookmarks": rows, "seed": seed_value}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="bench.db")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} already exists")
+
+    start = time.perf_counter()
+    seed(args.path, args.rows, args.users, seed_value=args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"seeded {args.rows} bookmarks for {args.users} users in {elapsed:.1f}s "
+          f"({args.rows / elapsed:,.0f} rows/s) -> {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Semantic search benchmark: embedding throughput and top-k latency.
+
+Embeds --texts synthetic titles on the EmbeddingPool and reports texts/s,
+with the worst event loop stall seen meanwhile. That shows whether the
+embedding stays off the loop. It then fills a VectorIndex with --rows
+vectors and times VectorIndex.search.
+
+    python -m benchmarks.semantic --workers 1 --texts 20000 --rows 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+import numpy as np  # noqa: E402
+
+from app.utils.embeddings import EmbeddingPool  # noqa: E402
+from app.utils.semantic_index import VectorIndex  # noqa: E402
+
+from .seed import title  # noqa: E402
+
+
+async def loop_lag(samples: list[float]):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        samples.append(time.perf_counter() - start - 0.001)
+
+
+async def embedding(workers: int, texts: list[str]):
+    pool = EmbeddingPool(workers=workers)
+    start = time.perf_counter()
+    await pool.start()
+    started = time.perf_counter() - start
+    await pool.embed(texts[:100])  # warm up every worker
+
+    samples = []
+    ticker = asyncio.create_task(loop_lag(samples))
+    start = time.perf_counter()
+    await pool.embed(texts)
+    elapsed = time.perf_counter() - start
+    ticker.cancel()
+    pool.shutdown()
+    print(f"{pool.name}, {workers} worker(s): start {started:.2f}s, {len(texts) / elapsed:,.0f} texts/s, "
+          f"max loop stall {max(samples) * 1000:.1f}ms")
+
+
+def search(rows: int, dimensions: int, queries: int):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((rows, dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = VectorIndex(tempfile.mkdtemp(prefix="semantic-"), "benchmark", dimensions)
+    start = time.perf_counter()
+    index.upsert(list(range(1, rows + 1)), vectors)
+    index.save(watermark=0.0)
+    print(f"indexed {rows} vectors in {time.perf_counter() - start:.2f}s")
+
+    timings = []
+    for query in vectors[rng.integers(0, rows, queries)]:
+        start = time.perf_counter()
+        index.search(query, 10)
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"top-10 of {rows} x {dimensions}: median {statistics.median(timings):.2f}ms, "
+          f"max {max(timings):.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=1, help="0 = one thread in this process")
+    parser.add_argument("--texts", type=int, default=20_000)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    texts = [title(rng) for _ in range(args.texts)]
+    asyncio.run(embedding(args.workers, texts))
+    search(args.rows, args.dimensions, args.queries)
+
+
+if __name__ == "__main__":
+    main()
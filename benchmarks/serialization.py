@@ -0,0 +1,86 @@
+"""Serialization time per 100-item bookmark page.
+
+    default      FastAPI's path: validate against response_model, dump to
+                 Python objects, json.dumps in JSONResponse
+    uncached     TypeAdapter.dump_json, adapter built for every response
+    fast         FastJSONResponse: cached adapter, validate + dump_json
+
+    python -m benchmarks.serialization --rounds 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.schemas.schemas import PaginateBookmarkReponse  # noqa: E402
+from app.utils.fast_json import FastJSONResponse  # noqa: E402
+
+
+def page(size: int = 100) -> dict:
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    # attribute access like the row tuples the endpoint returns
+    items = [SimpleNamespace(id=i,
+                             title=f"Bookmark number {i}",
+                             url=f"https://site{i}.test/some/article?page={i}",
+                             favorite=i % 5 == 0,
+                             description="A short description of the page " * 3,
+                             tags=["reading", "later", f"topic{i % 10}"],
+                             created_at=now - timedelta(minutes=i),
+                             updated_at=now - timedelta(minutes=i),
+                             enrichment_status="done")
+             for i in range(size)]
+    return {"total": 10_000, "page": 1, "size": size, "items": items, "next_cursor": "abc"}
+
+
+def default(content: dict) -> bytes:
+    model = PaginateBookmarkReponse.model_validate(content, from_attributes=True)
+    return JSONResponse(model.model_dump(mode="json")).body
+
+
+def uncached(content: dict) -> bytes:
+    adapter = TypeAdapter(PaginateBookmarkReponse)
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def fast(content: dict) -> bytes:
+    return FastJSONResponse(content, model=PaginateBookmarkReponse).body
+
+
+def measure(serialize, content: dict, rounds: int) -> list[float]:
+    serialize(content)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        serialize(content)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=100)
+    args = parser.parse_args()
+
+    content = page(args.size)
+    assert json.loads(fast(content)) == json.loads(default(content))
+    baseline = None
+    print(f"{'':>10}  {'median ms':>10}  {'p99 ms':>8}  {'speed-up':>8}")
+    for serialize in (default, uncached, fast):
+        timings = measure(serialize, content, args.rounds)
+        median = statistics.median(timings)
+        baseline = baseline or median
+        p99 = statistics.quantiles(timings, n=100)[98]
+        print(f"{serialize.__name__:>10}  {median:>10.3f}  {p99:>8.3f}  {baseline / median:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
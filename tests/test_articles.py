@@ -0,0 +1,80 @@
+from sqlalchemy import func
+
+from .utils import *
+from app.db.models import BookmarkArticle
+from app.utils import articles
+from app.utils.articles import ArticleExtractor, extract_article
+from app.utils.simhash import simhash
+
+
+def test_extract_article():
+    article = extract_article(MOCK_PAGES["article.test"])
+    assert article.text.startswith("Write-ahead logging in SQLite\n\nIn WAL mode")
+    for boilerplate in ("Home", "newsletter", "Next post", "Comments"):
+        assert boilerplate not in article.text
+    assert (article.word_count, article.reading_time, article.language) == (55, 1, "en")
+    
+    german = "<p>Der Hund und die Katze sind nicht im Haus, das ist auch ein Problem für die Nachbarn.</p>"
+    assert extract_article(german).language == "de"
+    assert extract_article("<html><body><nav><p>Home, Archive, About us and Contact</p></nav></body></html>") is None
+    assert extract_article("") is None
+
+
+
+
+@pytest_asyncio.fixture(scope="function")
+async def article_extractor():
+    extractor = ArticleExtractor(SessionLocal, workers=0, fetchers=1, client_factory=lambda: mock_http_client)
+    await extractor.start(requeue=False)
+    articles.article_extractor = extractor
+    yield extractor
+    articles.article_extractor = None
+    await extractor.stop()
+
+
+@pytest.mark.asyncio
+async def test_article_extraction(async_client: AsyncClient,
+                                  db_session,
+                                  seed_data,
+                                  article_extractor):
+    headers = {"Authorization": "Bearer testtoken"}
+    response = await async_client.post("/bookmarks/", json={"title": "", "url": "https://article.test/wal"},
+                                       headers=headers)
+    bookmark = response.json()
+    await article_extractor.join()
+    
+    response = await async_client.get(f"/bookmarks/{bookmark['id']}/article", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["text"] == extract_article(MOCK_PAGES["article.test"]).text
+    assert (data["word_count"], data["reading_time"], data["language"]) == (55, 1, "en")
+    
+    stored = await db_session.get(BookmarkArticle, bookmark["id"])
+    assert len(stored.content) < len(data["text"].encode())
+    # signed from the article, without touching updated_at
+    current = (await async_client.get(f"/bookmarks/{bookmark['id']}", headers=headers)).json()
+    assert current["updated_at"] == bookmark["updated_at"]
+    assert (await db_session.scalar(select(Bookmark.simhash).where(Bookmark.id == bookmark["id"]))) == simhash(data["text"])
+    
+    # lists never carry the text
+    response = await async_client.get("/bookmarks/", headers=headers)
+    assert "text" not in response.json()["items"][0]
+    
+    response = await async_client.get("/bookmarks/1/article", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["detail"] == "Article not found."
+    response = await async_client.get("/bookmarks/999/article", headers=headers)
+    assert response.json()["detail"] == "Bookmark not found."
+    
+    # another page now - the old article goes
+    await async_client.put(f"/bookmarks/{bookmark['id']}", json={"title": "WAL", "url": "https://article.test/other"},
+                           headers=headers)
+    response = await async_client.get(f"/bookmarks/{bookmark['id']}/article", headers=headers)
+    assert response.json()["detail"] == "Article not found."
+    
+    # edited or deleted while being extracted - nothing is written
+    await article_extractor.extract(bookmark["id"], "https://article.test/wal")
+    assert (await db_session.scalar(select(func.count()).select_from(BookmarkArticle))) == 0
+    await async_client.delete(f"/bookmarks/{bookmark['id']}", headers=headers)
+    await article_extractor.extract(bookmark["id"], "https://article.test/other")
+    assert (await db_session.scalar(select(func.count()).select_from(BookmarkArticle))) == 0
@@ -1,7 +1,14 @@
+import csv
+import io
+import json
 from datetime import date
-from sqlalchemy import select
+from sqlalchemy import insert, select, text, update
 
 from .utils import *
+from app.db.counters import get_counters, reconcile_counters
+from app.utils.bookmark_import import import_bookmarks
+from app.utils.cursor import decode_cursor, encode_cursor, keyset_after, keyset_null_tail
+from app.utils.enrichment import EnrichmentQueue, get_enrichment_queue
 
 
 TEST_DATETIME = "2025-01-01T12:00:00"
@@ -107,4 +114,648 @@ async def test_delete_bookmark(async_client: AsyncClient,
     assert response.status_code == status.HTTP_204_NO_CONTENT
     
     result = await db_session.execute(select(Bookmark).where(Bookmark.id == bookmark_id))
-    assert result.scalar_one_or_none() == None
\ No newline at end of file
+    assert result.scalar_one_or_none() == None    
+    
+
+
+@pytest.mark.asyncio
+async def test_search_bookmarks(async_client: AsyncClient,
+                                db_session,
+                                seed_data):
+    db_session.add(Bookmark(id=2,
+                            title="Python tips",
+                            url="https://python.org/",
+                            description="Learn python the fast way",
+                            favorite=False,
+                            owner_id=1))
+    db_session.add(Bookmark(id=3,
+                            title="Python news",
+                            url="https://other.org/",
+                            favorite=False,
+                            owner_id=2))
+    await db_session.commit()
+    
+    response = await async_client.get("/bookmarks/search",
+                                      params={"q": "pyth", "prefix": True},
+                                      headers={"Authorization": "Bearer testtoken"})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    
+    assert data["size"] == 1
+    item = data["items"][0]
+    assert item["id"] == 2
+    assert item["title_highlight"] == "<mark>Python</mark> tips"
+    assert "<mark>python</mark>" in item["snippet"]
+    
+    await async_client.delete("/bookmarks/2", headers={"Authorization": "Bearer testtoken"})
+    response = await async_client.get("/bookmarks/search",
+                                      params={"q": "python"},
+                                      headers={"Authorization": "Bearer testtoken"})
+    assert response.json()["size"] == 0
+    
+    
+
+
+@pytest.mark.asyncio
+async def test_filter_bookmarks_by_tags(async_client: AsyncClient,
+                                        db_session,
+                                        seed_data):
+    db_session.add_all([Bookmark(id=2, title="A", url="https://a.com/", favorite=False, owner_id=1, tags=["python", "web"]),
+                        Bookmark(id=3, title="B", url="https://b.com/", favorite=False, owner_id=1, tags=["python"]),
+                        Bookmark(id=4, title="C", url="https://c.com/", favorite=False, owner_id=2, tags=["python", "web"])])
+    await db_session.commit()
+    headers = {"Authorization": "Bearer testtoken"}
+    
+    response = await async_client.get("/bookmarks/", params={"tag": "python"}, headers=headers)
+    data = response.json()
+    assert data["total"] == 2
+    assert {item["id"] for item in data["items"]} == {2, 3}
+    
+    response = await async_client.get("/bookmarks/", params={"tags_all": ["python", "web"]}, headers=headers)
+    data = response.json()
+    assert data["total"] == 1
+    assert data["items"][0]["id"] == 2
+    
+    await async_client.put("/bookmarks/3",
+                           json={"title": "B", "url": "https://b.com/", "tags": ["web"]},
+                           headers=headers)
+    response = await async_client.get("/bookmarks/tags", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{"name": "web", "count": 2},
+                               {"name": "python", "count": 1}]
+    
+    
+
+
+@pytest.mark.asyncio
+async def test_get_all_bookmarks_cursor_pagination(async_client: AsyncClient,
+                                                   db_session,
+                                                   seed_data):
+    # duplicated titles and dates make the id tie-breaker matter
+    db_session.add_all([Bookmark(id=i,
+                                 title=f"Title {i % 3}",
+                                 url=f"https://example.com/{i}",
+                                 favorite=i % 2 == 0,
+                                 owner_id=1,
+                                 created_at=datetime(2025, 1, i % 4 + 1),
+                                 updated_at=datetime(2025, 1, i % 4 + 1))
+                        for i in range(2, 12)])
+    await db_session.commit()
+    headers = {"Authorization": "Bearer testtoken"}
+    
+    for sort_by in ("Date descending", "Date ascending", "Title descending",
+                    "Title ascending", "Favorite", "Not favorite"):
+        response = await async_client.get("/bookmarks/", params={"sort_by": sort_by, "limit": 100}, headers=headers)
+        expected = [item["id"] for item in response.json()["items"]]
+        
+        seen = []
+        params = {"sort_by": sort_by, "limit": 3}
+        while True:
+            data = (await async_client.get("/bookmarks/", params=params, headers=headers)).json()
+            seen.extend(item["id"] for item in data["items"])
+            if data["next_cursor"] is None:
+                break
+            params["cursor"] = data["next_cursor"]
+        
+        assert seen == expected
+        assert data["total"] == 11
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_same_second(async_client: AsyncClient,
+                                             seed_data):
+    # saved through the API within one second - created_at comes from the
+    # column default, not from the test
+    headers = {"Authorization": "Bearer testtoken"}
+    for i in range(7):
+        await async_client.post("/bookmarks/", json={"title": f"Site {i}", "url": f"https://site{i}.test/"},
+                                headers=headers)
+    
+    for sort_by in ("Date descending", "Date ascending"):
+        seen = []
+        params = {"sort_by": sort_by, "limit": 2}
+        while len(seen) <= 8:
+            data = (await async_client.get("/bookmarks/", params=params, headers=headers)).json()
+            seen.extend(item["id"] for item in data["items"])
+            if data["next_cursor"] is None:
+                break
+            params["cursor"] = data["next_cursor"]
+        assert sorted(seen) == list(range(1, 9))
+
+
+
+
+@pytest.mark.asyncio
+async def test_keyset_after_null_sort_key(db_session,
+                                          seed_data):
+    db_session.add_all([Bookmark(id=i, title=f"Title {i}", url=f"https://example.com/{i}", owner_id=1,
+                                 created_at=datetime(2025, 1, i % 4 + 1))
+                        for i in range(2, 12)])
+    await db_session.commit()
+    # created_at is nullable - SQLite sorts NULLs first ascending, last descending
+    await db_session.execute(update(Bookmark).where(Bookmark.id.in_([1, 3, 6, 9])).values(created_at=None))
+    await db_session.commit()
+    
+    for descending in (True, False):
+        order_by = ((Bookmark.created_at.desc(), Bookmark.id.desc()) if descending
+                    else (Bookmark.created_at.asc(), Bookmark.id.asc()))
+        stmt = select(Bookmark.id, Bookmark.created_at).order_by(*order_by)
+        expected = (await db_session.execute(stmt)).all()
+        
+        seen, page = [], (await db_session.execute(stmt.limit(3))).all()
+        while page:
+            seen.extend(page)
+            cursor = encode_cursor("date", page[-1].created_at, page[-1].id)
+            value, last_id = decode_cursor(cursor, "date", is_datetime=True)
+            page = (await db_session.execute(
+                stmt.where(keyset_after(Bookmark.created_at, Bookmark.id, value, last_id, descending))
+                .limit(3))).all()
+            null_tail = keyset_null_tail(Bookmark.created_at, value, descending)
+            if null_tail is not None and len(page) < 3:
+                page += (await db_session.execute(stmt.where(null_tail).limit(3 - len(page)))).all()
+        assert seen == expected
+
+
+@pytest.mark.asyncio
+async def test_get_all_bookmarks_invalid_cursor(async_client: AsyncClient,
+                                                seed_data):
+    response = await async_client.get("/bookmarks/",
+                                      params={"cursor": "not-a-cursor"},
+                                      headers={"Authorization": "Bearer testtoken"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    
+
+
+@pytest.mark.asyncio
+async def test_bookmark_counters(async_client: AsyncClient,
+                                 db_session,
+                                 seed_data):
+    headers = {"Authorization": "Bearer testtoken"}
+    response = await async_client.get("/bookmarks/", headers=headers)
+    assert response.json()["total"] == 1
+    
+    await async_client.put("/bookmarks/1",
+                           json={"title": "Test", "url": "https://example.com/", "tags": ["a"]},
+                           headers=headers)
+    stats = await get_counters(db_session, 1)
+    assert (stats.bookmark_count, stats.favorite_count, stats.tagged_count) == (1, 0, 1)
+    
+    await async_client.delete("/bookmarks/1", headers=headers)
+    response = await async_client.get("/bookmarks/", headers=headers)
+    assert response.json()["total"] == 0
+
+
+
+
+@pytest.mark.asyncio
+async def test_reconcile_counters(db_session,
+                                  seed_data):
+    await get_counters(db_session, 1)
+    db_session.add(Bookmark(id=2, title="A", url="https://a.com/", favorite=True, owner_id=1, tags=["x"]))
+    await db_session.commit()
+    
+    assert await reconcile_counters(db_session) == 1
+    stats = await get_counters(db_session, 1)
+    assert (stats.bookmark_count, stats.favorite_count, stats.tagged_count) == (2, 1, 1)
+    assert await reconcile_counters(db_session) == 0
+    
+    
+
+
+@pytest.mark.asyncio
+async def test_create_bookmark_background_enrichment(async_client: AsyncClient,
+                                                     db_session,
+                                                     seed_data):
+    queue = EnrichmentQueue(SessionLocal, workers=2, client_factory=lambda: mock_http_client)
+    app.dependency_overrides[get_enrichment_queue] = lambda: queue
+    try:
+        response = await async_client.post("/bookmarks/",
+                                           json={"title": "My title", "url": "https://example.com/page"},
+                                           headers={"Authorization": "Bearer testtoken"})
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert data["title"] == "My title"
+        assert data["enrichment_status"] == "pending"
+        
+        # workers start after the request - the test engine shares one connection
+        await queue.start(requeue=False)
+        await queue.drain(timeout=5)
+    finally:
+        del app.dependency_overrides[get_enrichment_queue]
+    
+    response = await async_client.get(f"/bookmarks/{data['id']}", headers={"Authorization": "Bearer testtoken"})
+    data = response.json()
+    assert data["title"] == "Example Domain"
+    assert data["enrichment_status"] == "done"
+    assert data["favicon_hash"] is not None
+
+
+
+
+@pytest.mark.asyncio
+async def test_enrichment_keeps_edit_made_while_queued(async_client: AsyncClient,
+                                                      db_session,
+                                                      seed_data):
+    headers = {"Authorization": "Bearer testtoken"}
+    queue = EnrichmentQueue(SessionLocal, workers=1, client_factory=lambda: mock_http_client)
+    app.dependency_overrides[get_enrichment_queue] = lambda: queue
+    try:
+        response = await async_client.post("/bookmarks/",
+                                           json={"title": "My title", "url": "https://example.com/page"},
+                                           headers=headers)
+        bookmark_id = response.json()["id"]
+        # edited between submit and enrich
+        response = await async_client.put(f"/bookmarks/{bookmark_id}",
+                                          json={"title": "Edited title", "url": "https://example.com/page"},
+                                          headers=headers)
+        assert response.json()["enrichment_status"] == "done"
+        
+        await queue.start(requeue=False)
+        await queue.drain(timeout=5)
+    finally:
+        del app.dependency_overrides[get_enrichment_queue]
+    
+    response = await async_client.get(f"/bookmarks/{bookmark_id}", headers=headers)
+    assert response.json()["title"] == "Edited title"
+    assert response.json()["enrichment_status"] == "done"
+
+
+
+
+NETSCAPE_EXPORT = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3 ADD_DATE="1600000000">Reading</H3>
+    <DD>Folder description
+    <DL><p>
+        <DT><A HREF="https://python.org/" ADD_DATE="1600000000" TAGS="python,docs">Python &amp; friends</A>
+        <DD>Język programowania
+        <DT><A HREF="https://example.com">Already saved</A>
+        <DT><A HREF="javascript:void(0)">Bookmarklet</A>
+    </DL><p>
+    <DT><A HREF="https://sqlite.org/">SQLite</A>
+</DL><p>
+"""
+
+
+@pytest.mark.asyncio
+async def test_import_netscape_html(async_client: AsyncClient,
+                                    db_session,
+                                    seed_data):
+    response = await async_client.post("/bookmarks/import",
+                                       content=NETSCAPE_EXPORT.encode("utf-8"),
+                                       headers={"Authorization": "Bearer testtoken",
+                                                "Content-Type": "text/html"})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert (data["processed"], data["imported"], data["duplicates"], data["failed"]) == (4, 2, 1, 1)
+    assert data["errors"][0]["row"] == 3
+    
+    bookmarks = (await db_session.scalars(select(Bookmark).where(Bookmark.id > 1).order_by(Bookmark.id))).all()
+    assert [bookmark.title for bookmark in bookmarks] == ["Python & friends", "SQLite"]
+    assert bookmarks[0].tags == ["python", "docs"]
+    assert bookmarks[0].description == "Język programowania"
+    assert bookmarks[0].created_at == datetime(2020, 9, 13, 12, 26, 40)
+    assert bookmarks[1].description is None
+    
+    counters = await get_counters(db_session, 1)
+    assert (counters.bookmark_count, counters.tagged_count) == (3, 1)
+
+
+
+
+@pytest.mark.asyncio
+async def test_import_json_and_ndjson(async_client: AsyncClient,
+                                      seed_data):
+    entries = [{"url": f"https://site{i}.test/", "title": f"Site {i}", "favorite": i == 0} for i in range(5)]
+    entries.append({"url": "https://site0.test/", "title": "Duplicate"})
+    
+    response = await async_client.post("/bookmarks/import?format=json",
+                                       content=json.dumps(entries),
+                                       headers={"Authorization": "Bearer testtoken"})
+    assert response.json()["imported"] == 5
+    assert response.json()["duplicates"] == 1
+    
+    ndjson = "\n".join(json.dumps(entry) for entry in entries[3:]) + "\n{broken\n"
+    response = await async_client.post("/bookmarks/import",
+                                       content=ndjson,
+                                       headers={"Authorization": "Bearer testtoken"})
+    data = response.json()
+    assert (data["processed"], data["imported"], data["duplicates"], data["failed"]) == (4, 0, 3, 1)
+    
+    response = await async_client.post("/bookmarks/import",
+                                       content="not a bookmark file",
+                                       headers={"Authorization": "Bearer testtoken"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    response = await async_client.get("/bookmarks/", headers={"Authorization": "Bearer testtoken"})
+    assert response.json()["total"] == 6
+
+
+
+
+@pytest.mark.asyncio
+async def test_import_concurrent_duplicates(db_session,
+                                            seed_data,
+                                            monkeypatch):
+    async def entries():
+        for i in range(3):
+            yield {"url": f"https://site{i}.test/", "title": f"Site {i}"}
+    
+    # another import saves site1 between the lookup and the insert
+    scalars = db_session.scalars
+    
+    async def racing_lookup(statement):
+        existing = await scalars(statement)
+        await db_session.execute(insert(Bookmark).values(owner_id=1, url="https://site1.test/", title="Site 1"))
+        return existing
+    monkeypatch.setattr(db_session, "scalars", racing_lookup)
+    
+    summary = await import_bookmarks(db_session, 1, entries())
+    assert (summary.processed, summary.imported, summary.duplicates) == (3, 2, 1)
+    monkeypatch.undo()
+    urls = await db_session.scalars(select(Bookmark.url).where(Bookmark.id > 1).order_by(Bookmark.id))
+    assert urls.all() == ["https://site1.test/", "https://site0.test/", "https://site2.test/"]
+    assert (await get_counters(db_session, 1)).bookmark_count == 4
+
+
+
+
+@pytest.mark.asyncio
+async def test_export_bookmarks(async_client: AsyncClient,
+                                seed_data):
+    entries = [{"url": f"https://site{i}.test/", "title": f"Site, \"{i}\"", "tags": ["a", "b"]} for i in range(3)]
+    await async_client.post("/bookmarks/import",
+                            content=json.dumps(entries),
+                            headers={"Authorization": "Bearer testtoken"})
+    
+    response = await async_client.get("/bookmarks/export", headers={"Authorization": "Bearer testtoken"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [1, 2, 3, 4]
+    assert rows[0]["created_at"] == TEST_DATETIME
+    assert rows[1]["tags"] == ["a", "b"]
+    
+    response = await async_client.get("/bookmarks/export?format=csv", headers={"Authorization": "Bearer testtoken"})
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 4
+    assert rows[1]["title"] == 'Site, "0"'
+    assert rows[1]["tags"] == "a,b"
+    
+    # a netscape export imports back as duplicates only
+    response = await async_client.get("/bookmarks/export?format=netscape", headers={"Authorization": "Bearer testtoken"})
+    assert response.headers["content-disposition"] == 'attachment; filename="bookmarks.html"'
+    response = await async_client.post("/bookmarks/import",
+                                       content=response.content,
+                                       headers={"Authorization": "Bearer testtoken"})
+    assert (response.json()["processed"], response.json()["duplicates"]) == (4, 4)
+
+
+
+
+@pytest.mark.asyncio
+async def test_bulk_operations(async_client: AsyncClient,
+                               db_session,
+                               seed_data):
+    headers = {"Authorization": "Bearer testtoken"}
+    entries = [{"url": f"https://site{i}.test/", "title": f"Site {i}", "tags": ["old"] if i < 3 else None} for i in range(5)]
+    await async_client.post("/bookmarks/import", content=json.dumps(entries), headers=headers)
+    
+    response = await async_client.post("/bookmarks/bulk",
+                                       json={"action": "set_favorite", "ids": [1, 2, 3, 999], "favorite": True},
+                                       headers=headers)
+    assert response.json() == {"action": "set_favorite", "affected": 3}
+    
+    response = await async_client.post("/bookmarks/bulk",
+                                       json={"action": "add_tags", "ids": [2, 5], "tags": ["new", "old"]},
+                                       headers=headers)
+    assert response.json()["affected"] == 2
+    
+    response = await async_client.post("/bookmarks/bulk",
+                                       json={"action": "move", "filter": {"tag": "old"}, "from_tags": ["old"], "tags": ["archive"]},
+                                       headers=headers)
+    assert response.json()["affected"] == 4
+    
+    response = await async_client.get("/bookmarks/tags", headers=headers)
+    assert response.json() == [{"name": "archive", "count": 4}, {"name": "new", "count": 2}]
+    response = await async_client.get("/bookmarks/2", headers=headers)
+    assert response.json()["tags"] == ["new", "archive"]
+    
+    response = await async_client.post("/bookmarks/bulk",
+                                       json={"action": "remove_tags", "ids": [5], "tags": ["new", "archive"]},
+                                       headers=headers)
+    assert response.json()["affected"] == 1
+    
+    response = await async_client.post("/bookmarks/bulk",
+                                       json={"action": "delete", "filter": {"favorite": True}},
+                                       headers=headers)
+    assert response.json()["affected"] == 3
+    
+    stats = await get_counters(db_session, 1)
+    assert (stats.bookmark_count, stats.favorite_count, stats.tagged_count) == (3, 0, 1)
+    assert await reconcile_counters(db_session) == 0
+    
+    response = await async_client.post("/bookmarks/bulk",
+                                       json={"action": "delete", "ids": [1], "filter": {}},
+                                       headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+
+
+@pytest.mark.asyncio
+async def test_bookmark_not_found(async_client: AsyncClient,
+                                  seed_data):
+    headers = {"Authorization": "Bearer testtoken"}
+    response = await async_client.get("/bookmarks/2", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    response = await async_client.put("/bookmarks/2",
+                                      json={"title": "Missing", "url": "https://example.com/"},
+                                      headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    response = await async_client.delete("/bookmarks/2", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    response = await async_client.put("/bookmarks/1",
+                                      json={"title": "Renamed", "url": "https://example.com/", "tags": ["a"]},
+                                      headers=headers)
+    assert response.json()["title"] == "Renamed"
+    assert response.json()["tags"] == ["a"]
+    assert response.json()["created_at"] == TEST_DATETIME
+
+
+
+
+@pytest.mark.asyncio
+async def test_conditional_get(async_client: AsyncClient,
+                               seed_data):
+    headers = {"Authorization": "Bearer testtoken"}
+    response = await async_client.get("/bookmarks/", headers=headers)
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    
+    response = await async_client.get("/bookmarks/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    
+    # other query, other tag
+    response = await async_client.get("/bookmarks/?limit=5", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    
+    response = await async_client.get("/bookmarks/1", headers=headers)
+    item_etag = response.headers["ETag"]
+    response = await async_client.get("/bookmarks/1", headers={**headers, "If-None-Match": f'"other", {item_etag}'})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    
+    # an edit changes both tags, twice in the same second too
+    for title in ("First", "Second"):
+        response = await async_client.put("/bookmarks/1",
+                                          json={"title": title, "url": "https://example.com/"},
+                                          headers=headers)
+        assert response.headers["ETag"] != item_etag
+        item_etag = response.headers["ETag"]
+    response = await async_client.get("/bookmarks/1", headers={**headers, "If-None-Match": item_etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    response = await async_client.get("/bookmarks/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["items"][0]["title"] == "Second"
+
+
+
+
+@pytest.mark.asyncio
+async def test_if_match(async_client: AsyncClient,
+                        seed_data):
+    headers = {"Authorization": "Bearer testtoken"}
+    etag = (await async_client.get("/bookmarks/1", headers=headers)).headers["ETag"]
+    
+    response = await async_client.put("/bookmarks/1",
+                                      json={"title": "Mine", "url": "https://example.com/"},
+                                      headers={**headers, "If-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    
+    # the stale tag loses
+    response = await async_client.put("/bookmarks/1",
+                                      json={"title": "Theirs", "url": "https://example.com/"},
+                                      headers={**headers, "If-Match": etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = await async_client.delete("/bookmarks/1", headers={**headers, "If-Match": etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert (await async_client.get("/bookmarks/1", headers=headers)).json()["title"] == "Mine"
+    
+    response = await async_client.delete("/bookmarks/2", headers={**headers, "If-Match": "*"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await async_client.delete("/bookmarks/1", headers={**headers, "If-Match": "*"})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+
+
+@pytest.mark.asyncio
+async def test_response_cache(async_client: AsyncClient,
+                              seed_data):
+    headers = {"Authorization": "Bearer testtoken"}
+    first = await async_client.get("/bookmarks/?limit=5&skip=0", headers=headers)
+    # same query, other parameter order
+    second = await async_client.get("/bookmarks/?skip=0&limit=5", headers=headers)
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert response_cache.stats.hits == 1
+    
+    response = await async_client.get("/bookmarks/?skip=0&limit=5",
+                                      headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    
+    # every write drops the user's entries
+    await async_client.put("/bookmarks/1", json={"title": "Changed", "url": "https://example.com/"}, headers=headers)
+    response = await async_client.get("/bookmarks/?limit=5&skip=0", headers=headers)
+    assert response.json()["items"][0]["title"] == "Changed"
+    
+    await async_client.post("/bookmarks/bulk", json={"action": "add_tags", "ids": [1], "tags": ["x"]}, headers=headers)
+    response = await async_client.get("/bookmarks/tags", headers=headers)
+    assert response.json() == [{"name": "x", "count": 1}]
+    await async_client.delete("/bookmarks/1", headers=headers)
+    assert (await async_client.get("/bookmarks/tags", headers=headers)).json() == []
+    assert (await async_client.get("/bookmarks/?limit=5&skip=0", headers=headers)).json()["total"] == 0
+    
+    stats = (await async_client.get("/stats/response-cache")).json()
+    assert stats["hits"] == 2
+    assert stats["invalidations"] == 3
+
+
+
+
+@pytest.mark.asyncio
+async def test_response_cache_backend(async_client: AsyncClient,
+                                      seed_data):
+    backend = FakeCacheBackend()
+    response_cache.reset(backend)
+    headers = {"Authorization": "Bearer testtoken"}
+    
+    first = await async_client.get("/bookmarks/", headers=headers)
+    second = await async_client.get("/bookmarks/", headers=headers)
+    assert second.content == first.content
+    assert backend.calls == ["get", "set", "get"]
+    
+    await async_client.post("/bookmarks/import",
+                            content=b'{"url": "https://imported.example/"}\n',
+                            headers={**headers, "Content-Type": "application/x-ndjson"})
+    assert backend.generations == {1: 1}
+    assert (await async_client.get("/bookmarks/", headers=headers)).json()["total"] == 2
+
+
+
+
+@pytest.mark.asyncio
+async def test_duplicate_bookmarks(async_client: AsyncClient,
+                                   seed_data):
+    headers = {"Authorization": "Bearer testtoken"}
+    for url in ("http://example.com", "https://EXAMPLE.com/", "https://example.com/?utm_source=feed#top"):
+        response = await async_client.post("/bookmarks/", json={"title": "Again", "url": url}, headers=headers)
+        assert response.status_code == status.HTTP_409_CONFLICT
+    
+    entries = [{"url": "https://example.com/?b=2&a=1", "title": "New"},
+               {"url": "http://example.com/?a=1&b=2&fbclid=x", "title": "Same page"},
+               {"url": "https://example.com/?gclid=y", "title": "Seeded page"}]
+    response = await async_client.post("/bookmarks/import?format=json",
+                                       content=json.dumps(entries),
+                                       headers=headers)
+    assert (response.json()["imported"], response.json()["duplicates"]) == (1, 2)
+    
+    response = await async_client.put("/bookmarks/2",
+                                      json={"title": "Moved", "url": "http://example.com/"},
+                                      headers=headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
+    response = await async_client.put("/bookmarks/2",
+                                      json={"title": "Renamed", "url": "https://example.com/?a=1&b=2"},
+                                      headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+
+
+
+@pytest.mark.asyncio
+async def test_duplicates_report(async_client: AsyncClient,
+                                 db_session,
+                                 seed_data):
+    # saved before the unique index - the migration leaves their hash NULL
+    rows = [("Legacy", "http://example.com/"), ("Legacy", "https://example.com/?utm_medium=mail"),
+            ("Orphan", "https://site.test/a/"), ("Orphan", "https://site.test/a"), ("Single", "https://other.test/")]
+    await db_session.execute(text("DROP INDEX ix_bookmark_owner_id_url_hash"))
+    await db_session.execute(insert(Bookmark), [{"title": title, "url": url, "owner_id": 1} for title, url in rows])
+    await db_session.execute(update(Bookmark).where(Bookmark.id > 1).values(url_hash=None))
+    await db_session.commit()
+    
+    response = await async_client.get("/bookmarks/duplicates", headers={"Authorization": "Bearer testtoken"})
+    assert response.status_code == status.HTTP_200_OK
+    groups = response.json()
+    assert [group["canonical_url"] for group in groups] == ["https://example.com/", "https://site.test/a"]
+    assert [bookmark["id"] for bookmark in groups[0]["bookmarks"]] == [1, 2, 3]
+    assert [bookmark["id"] for bookmark in groups[1]["bookmarks"]] == [4, 5]
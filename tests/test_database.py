@@ -0,0 +1,38 @@
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from .utils import *
+from app.db.database import create_engines, sqlite_pragmas
+
+
+@pytest.mark.asyncio
+async def test_production_profile_pragmas(tmp_path):
+    write_engine, read_engine = create_engines(f"sqlite+aiosqlite:///{tmp_path / 'bookmarks.db'}",
+                                               profile="production", echo=False)
+    try:
+        async with write_engine.begin() as connection:
+            await connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY)"))
+            assert (await connection.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await connection.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+            assert (await connection.execute(text("PRAGMA busy_timeout"))).scalar() == 5000
+            assert (await connection.execute(text("PRAGMA cache_size"))).scalar() == -64 * 1024
+        
+        async with read_engine.connect() as connection:
+            assert (await connection.execute(text("PRAGMA query_only"))).scalar() == 1
+            assert (await connection.execute(text("SELECT count(*) FROM item"))).scalar() == 0
+            with pytest.raises(OperationalError):
+                await connection.execute(text("INSERT INTO item DEFAULT VALUES"))
+    finally:
+        await write_engine.dispose()
+        await read_engine.dispose()
+
+
+def test_pragma_overrides(monkeypatch):
+    monkeypatch.setenv("SQLITE_MMAP_SIZE", "0")
+    assert sqlite_pragmas("production")["mmap_size"] == "0"
+    assert sqlite_pragmas("default") == {"mmap_size": "0"}
+
+
+def test_memory_database_has_one_engine():
+    write_engine, read_engine = create_engines("sqlite+aiosqlite:///:memory:", echo=False)
+    assert write_engine is read_engine
@@ -0,0 +1,80 @@
+import io
+
+from .utils import *
+from app.db.models import Favicon
+from app.utils.favicons import get_favicon_store, normalize_icon
+
+
+def test_normalize_icon():
+    icon = normalize_icon(MOCK_ICONS["/favicon.ico"][0], size=64)
+    assert Image.open(io.BytesIO(icon)).size == (48, 48)  # never scaled up
+    touch = Image.open(io.BytesIO(normalize_icon(MOCK_ICONS["/touch.png"][0], size=64)))
+    assert (touch.format, touch.size) == ("PNG", (64, 64))
+    
+    assert normalize_icon(MOCK_ICONS["/icon.svg"][0]) is None
+    assert normalize_icon(b"<html>Not found</html>") is None
+    huge = io.BytesIO()
+    Image.new("1", (4000, 4000)).save(huge, format="PNG")
+    assert normalize_icon(huge.getvalue()) is None
+    assert normalize_icon(MOCK_ICONS["/touch.png"][0], size=0) == MOCK_ICONS["/touch.png"][0]
+
+
+
+
+@pytest.mark.asyncio
+async def test_favicon_store(async_client: AsyncClient,
+                             db_session,
+                             seed_data,
+                             monkeypatch):
+    headers = {"Authorization": "Bearer testtoken"}
+    store = get_favicon_store()
+    downloads = []
+    download = store._download
+    
+    async def counted_download(icon_url, client):
+        downloads.append(icon_url)
+        return await download(icon_url, client)
+    monkeypatch.setattr(store, "_download", counted_download)
+    
+    hashes = {}
+    for url in ("https://blog.test/one", "https://blog.test/two", "https://repost.test/",
+                "https://touch.test/", "https://svg.test/"):
+        response = await async_client.post("/bookmarks/", json={"title": "", "url": url}, headers=headers)
+        hashes[url] = response.json()["favicon_hash"]
+    
+    # once per domain
+    assert downloads == ["https://blog.test/favicon.ico", "https://repost.test/favicon.ico",
+                         "https://touch.test/touch.png", "https://svg.test/icon.svg"]
+    # the same bytes on two domains, stored once
+    assert hashes["https://blog.test/one"] == hashes["https://blog.test/two"] == hashes["https://repost.test/"]
+    assert hashes["https://touch.test/"] not in (None, hashes["https://blog.test/one"])
+    assert hashes["https://svg.test/"] is None
+    domains = dict((await db_session.execute(select(Favicon.domain, Favicon.hash))).all())
+    assert domains == {"blog.test": hashes["https://blog.test/one"], "repost.test": hashes["https://repost.test/"],
+                       "touch.test": hashes["https://touch.test/"], "svg.test": None}
+    
+    response = await async_client.get(f"/favicons/{hashes['https://touch.test/']}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert Image.open(io.BytesIO(response.content)).size == (64, 64)
+    
+    response = await async_client.get(f"/favicons/{hashes['https://touch.test/']}",
+                                      headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    
+    response = await async_client.get("/favicons/" + "0" * 32)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await async_client.get("/favicons/..%2F..%2Fetc%2Fpasswd")
+    assert response.status_code in (status.HTTP_404_NOT_FOUND, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+
+@pytest.mark.asyncio
+async def test_favicon_malformed_content_length():
+    store = get_favicon_store()
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=MOCK_ICONS["/touch.png"][0], headers={"Content-Length": "lots"})
+    
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        assert await store.fetch("https://broken.test/touch.png", client) is not None
@@ -0,0 +1,68 @@
+from sqlalchemy import func, select
+
+from .utils import *
+from app.db.models import SimhashBand
+from app.db.simhash import band_keys, near_duplicate_clusters
+from app.utils.simhash import hamming_distance, simhash
+
+
+def test_simhash():
+    text = ("Connection pooling, WAL mode and PRAGMA settings that keep SQLite fast under concurrent writes "
+            "from an async web server")
+    signature = simhash("Tuning SQLite for async web servers", text)
+    assert signature == simhash("tuning sqlite for async web servers!", text)
+    assert -2 ** 63 <= signature < 2 ** 63
+    assert hamming_distance(signature, simhash("Tuning SQLite for async web servers | AMP", text)) <= 3
+    assert hamming_distance(signature, simhash("Sourdough bread with a rye starter, step by step")) > 10
+    assert simhash("Example Domain") is None
+
+
+def test_near_duplicate_clusters():
+    first, second = simhash("how to tune sqlite for async web servers"), simhash("bread with a rye starter step by step")
+    near = first ^ 0b101  # 2 bits apart
+    rows = sorted([(key, 1, first) for key in band_keys(first)] +
+                  [(key, 2, near) for key in band_keys(near)] +
+                  [(key, 3, first) for key in band_keys(first)] +
+                  [(key, 4, second) for key in band_keys(second)])
+    assert near_duplicate_clusters(rows) == [[1, 2, 3]]
+    # buckets too crowded to compare - identical signatures still join
+    assert near_duplicate_clusters(rows, bucket_limit=1) == [[1, 3]]
+
+
+@pytest.mark.asyncio
+async def test_related_and_near_duplicates(async_client: AsyncClient,
+                                           db_session,
+                                           seed_data):
+    headers = {"Authorization": "Bearer testtoken"}
+    ids = {}
+    for host in ("blog.test", "amp.blog.test", "repost.test", "bread.test"):
+        response = await async_client.post("/bookmarks/", json={"title": "", "url": f"https://{host}/post"},
+                                           headers=headers)
+        ids[host] = response.json()["id"]
+    # one band row per band of every signed bookmark
+    assert await db_session.scalar(select(func.count()).select_from(SimhashBand)) == 4 * 4
+    
+    response = await async_client.get(f"/bookmarks/{ids['blog.test']}/related", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    related = response.json()
+    assert [bookmark["id"] for bookmark in related] == [ids["repost.test"], ids["amp.blog.test"]]
+    assert related[0]["distance"] == 0 < related[1]["distance"] <= 3
+    
+    response = await async_client.get(f"/bookmarks/{ids['blog.test']}/related?max_distance=0", headers=headers)
+    assert [bookmark["id"] for bookmark in response.json()] == [ids["repost.test"]]
+    response = await async_client.get("/bookmarks/1/related", headers=headers)  # never scraped
+    assert response.json() == []
+    response = await async_client.get("/bookmarks/99/related", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    response = await async_client.get("/bookmarks/near-duplicates", headers=headers)
+    clusters = response.json()
+    assert len(clusters) == 1
+    assert clusters[0]["size"] == 3
+    assert [bookmark["id"] for bookmark in clusters[0]["bookmarks"]] == sorted(
+        [ids["blog.test"], ids["amp.blog.test"], ids["repost.test"]])
+    
+    await async_client.delete(f"/bookmarks/{ids['repost.test']}", headers=headers)
+    assert await db_session.scalar(select(func.count()).select_from(SimhashBand)) == 3 * 4
+    response = await async_client.get("/bookmarks/near-duplicates", headers=headers)
+    assert response.json()[0]["size"] == 2
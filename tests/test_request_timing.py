@@ -0,0 +1,66 @@
+import logging
+import re
+
+from .utils import *
+import app.utils.request_timing as request_timing
+from app.utils.request_timing import current_timings, instrument_engine, timed, uninstrument_engine
+
+
+@pytest.fixture
+def instrumented_engine():
+    # the tests run on their own engine, not the app's
+    instrument_engine(engine)
+    yield engine
+    uninstrument_engine(engine)
+
+
+def server_timing(response) -> dict:
+    return {name: float(duration)
+            for name, duration in re.findall(r"(\w+);dur=([\d.]+)", response.headers["Server-Timing"])}
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header(async_client: AsyncClient,
+                                    instrumented_engine,
+                                    seed_data,
+                                    caplog):
+    headers = {"Authorization": "Bearer testtoken"}
+    with caplog.at_level(logging.INFO, logger="app.timing"):
+        response = await async_client.get("/bookmarks/?limit=7", headers=headers)
+    
+    metrics = server_timing(response)
+    assert metrics.keys() == {"db", "serialize", "total"}
+    assert metrics["total"] >= metrics["db"]
+    queries = int(re.search(r'desc="(\d+) queries"', response.headers["Server-Timing"]).group(1))
+    assert queries >= 2
+    
+    record = next(record for record in caplog.records if record.name == "app.timing")
+    assert record.path == "/bookmarks/"
+    assert record.status_code == 200
+    assert record.queries == queries
+    
+    response = await async_client.post("/bookmarks/",
+                                       json={"title": "x", "url": "https://example.com/page"},
+                                       headers=headers)
+    assert "scrape" in server_timing(response)
+
+
+@pytest.mark.asyncio
+async def test_slow_query_log(async_client: AsyncClient,
+                              instrumented_engine,
+                              seed_data,
+                              monkeypatch,
+                              caplog):
+    monkeypatch.setattr(request_timing, "SLOW_QUERY_MS", 1e-9)
+    with caplog.at_level(logging.WARNING, logger="app.timing.slow_query"):
+        await async_client.get("/bookmarks/1", headers={"Authorization": "Bearer testtoken"})
+    
+    record = next(record for record in caplog.records
+                  if record.name == "app.timing.slow_query" and "FROM bookmark" in record.statement)
+    assert any("bookmark" in step for step in record.query_plan)
+
+
+def test_timed_outside_a_request():
+    assert current_timings() is None
+    with timed("serialize"):
+        pass
@@ -0,0 +1,149 @@
+from .utils import *
+from app.utils import http_client
+from app.utils.metadata_cache import MetadataCache
+from app.utils.scraper import scrape_metadata, scrape_title
+
+
+HEAD = """<!doctype html><html><head>
+<meta charset="utf-8">
+<title>
+   Zażółć gęślą jaźń
+</title>
+<meta name="description" content="A page about things">
+<link rel="icon" href="/favicon-16.png" sizes="16x16">
+<link rel="apple-touch-icon" href="/touch.png" sizes="180x180">
+<link rel="canonical" href="https://site.test/article">
+<link rel="alternate" type="application/rss+xml" href="/feed.xml">
+</head>""".encode("utf-8")
+
+
+
+
+@pytest.mark.asyncio
+async def test_shared_http_client_reuses_one_pool():
+    requests_seen = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        return httpx.Response(200, html="<title>Shared</title>")
+    
+    client = await http_client.start_http_client(transport=httpx.MockTransport(handler))
+    try:
+        assert http_client.get_http_client() is client
+        assert await scrape_title("https://one.test/") == "Shared"
+        assert await scrape_title("https://two.test/") == "Shared"
+        assert len(requests_seen) == 2
+        assert requests_seen[0].headers["User-Agent"] == http_client.USER_AGENT
+    finally:
+        await http_client.close_http_client()
+    
+    assert client.is_closed
+
+
+
+
+@pytest.mark.asyncio
+async def test_scrape_title_failure_returns_empty_string():
+    assert await scrape_title("https://missing.test/", mock_http_client) == ""
+
+
+
+
+@pytest.mark.asyncio
+async def test_scrape_metadata_reads_only_the_head():
+    body_chunks_sent = 0
+    
+    async def body():
+        nonlocal body_chunks_sent
+        yield HEAD
+        for _ in range(1000):
+            body_chunks_sent += 1
+            yield b"<p>" + b"x" * 1024 + b"</p>"
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"Content-Type": "text/html"}, content=body())
+    
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    metadata = await scrape_metadata("https://site.test/page", client)
+    
+    assert metadata.title == "Zażółć gęślą jaźń"
+    assert metadata.description == "A page about things"
+    assert metadata.favicon_url == "https://site.test/touch.png"
+    assert metadata.canonical_url == "https://site.test/article"
+    assert metadata.feed_links == ["https://site.test/feed.xml"]
+    assert body_chunks_sent <= 1
+
+
+
+
+@pytest.mark.asyncio
+async def test_scrape_metadata_favicon_fallback_and_failure():
+    metadata = await scrape_metadata("https://example.com/", mock_http_client)
+    assert metadata.title == "Example Domain"
+    assert metadata.favicon_url == "https://example.com/favicon.ico"
+    
+    assert await scrape_metadata("https://missing.test/", mock_http_client) is None
+
+
+
+
+class CountingSite:
+    def __init__(self, status_code=200, etag='"v1"'):
+        self.status_code = status_code
+        self.etag = etag
+        self.requests = []
+    
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.status_code != 200:
+            return httpx.Response(self.status_code)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        return httpx.Response(200, headers={"ETag": self.etag}, html="<title>Cached</title>")
+
+
+
+
+@pytest.mark.asyncio
+async def test_metadata_cache_hit_and_revalidation():
+    site = CountingSite()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(site))
+    cache = MetadataCache(path=None, ttl=3600)
+    
+    assert (await cache.get("https://Site.test:443/a#top", client)).title == "Cached"
+    assert (await cache.get("https://site.test/a", client)).title == "Cached"
+    assert len(site.requests) == 1
+    
+    cache.ttl = 0
+    await cache.get("https://site.test/b", client)
+    metadata = await cache.get("https://site.test/b", client)
+    assert metadata.title == "Cached"
+    assert site.requests[-1].headers["If-None-Match"] == '"v1"'
+    
+    stats = cache.stats.as_dict()
+    assert (stats["hits"], stats["misses"], stats["revalidated"]) == (1, 2, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+
+
+@pytest.mark.asyncio
+async def test_metadata_cache_negative_and_persistent(tmp_path):
+    site = CountingSite(status_code=500)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(site))
+    path = str(tmp_path / "cache.db")
+    
+    cache = MetadataCache(path=path)
+    assert await cache.get("https://down.test/", client) is None
+    assert await cache.get("https://down.test/", client) is None
+    assert len(site.requests) == 1
+    assert cache.stats.negative_hits == 1
+    
+    site.status_code = 200
+    await cache.get("https://up.test/", client)
+    cache.close()
+    
+    restarted = MetadataCache(path=path)
+    assert (await restarted.get("https://up.test/", client)).title == "Cached"
+    assert len(site.requests) == 2
+    restarted.close()
@@ -0,0 +1,126 @@
+import json
+import time
+import numpy as np
+
+from .utils import *
+from app.utils import embeddings
+from app.utils.embeddings import EmbeddingPool, HashingEmbedder
+from app.utils.semantic_index import SemanticIndexer, VectorIndex, get_semantic_indexer
+
+
+def test_hashing_embedder():
+    embedder = HashingEmbedder(dimensions=256)
+    vectors = embedder.embed(["Python asyncio tutorial",
+                              "A tutorial on asyncio in Python",
+                              "Sourdough bread recipe",
+                              ""])
+    assert vectors.shape == (4, 256)
+    assert np.allclose(np.linalg.norm(vectors[:3], axis=1), 1.0)
+    assert not vectors[3].any()
+    assert vectors[0] @ vectors[1] > 0.5 > vectors[0] @ vectors[2]
+
+
+def test_vector_index(tmp_path):
+    vectors = np.eye(4, dtype=np.float32)
+    index = VectorIndex(str(tmp_path), "test", 4)
+    index.upsert([10, 20, 30], vectors[:3])
+    assert index.search(vectors[1], 2)[0] == (20, 1.0)
+
+    index.remove([20])
+    index.upsert([40], vectors[3:])  # takes the freed row
+    index.save(watermark=1.0)
+    assert index.meta["count"] == 3
+
+    reopened = VectorIndex(str(tmp_path), "test", 4)
+    assert (len(reopened), reopened.watermark) == (3, 1.0)
+    assert [bookmark_id for bookmark_id, _ in reopened.search(vectors[3], 10)][0] == 40
+    assert 20 not in dict(reopened.search(vectors[1], 10))
+
+    # grows past the initial capacity, rows stay where they were
+    many = np.random.default_rng(1).standard_normal((600, 4)).astype(np.float32)
+    reopened.upsert(list(range(100, 700)), many)
+    assert len(reopened) == 603
+    assert (reopened.vectors[reopened.rows()[10]] == vectors[0]).all()
+
+    # another embedder - the old vectors mean nothing to it
+    assert len(VectorIndex(str(tmp_path), "other", 4)) == 0
+
+
+
+
+@pytest.mark.asyncio
+async def test_embedding_query_priority(monkeypatch):
+    pool = EmbeddingPool(workers=0, dimensions=64, batch_size=1)
+    await pool.start()
+    embedded = []
+    embed = embeddings._embed
+    
+    def slow_embed(texts):
+        embedded.extend(texts)
+        time.sleep(0.02)
+        return embed(texts)
+    monkeypatch.setattr(embeddings, "_embed", slow_embed)
+    
+    sync = asyncio.create_task(pool.embed([f"bookmark {i}" for i in range(10)]))
+    await asyncio.sleep(0.01)
+    vector = await pool.embed_query("query")
+    assert vector.shape == (64,)
+    # behind the batch already running, ahead of the nine queued
+    assert embedded.index("query") <= 1
+    assert len(await sync) == 10
+    pool.shutdown()
+
+
+
+
+@pytest_asyncio.fixture(scope="function")
+async def semantic_indexer(tmp_path):
+    indexer = SemanticIndexer(SessionLocal, EmbeddingPool(workers=0, dimensions=256), path=str(tmp_path))
+    await indexer.start()
+    app.dependency_overrides[get_semantic_indexer] = lambda: indexer
+    yield indexer
+    del app.dependency_overrides[get_semantic_indexer]
+    await indexer.stop()
+
+
+@pytest.mark.asyncio
+async def test_semantic_search(async_client: AsyncClient,
+                               db_session,
+                               seed_data,
+                               semantic_indexer):
+    headers = {"Authorization": "Bearer testtoken"}
+    entries = [{"url": "https://docs.python.org/3/library/asyncio.html", "title": "asyncio - asynchronous I/O in Python"},
+               {"url": "https://bread.test/", "title": "Sourdough bread", "description": "Recipe with a starter"},
+               {"url": "https://sqlite.org/wal.html", "title": "Write-ahead logging in SQLite"}]
+    await async_client.post("/bookmarks/import?format=json", content=json.dumps(entries), headers=headers)
+
+    # nothing embedded yet - answered from the empty index, sync queued
+    response = await async_client.get("/bookmarks/semantic-search", params={"q": "python async io"}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["pending"] is True
+    
+    await semantic_indexer.join()
+    response = await async_client.get("/bookmarks/semantic-search", params={"q": "python async io"}, headers=headers)
+    data = response.json()
+    assert data["pending"] is False
+    assert data["items"][0]["title"] == "asyncio - asynchronous I/O in Python"
+    assert data["items"][0]["score"] > data["items"][-1]["score"]
+
+    await async_client.delete(f"/bookmarks/{data['items'][0]['id']}", headers=headers)
+    response = await async_client.get("/bookmarks/semantic-search", params={"q": "python async io"}, headers=headers)
+    assert response.json()["pending"] is True
+    assert response.json()["items"][0]["title"] != "asyncio - asynchronous I/O in Python"
+
+    await semantic_indexer.join()
+    response = await async_client.get("/bookmarks/semantic-search", params={"q": "bread starter"}, headers=headers)
+    assert response.json()["pending"] is False
+    assert response.json()["items"][0]["title"] == "Sourdough bread"
+    assert len(await semantic_indexer.open_index(1)) == 3
+
+
+@pytest.mark.asyncio
+async def test_semantic_search_disabled(async_client: AsyncClient,
+                                        seed_data):
+    response = await async_client.get("/bookmarks/semantic-search", params={"q": "anything"},
+                                      headers={"Authorization": "Bearer testtoken"})
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -1,3 +1,4 @@
+import time
 from pytest import MonkeyPatch
 from sqlalchemy import select
 from freezegun import freeze_time
@@ -9,6 +10,8 @@ from .utils import *
 from app.db.models import User
 from app.routers.users import authenticate_user, get_current_user
 import app.routers.users as users
+from app.utils.token_cache import token_cache
+import app.utils.passwords as passwords
 
 
 
@@ -172,4 +175,89 @@ async def test_create_user(db_session,
     assert user.username == request_data["username"]
     assert bcrypt_context.verify(request_data["password"], user.hashed_password)
     assert user.role == request_data["role"]
-    
\ No newline at end of file
+    
+
+
+
+@freeze_time("2025-01-01 12:00:00", tz_offset=0)
+def test_get_current_user_token_cache(monkeypatch: MonkeyPatch):
+    monkeypatch.setattr(users, "ALGORITHM", "HS256")
+    monkeypatch.setattr(users, "SECRET_KEY", "testkey")
+    token_cache.clear()
+    
+    token = users.create_jwt("testuser", 1, "user", timedelta(minutes=30))
+    assert get_current_user(token) == get_current_user(token)
+    assert (token_cache.stats.misses, token_cache.stats.hits) == (1, 1)
+    
+    # a cached token is only as good as its key
+    monkeypatch.setattr(users, "SECRET_KEY", "rotated")
+    with pytest.raises(HTTPException):
+        get_current_user(token)
+    monkeypatch.setattr(users, "SECRET_KEY", "testkey")
+    
+    with freeze_time("2025-01-01 12:31:00"):
+        with pytest.raises(HTTPException):
+            get_current_user(token)
+    assert token_cache.stats.expired == 1
+
+
+
+
+def test_get_current_user_revoked_token(monkeypatch: MonkeyPatch):
+    monkeypatch.setattr(users, "ALGORITHM", "HS256")
+    monkeypatch.setattr(users, "SECRET_KEY", "testkey")
+    token_cache.clear()
+    
+    with freeze_time("2025-01-01 12:00:00"):
+        token = users.create_jwt("testuser", 1, "user", timedelta(minutes=30))
+        other_token = users.create_jwt("testuser", 1, "user", timedelta(minutes=31))
+        get_current_user(token)
+        
+        token_cache.revoke_token(token_cache.digest(token, "testkey", "HS256"), time.time() + 1800)
+        with pytest.raises(HTTPException):
+            get_current_user(token)
+        assert get_current_user(other_token)["id"] == 1
+    
+    with freeze_time("2025-01-01 12:05:00"):
+        token_cache.revoke_user(1)
+        with pytest.raises(HTTPException):
+            get_current_user(other_token)
+        
+        new_token = users.create_jwt("testuser", 1, "user", timedelta(minutes=30))
+        assert get_current_user(new_token)["id"] == 1
+    assert token_cache.stats.revoked == 2
+
+
+
+
+def test_logout_token_without_exp(monkeypatch: MonkeyPatch):
+    monkeypatch.setattr(users, "ALGORITHM", "HS256")
+    monkeypatch.setattr(users, "SECRET_KEY", "testkey")
+    token_cache.clear()
+    
+    with freeze_time("2025-01-01 12:00:00"):
+        token = jwt.encode({"sub": "testuser", "id": 1, "role": "user"}, "testkey", algorithm="HS256")
+        users.logout(token, get_current_user(token))
+        with pytest.raises(HTTPException):
+            get_current_user(token)
+    
+    # denied for a whole token lifetime
+    with freeze_time(f"2025-01-01 12:{users.ACCESS_TOKEN_EXPIRE_MINUTES - 1}:00"):
+        with pytest.raises(HTTPException):
+            get_current_user(token)
+
+
+
+
+@pytest.mark.asyncio
+async def test_authenticate_user_rehashes_when_cost_changes(seed_data,
+                                                           db_session,
+                                                           monkeypatch: MonkeyPatch):
+    monkeypatch.setattr(passwords, "bcrypt_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=4))
+    
+    user = await authenticate_user("test", "x", db_session)
+    assert user.hashed_password.startswith("$2b$04$")
+    
+    assert (await authenticate_user("test", "x", db_session)).hashed_password == user.hashed_password
+    with pytest.raises(HTTPException):
+        await authenticate_user("test", "wrong", db_session)
@@ -1,3 +1,6 @@
+import io
+import os
+import tempfile
 import pytest
 import asyncio
 import pytest_asyncio
@@ -10,17 +13,24 @@ from sqlalchemy.pool import StaticPool
 from sqlalchemy import select
 from passlib.context import CryptContext
 from freezegun import freeze_time
+from PIL import Image
 from datetime import datetime
 
 
+TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URL", TEST_DATABASE_URL)
+os.environ.setdefault("METADATA_CACHE_PATH", ":memory:")
+os.environ.setdefault("FAVICON_STORE_PATH", tempfile.mkdtemp(prefix="favicons-"))
+
 from app.main import app
-from app.db.database import Base, get_db
+from app.db.database import Base, get_db, get_read_db, get_read_sessionmaker
 from app.db.models import Bookmark, User
 from app.routers.users import get_current_user
+from app.utils.http_client import create_http_client, get_http_client
+from app.utils.response_cache import CachedResponse, ResponseCacheBackend, response_cache
 
 
-TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
-
 bcrypt_context = CryptContext(schemes=["bcrypt"])
 
 engine = create_async_engine(TEST_DATABASE_URL,
@@ -36,12 +46,97 @@ async def override_get_db():
     async with SessionLocal() as session:
         yield session
         
+def override_get_sessionmaker():
+    return SessionLocal
+
 def override_get_current_user():
     return {"id":1, "sub": "test", "role": "user"}
+
+
+# === MOCKED WEBSITES - scraping never leaves the process ===
+ARTICLE_HEAD = ("<title>{title}</title><meta name='description' content='Connection pooling, WAL mode and "
+                "PRAGMA settings that keep SQLite fast under concurrent writes from an async web server'>")
+MOCK_PAGES = {
+    "example.com": "<html><head><title>Example Domain</title></head><body></body></html>",
+    # the same article on its site, an AMP mirror and a repost
+    "blog.test": "<html><head>" + ARTICLE_HEAD.format(title="Tuning SQLite for async web servers") + "</head></html>",
+    "amp.blog.test": "<html><head>" + ARTICLE_HEAD.format(title="Tuning SQLite for async web servers | AMP") + "</head></html>",
+    "repost.test": "<html><head>" + ARTICLE_HEAD.format(title="Tuning SQLite for async web servers") + "</head></html>",
+    "bread.test": "<html><head><title>Sourdough bread with a rye starter, step by step</title></head></html>",
+    "touch.test": "<html><head><title>Touch</title><link rel='apple-touch-icon' href='/touch.png' sizes='180x180'></head></html>",
+    "svg.test": "<html><head><title>Vector</title><link rel='icon' href='/icon.svg' sizes='any'></head></html>",
+    # a whole page - head, article and the usual chrome around it
+    "article.test": ("<html lang='en'><head><title>Write-ahead logging in SQLite</title></head><body>"
+                     "<header><nav><a href='/'>Home</a> <a href='/archive'>Archive</a></nav></header>"
+                     "<div id='sidebar'><p>Subscribe to our newsletter, new posts every single week.</p></div>"
+                     "<div class='post'><h1>Write-ahead logging in SQLite</h1>"
+                     "<p>In WAL mode, changes are appended to a separate log file, and readers keep "
+                     "reading the database file while a writer appends to the log.</p>"
+                     "<p>A checkpoint moves the logged pages back into the database, so the log does "
+                     "not grow without limit, and it runs without blocking the readers.</p>"
+                     "<ul><li><a href='/1'>Previous post</a></li><li><a href='/2'>Next post</a></li></ul></div>"
+                     "<footer>Comments are closed, see you next time.</footer></body></html>"),
+}
+
+def _icon(format: str, size: int) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGBA", (size, size), (200, 30, 30, 255)).save(output, format=format)
+    return output.getvalue()
+
+# every mocked site has the same /favicon.ico, except svg.test
+MOCK_ICONS = {
+    "/favicon.ico": (_icon("ICO", 48), "image/x-icon"),
+    "/touch.png": (_icon("PNG", 180), "image/png"),
+    "/icon.svg": (b"<svg xmlns='http://www.w3.org/2000/svg'><script>alert(1)</script></svg>", "image/svg+xml"),
+}
+
+def mock_site_handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path in MOCK_ICONS:
+        content, media_type = MOCK_ICONS[request.url.path]
+        return httpx.Response(200, content=content, headers={"Content-Type": media_type})
+    page = MOCK_PAGES.get(request.url.host)
+    if page is None:
+        return httpx.Response(404)
+    return httpx.Response(200, html=page)
+
+mock_http_client = create_http_client(transport=httpx.MockTransport(mock_site_handler))
+
+def override_get_http_client():
+    return mock_http_client
         
         
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+app.dependency_overrides[get_read_sessionmaker] = override_get_sessionmaker
 app.dependency_overrides[get_current_user] = override_get_current_user
+app.dependency_overrides[get_http_client] = override_get_http_client
+
+
+# === FAKE SHARED CACHE - stands in for Redis & co. ===
+class FakeCacheBackend(ResponseCacheBackend):
+    """Keeps copies, like a store across the network would, and counts calls."""
+    
+    def __init__(self):
+        self.entries: dict[str, tuple] = {}
+        self.generations: dict[int, int] = {}
+        self.calls: list[str] = []
+    
+    async def get(self, key):
+        self.calls.append("get")
+        entry = self.entries.get(key)
+        return CachedResponse(*entry) if entry is not None else None
+    
+    async def set(self, key, response):
+        self.calls.append("set")
+        self.entries[key] = (bytes(response.body), response.etag, response.media_type)
+    
+    async def get_generation(self, user_id):
+        return self.generations.get(user_id, 0)
+    
+    async def bump_generation(self, user_id):
+        self.calls.append("bump")
+        self.generations[user_id] = self.generations.get(user_id, 0) + 1
+        return self.generations[user_id]
 
 
 @pytest_asyncio.fixture(scope="function") 
@@ -86,5 +181,6 @@ async def db_engine():
         await conn.run_sync(Base.metadata.create_all)
     yield engine
     # === TEARDOWN ===
+    response_cache.reset()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
\ No newline at end of file